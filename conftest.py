@@ -0,0 +1,13 @@
+import pytest
+from django.core.cache import caches
+
+from voyage_craft.cache import two_tier_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Test transactions roll back the database but not cached reads of it.
+    for cache in caches.all():
+        cache.clear()
+    two_tier_cache.clear_local()
+    yield
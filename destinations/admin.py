@@ -1,5 +1,61 @@
+import functools
+
 from django.contrib import admin
-from destinations.models import Destination
+from django.db import transaction
+
+from destinations.models import Activity, Destination, WeatherData
+from voyage_craft.admin import LargeTableAdmin, update_action
+from voyage_craft.cache import two_tier_cache
+from .tasks import schedule_snapshot
+from .utils import CATALOG_NAMESPACE, SNAPSHOT_NAMESPACE
+
+
+class CatalogAdmin(LargeTableAdmin):
+    def after_bulk_update(self, request, queryset):
+        transaction.on_commit(functools.partial(self.publish_bulk_update, queryset.model))
+
+    @staticmethod
+    def publish_bulk_update(model):
+        two_tier_cache.bump(CATALOG_NAMESPACE)
+        if model is not Activity:
+            two_tier_cache.bump(SNAPSHOT_NAMESPACE)
+            schedule_snapshot()
+
+
+@admin.register(Destination)
+class DestinationAdmin(CatalogAdmin):
+    list_display = ('name', 'type', 'parent', 'cost_level', 'family_friendly', 'accessibility', 'updated_at')
+    list_select_related = ('parent',)
+    list_filter = ('type',)
+    # Prefix and exact lookups, served by destinations_name_idx and the slug's unique index.
+    search_fields = ('name__startswith', '=slug')
+    autocomplete_fields = ('parent',)
+    actions = (*LargeTableAdmin.actions,
+               update_action('Mark as family friendly', family_friendly=True),
+               update_action('Mark as not family friendly', family_friendly=False),
+               update_action('Mark as accessible', accessibility=True),
+               update_action('Mark as not accessible', accessibility=False))
+
+
+@admin.register(Activity)
+class ActivityAdmin(CatalogAdmin):
+    list_display = ('name', 'destination', 'suitable_weather', 'duration_hours', 'pet_friendly',
+                    'family_friendly', 'accessibility')
+    list_select_related = ('destination',)
+    search_fields = ('name__startswith',)
+    autocomplete_fields = ('destination',)
+    actions = (*LargeTableAdmin.actions,
+               update_action('Mark as pet friendly', pet_friendly=True),
+               update_action('Mark as family friendly', family_friendly=True),
+               update_action('Mark as accessible', accessibility=True))
+
 
-# Register your models here.
-admin.site.register(Destination)
\ No newline at end of file
+@admin.register(WeatherData)
+class WeatherDataAdmin(CatalogAdmin):
+    list_display = ('destination', 'month', 'weather', 'updated_at')
+    list_select_related = ('destination',)
+    search_fields = ('destination__name__startswith',)
+    autocomplete_fields = ('destination',)
+    actions = (*LargeTableAdmin.actions,
+               *(update_action(f'Set weather to {label}', weather=value)
+                 for value, label in WeatherData.WEATHER_CHOICES))
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.conf import settings
+
+from voyage_craft.cache import require_shared_cache
 
 
 class DestinationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'destinations'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if settings.RECOMMENDATION_BITMAP_INDEX:
+            # Each worker's index follows the catalog through the shared cache's version counter.
+            require_shared_cache('RECOMMENDATION_BITMAP_INDEX')
+        if settings.CATALOG_SNAPSHOT_PATH:
+            # A mapped snapshot is only trusted while its version matches the shared cache's.
+            require_shared_cache('CATALOG_SNAPSHOT_PATH')
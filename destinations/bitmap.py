@@ -0,0 +1,329 @@
+import threading
+
+from django.conf import settings
+from django.db.models import Q
+
+from voyage_craft.cache import two_tier_cache
+from voyage_craft.lazy import lazy_import
+from .models import Destination, WeatherData
+from .snapshot import CATEGORICAL_COLUMNS, CLIMATES, FLAG_COLUMNS, catalog_arrays, current_snapshot
+from .utils import SNAPSHOT_NAMESPACE
+
+np = lazy_import('numpy')
+
+WEATHER_LOOKUP = 'weather_data__weather'
+ID_COMPARISONS = {
+    'exact': 'equal', 'lt': 'less', 'lte': 'less_equal', 'gt': 'greater', 'gte': 'greater_equal',
+}
+
+
+class UnsupportedQuery(ValueError):
+    """The ``Q`` uses a lookup the index does not hold; run it against the database instead."""
+
+
+def pack(mask, words: int):
+    """A bool array as little-endian uint64 words, bit ``i % 64`` of word ``i // 64`` being row ``i``."""
+    packed = np.zeros(words * 8, dtype=np.uint8)
+    bits = np.packbits(mask, bitorder='little')
+    packed[:len(bits)] = bits
+    return packed.view('<u8')
+
+
+class BitmapIndex:
+    """
+    Bitmaps over the destinations for every value of the low-cardinality columns.
+
+    Row ``i`` of the index is one destination; each (column, value) pair has
+    a uint64 array with bit ``i`` set when that destination has the value, and
+    ``climate`` values are set when any of its weather rows has them.
+    ``evaluate`` turns the ``Q`` objects of ``build_strict_query``,
+    ``build_type_query`` and ``build_flexible_query`` into AND/OR/NOT over
+    whole words, ``decode`` turns the result into ids and ``rank`` orders
+    them by relevance.
+
+    Rows are updated in place by ``update`` and ``remove``; new destinations
+    are appended, growing the arrays by doubling.
+    """
+
+    def __init__(self, arrays: dict, version=None):
+        self.version = version
+        self.lock = threading.RLock()
+        count = len(arrays['ids'])
+        self.capacity = max(64, 1 << max(count - 1, 0).bit_length())
+        self.words = self.capacity // 64
+        self.count = count
+        self.ids = np.zeros(self.capacity, dtype=np.int64)
+        self.ids[:count] = arrays['ids']
+        self.positions = {int(pk): position for position, pk in enumerate(arrays['ids'])}
+
+        self.bitmaps = {}
+        for column, choices in CATEGORICAL_COLUMNS.items():
+            codes = arrays[column]
+            for code, (value, _) in enumerate(choices):
+                self.bitmaps[column, value] = pack(codes == code, self.words)
+        for column in FLAG_COLUMNS:
+            self.bitmaps[column, True] = pack(arrays[column], self.words)
+            self.bitmaps[column, False] = pack(~arrays[column], self.words)
+        for bit, weather in enumerate(CLIMATES):
+            self.bitmaps[WEATHER_LOOKUP, weather] = pack((arrays['climate'] >> bit) & 1 == 1, self.words)
+        self.live = pack(np.ones(count, dtype=np.bool_), self.words)
+
+    @classmethod
+    def from_database(cls, version=None) -> 'BitmapIndex':
+        return cls(catalog_arrays(), version)
+
+    @classmethod
+    def from_snapshot(cls, snapshot, version=None) -> 'BitmapIndex':
+        return cls(snapshot.arrays, version)
+
+    # Maintenance
+
+    def update(self, destination: Destination):
+        """Set the row of ``destination`` from its fields, appending it if new; climates are kept."""
+        with self.lock:
+            position = self.positions.get(destination.pk)
+            if position is None:
+                position = self.append(destination.pk)
+            word, bit = divmod(position, 64)
+            mask = np.uint64(1 << bit)
+            for (column, value), bitmap in self.bitmaps.items():
+                if column == WEATHER_LOOKUP:
+                    continue
+                if getattr(destination, column) == value:
+                    bitmap[word] |= mask
+                else:
+                    bitmap[word] &= ~mask
+            self.live[word] |= mask
+
+    def update_climates(self, destination_id: int, climates):
+        """Set the climates of ``destination_id`` to the weather values of its weather rows."""
+        with self.lock:
+            position = self.positions.get(destination_id)
+            if position is None:
+                return
+            word, bit = divmod(position, 64)
+            mask = np.uint64(1 << bit)
+            for weather in CLIMATES:
+                bitmap = self.bitmaps[WEATHER_LOOKUP, weather]
+                if weather in climates:
+                    bitmap[word] |= mask
+                else:
+                    bitmap[word] &= ~mask
+
+    def remove(self, destination_id: int):
+        """Clear the row of ``destination_id``; its slot stays unused."""
+        with self.lock:
+            position = self.positions.pop(destination_id, None)
+            if position is None:
+                return
+            word, bit = divmod(position, 64)
+            mask = ~np.uint64(1 << bit)
+            for bitmap in (*self.bitmaps.values(), self.live):
+                bitmap[word] &= mask
+
+    def append(self, destination_id: int) -> int:
+        if self.count == self.capacity:
+            self.capacity *= 2
+            self.words = self.capacity // 64
+            self.ids = np.concatenate([self.ids, np.zeros_like(self.ids)])
+            for key, bitmap in self.bitmaps.items():
+                self.bitmaps[key] = np.concatenate([bitmap, np.zeros_like(bitmap)])
+            self.live = np.concatenate([self.live, np.zeros_like(self.live)])
+        position = self.count
+        self.count += 1
+        self.ids[position] = destination_id
+        self.positions[destination_id] = position
+        return position
+
+    # Queries
+
+    def evaluate(self, query: Q):
+        """
+        The rows matching ``Destination.objects.filter(query)`` as uint64 words.
+
+        Within one ``filter()`` Django joins ``weather_data`` once, so every
+        weather condition of ``query`` tests the same weather row. That is
+        mirrored by evaluating ``query`` once per weather value the
+        destination has. Raises ``UnsupportedQuery`` for lookups outside the
+        index and for negated weather conditions.
+        """
+        with self.lock:
+            weathers = [weather for weather in self.weather_values(query, negated=False)
+                        if (WEATHER_LOOKUP, weather) in self.bitmaps]
+            # Destinations with no weather row, or only other weather, match with every weather condition false.
+            others = self.live.copy()
+            for weather in weathers:
+                others &= ~self.bitmaps[WEATHER_LOOKUP, weather]
+            result = self.node(query, None) & others
+            for weather in weathers:
+                result |= self.node(query, weather) & self.bitmaps[WEATHER_LOOKUP, weather]
+            return result
+
+    def weather_values(self, query: Q, negated: bool) -> set:
+        negated = negated != query.negated
+        values = set()
+        for child in query.children:
+            if isinstance(child, Q):
+                values |= self.weather_values(child, negated)
+            elif child[0].startswith(WEATHER_LOOKUP):
+                if negated:
+                    raise UnsupportedQuery('Negated weather conditions are not supported.')
+                values |= set(child[1]) if child[0].endswith('__in') else {child[1]}
+        return values
+
+    def node(self, query: Q, weather):
+        if not query.children:
+            result = self.live.copy()
+        else:
+            parts = [self.node(child, weather) if isinstance(child, Q) else self.leaf(*child, weather=weather)
+                     for child in query.children]
+            result = parts[0].copy()
+            for part in parts[1:]:
+                if query.connector == Q.OR:
+                    result |= part
+                else:
+                    result &= part
+        return ~result & self.live if query.negated else result
+
+    def leaf(self, lookup: str, value, weather=None):
+        if lookup in (WEATHER_LOOKUP, f'{WEATHER_LOOKUP}__in'):
+            values = value if lookup.endswith('__in') else [value]
+            return self.live.copy() if weather in values else np.zeros(self.words, dtype='<u8')
+
+        field, _, lookup_type = lookup.partition('__')
+        if field in ('id', 'pk'):
+            return self.id_leaf(lookup_type or 'exact', value)
+        if lookup_type not in ('', 'exact', 'in') or field not in (*CATEGORICAL_COLUMNS, *FLAG_COLUMNS):
+            raise UnsupportedQuery(f'{lookup} is not indexed.')
+
+        result = np.zeros(self.words, dtype='<u8')
+        for item in (value if lookup_type == 'in' else [value]):
+            # Values outside the model choices are in no bitmap.
+            bitmap = self.bitmaps.get((field, item))
+            if bitmap is not None:
+                result |= bitmap
+        return result
+
+    def id_leaf(self, lookup_type: str, value):
+        ids = self.ids[:self.count]
+        if lookup_type == 'in':
+            mask = np.isin(ids, list(value))
+        elif lookup_type in ID_COMPARISONS:
+            mask = getattr(np, ID_COMPARISONS[lookup_type])(ids, value)
+        else:
+            raise UnsupportedQuery(f'id__{lookup_type} is not indexed.')
+        return pack(mask, self.words) & self.live
+
+    @staticmethod
+    def rows(words):
+        # Only the non-zero words are unpacked; selective results touch a fraction of the index.
+        nonzero = np.flatnonzero(words)
+        set_bits = np.flatnonzero(np.unpackbits(words[nonzero].view(np.uint8), bitorder='little'))
+        return nonzero[set_bits // 64] * 64 + set_bits % 64
+
+    def decode(self, words) -> list:
+        return self.ids[self.rows(words)].tolist()
+
+    def matching(self, *queries: Q):
+        result = self.live.copy()
+        for query in queries:
+            result &= self.evaluate(query)
+        return result
+
+    def candidates(self, *queries: Q) -> list:
+        """Ids of the destinations matching ``filter(queries[0]).filter(queries[1])...``, in index order."""
+        with self.lock:
+            return self.decode(self.matching(*queries))
+
+    def rank(self, queries, conditions, limit: int = None):
+        """
+        Ids matching ``queries`` ordered by how many of ``conditions`` they meet, fewest first.
+
+        That is the order of ``annotate_and_order_destinations``: a weather
+        condition counts once when any weather row meets it, and ties go by
+        id. None when more than ``limit`` destinations match; they are
+        counted without decoding the result.
+        """
+        with self.lock:
+            result = self.matching(*queries)
+            if limit is not None and int(np.bitwise_count(result).sum()) > limit:
+                return None
+            rows = self.rows(result)
+            words, bits = rows // 64, (rows % 64).astype(np.uint64)
+            scores = np.zeros(len(rows), dtype=np.uint64)
+            for condition in conditions:
+                scores += (self.evaluate(condition)[words] >> bits) & np.uint64(1)
+            ids = self.ids[rows]
+            return ids[np.lexsort((ids, scores))].tolist()
+
+
+_current = {'index': None}
+_lock = threading.Lock()
+
+
+def destination_index() -> BitmapIndex:
+    """
+    This process's index, rebuilt when the catalog changed in another process.
+
+    The index remembers the ``SNAPSHOT_NAMESPACE`` version it reflects, which
+    activity changes leave alone. A snapshot written at that version is
+    mapped instead of querying the database.
+    """
+    version = two_tier_cache.version(SNAPSHOT_NAMESPACE)
+    index = _current['index']
+    if index is not None and index.version == version:
+        return index
+    with _lock:
+        index = _current['index']
+        if index is None or index.version != version:
+            snapshot = current_snapshot()
+            if snapshot is not None and snapshot.header.get('catalog_version') == version:
+                index = BitmapIndex.from_snapshot(snapshot, version)
+            else:
+                index = BitmapIndex.from_database(version)
+            _current['index'] = index
+    return index
+
+
+def apply_change(sender, instance, deleted: bool, version: int):
+    """
+    Apply one committed catalog change to this process's index, if it has one.
+
+    ``version`` is what the change's ``SNAPSHOT_NAMESPACE`` bump returned,
+    after the commit. When it is not the index's version plus one, another
+    process changed the catalog as well; the index is left behind and
+    ``destination_index`` rebuilds it.
+    """
+    index = _current['index']
+    if index is None:
+        return
+    with index.lock:
+        if index.version != version - 1:
+            return
+        if sender is Destination:
+            if deleted:
+                index.remove(instance.pk)
+            else:
+                index.update(instance)
+        elif sender is WeatherData:
+            index.update_climates(instance.destination_id, set(
+                WeatherData.objects.filter(destination_id=instance.destination_id).values_list('weather', flat=True)
+            ))
+        index.version = version
+
+
+def indexed_recommendations(queries, conditions):
+    """
+    Ids matching ``Destination.objects.filter(queries[0]).filter(queries[1])...`` from the index, ranked by
+    ``conditions`` as ``BitmapIndex.rank`` does.
+
+    None when ``RECOMMENDATION_BITMAP_INDEX`` is off, a query is not
+    supported by the index or more than ``RECOMMENDATION_INDEX_MAX_IDS``
+    destinations match, in which case the caller queries the database.
+    """
+    if not getattr(settings, 'RECOMMENDATION_BITMAP_INDEX', False):
+        return None
+    try:
+        return destination_index().rank(queries, conditions, getattr(settings, 'RECOMMENDATION_INDEX_MAX_IDS', 1000))
+    except UnsupportedQuery:
+        return None
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users_app.models import User
+from voyage_craft.benchmarking import run_concurrently, summarize
+
+ENDPOINTS = {
+    'recommended-destinations': ('recommended-destinations', 'recommended-destinations-async'),
+    'itinerary-list': ('itinerary-list', 'itinerary-list-async'),
+    'get-preferences': ('get_preferences', 'get_preferences_async'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the sync (WSGI) and async (ASGI) variants of the read endpoints under concurrent load and '
+        'print latency and throughput as JSON. Seed data first with seed_catalog.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per endpoint and variant.')
+        parser.add_argument('--concurrency', type=int, default=20, help='Requests in flight at once.')
+        parser.add_argument('--users', type=int, default=20, help='Distinct users to spread requests over.')
+
+    def handle(self, *args, **options):
+        users = list(User.objects.order_by('pk')[:options['users']])
+        if not users:
+            raise CommandError('No users found; run seed_catalog first.')
+        tokens = [f'Bearer {AccessToken.for_user(user)}' for user in users]
+        tokens = [tokens[index % len(tokens)] for index in range(options['requests'])]
+
+        report = {'requests': options['requests'], 'concurrency': options['concurrency'], 'endpoints': {}}
+        with override_settings(TOKEN_BUCKET_THROTTLES={}):
+            for name, (sync_name, async_name) in ENDPOINTS.items():
+                wsgi = self.run_sync(reverse(sync_name), tokens, options['concurrency'])
+                asgi = asyncio.run(self.run_async(reverse(async_name), tokens, options['concurrency']))
+                report['endpoints'][name] = {
+                    'wsgi': wsgi,
+                    'asgi': asgi,
+                    'throughput_ratio': round(asgi['requests_per_second'] / wsgi['requests_per_second'], 3),
+                }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    @staticmethod
+    def summarize_run(results, seconds: float) -> dict:
+        summary = summarize([latency for latency, _ in results])
+        summary['requests_per_second'] = round(len(results) / seconds, 1)
+        summary['errors'] = sum(1 for _, status in results if status >= 400)
+        return summary
+
+    def run_sync(self, path: str, tokens: list, concurrency: int) -> dict:
+        def call(client, token):
+            started = time.perf_counter()
+            response = client.get(path, HTTP_AUTHORIZATION=token)
+            return (time.perf_counter() - started) * 1000, response.status_code
+
+        started = time.perf_counter()
+        results = run_concurrently(tokens, concurrency, Client, call)
+        return self.summarize_run(results, time.perf_counter() - started)
+
+    async def run_async(self, path: str, tokens: list, concurrency: int) -> dict:
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(token):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.get(path, headers={'Authorization': token})
+                return (time.perf_counter() - started) * 1000, response.status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call(token) for token in tokens))
+        return self.summarize_run(results, time.perf_counter() - started)
@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users_app.models import User
+from voyage_craft.benchmarking import run_concurrently, summarize
+
+MODES = {
+    'no-reuse': {'DB_CONN_MAX_AGE': '0', 'DB_POOL_MAX_SIZE': '0'},
+    'persistent': {'DB_CONN_MAX_AGE': '600', 'DB_CONN_HEALTH_CHECKS': 'true', 'DB_POOL_MAX_SIZE': '0'},
+    'pool': {'DB_POOL_MAX_SIZE': None},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure per-request latency through the real WSGI handler, so connections are opened and closed '
+        'exactly as in production, once per connection mode: no reuse, persistent connections with health '
+        'checks, and the psycopg 3 pool. Each mode runs in a subprocess with its own environment.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--path', help='Endpoint to request; defaults to the preferences list.')
+        parser.add_argument('--modes', default=','.join(MODES), help='Comma-separated subset of modes.')
+        parser.add_argument('--mode', help=('Internal: run a single mode in this process. Connection '
+                                            'settings come from the environment.'))
+
+    def handle(self, *args, **options):
+        if options['mode']:
+            self.stdout.write(json.dumps(self.run_mode(options)))
+            return
+
+        report = {'vendor': connection.vendor, 'requests': options['requests'],
+                  'concurrency': options['concurrency'], 'modes': {}}
+        for mode in options['modes'].split(','):
+            env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+            for key, value in MODES[mode].items():
+                env[key] = value if value is not None else str(options['concurrency'])
+            if mode == 'pool' and connection.vendor != 'postgresql':
+                report['modes'][mode] = {'skipped': 'the connection pool needs PostgreSQL with psycopg 3'}
+                continue
+
+            command = [sys.executable, sys.argv[0], 'bench_connections', '--mode', mode,
+                       '--requests', str(options['requests']), '--concurrency', str(options['concurrency'])]
+            if options['path']:
+                command += ['--path', options['path']]
+            result = subprocess.run(command, env=env, capture_output=True, text=True)
+            if result.returncode:
+                raise CommandError(f'{mode} run failed:\n{result.stderr}')
+            report['modes'][mode] = json.loads(result.stdout.strip().splitlines()[-1])
+
+        baseline = report['modes'].get('no-reuse', {}).get('mean_ms')
+        for summary in report['modes'].values():
+            if baseline and 'mean_ms' in summary:
+                summary['mean_saved_ms'] = round(baseline - summary['mean_ms'], 3)
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run_mode(self, options) -> dict:
+        users = list(User.objects.order_by('pk')[:options['concurrency']])
+        if not users:
+            raise CommandError('No users found; run seed_catalog first.')
+        path = options['path'] or reverse('get_preferences')
+        tokens = [f'Bearer {AccessToken.for_user(user)}' for user in users]
+        tokens = [tokens[index % len(tokens)] for index in range(options['requests'])]
+        connection.close()
+
+        handler = WSGIHandler()
+        factory = RequestFactory()
+
+        def call(_, token):
+            environ = factory.get(path, HTTP_AUTHORIZATION=token).environ
+            started = time.perf_counter()
+            response = handler(environ, lambda status, headers: None)
+            b''.join(response)
+            # Closing the response fires request_finished, which closes connections past CONN_MAX_AGE.
+            response.close()
+            return (time.perf_counter() - started) * 1000, response.status_code
+
+        with override_settings(TOKEN_BUCKET_THROTTLES={}):
+            results = run_concurrently(tokens, options['concurrency'], lambda: None, call)
+
+        summary = summarize([latency for latency, _ in results])
+        summary['errors'] = sum(1 for _, status in results if status >= 400)
+        summary['settings'] = {key: value for key, value in settings.DATABASES['default'].items()
+                               if key in ('CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+        summary['settings']['pool'] = bool(settings.DATABASES['default'].get('OPTIONS', {}).get('pool'))
+        return summary
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from destinations.snapshot import build_snapshot, snapshot_path
+
+
+class Command(BaseCommand):
+    help = (
+        'Write the destination catalog (ids, categorical codes, flags, climates and names) to a memory-mapped '
+        'snapshot file that web workers share. The file is replaced atomically; running workers pick it up '
+        'within CATALOG_SNAPSHOT_CHECK_INTERVAL seconds.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Defaults to CATALOG_SNAPSHOT_PATH.')
+
+    def handle(self, *args, **options):
+        path = options['path'] or snapshot_path()
+        if not path:
+            raise CommandError('Pass --path or set CATALOG_SNAPSHOT_PATH.')
+
+        started = time.perf_counter()
+        snapshot = build_snapshot(path)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if options['verbosity']:
+            self.stdout.write(
+                f'{path}: {len(snapshot)} destinations, {snapshot.buffer.nbytes / 1024:.1f} KiB, '
+                f'version {snapshot.version}, built in {elapsed_ms:.1f} ms'
+            )
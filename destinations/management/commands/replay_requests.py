@@ -0,0 +1,126 @@
+import json
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import Resolver404, resolve
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users_app.models import User
+from voyage_craft.benchmarking import compare, run_concurrently, summarize
+from voyage_craft.capture import is_redacted
+from voyage_craft.metrics import QueryRecorder
+
+
+def endpoint_name(method: str, path: str) -> str:
+    try:
+        match = resolve(path)
+    except Resolver404:
+        return f'{method} unresolved'
+    return f'{method} {match.url_name or match.view_name}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Replay a request log written by RequestCaptureMiddleware against the app in-process and report '
+        'per-endpoint latency, optionally compared with a report from another code version. Unsafe requests '
+        'write to the configured database; use --read-only or a disposable database. Entries whose body had '
+        'credentials redacted (login, token refresh, logout) are skipped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', help='JSONL file written by RequestCaptureMiddleware.')
+        parser.add_argument('--concurrency', type=int, default=1, help='Requests in flight at once.')
+        parser.add_argument('--repeat', type=int, default=1, help='Replay the log this many times.')
+        parser.add_argument('--limit', type=int, help='Only replay the first N entries.')
+        parser.add_argument('--read-only', action='store_true', help='Skip POST/PUT/PATCH/DELETE entries.')
+        parser.add_argument('--output', help='Write the JSON report to this file as well.')
+        parser.add_argument('--baseline', help='Report from a previous replay to compare against.')
+        parser.add_argument('--fail-above', type=float,
+                            help='Exit with an error when an endpoint p50 or p99 grows past this ratio.')
+
+    def handle(self, *args, **options):
+        entries = self.load(options['log'], options['limit'], options['read_only']) * options['repeat']
+        if self.skipped:
+            self.stderr.write(f'Skipped {self.skipped} entries with redacted credentials.')
+        if not entries:
+            raise CommandError('No requests to replay.')
+
+        self.tokens = self.issue_tokens({entry['user_id'] for entry in entries} - {None})
+        # The log is replayed as fast as possible; throttling would only measure the 429 path.
+        with override_settings(TOKEN_BUCKET_THROTTLES={}, REQUEST_CAPTURE_PATH=None):
+            # One client per thread so middleware is loaded once, not per request.
+            results = run_concurrently(entries, options['concurrency'], Client, self.replay)
+
+        samples = defaultdict(lambda: ([], [], defaultdict(int)))
+        for name, status, latency_ms, queries in results:
+            latencies, query_counts, statuses = samples[name]
+            latencies.append(latency_ms)
+            query_counts.append(queries)
+            statuses[status] += 1
+
+        endpoints = {}
+        for name, (latencies, query_counts, statuses) in sorted(samples.items()):
+            endpoints[name] = summarize(latencies, query_counts)
+            endpoints[name]['statuses'] = dict(statuses)
+        report = {'vendor': connection.vendor, 'concurrency': options['concurrency'], 'skipped_redacted': self.skipped,
+                  'endpoints': endpoints}
+
+        regressions = []
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                report['comparison'] = compare(endpoints, json.load(handle)['endpoints'])
+            if options['fail_above']:
+                regressions = [
+                    f"{name} {metric} x{delta['ratio']}"
+                    for name, metrics in report['comparison'].items()
+                    for metric, delta in metrics.items()
+                    if metric in ('p50_ms', 'p99_ms') and delta.get('ratio', 0) > options['fail_above']
+                ]
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        self.stdout.write(output)
+        if regressions:
+            raise CommandError('Latency regressions: ' + ', '.join(regressions))
+
+    def load(self, path: str, limit, read_only: bool) -> list:
+        entries = []
+        self.skipped = 0
+        with open(path) as log:
+            for line in log:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if read_only and entry['method'] not in SAFE_METHODS:
+                    continue
+                if is_redacted(entry['body']):
+                    self.skipped += 1
+                    continue
+                entries.append(entry)
+                if limit and len(entries) >= limit:
+                    break
+        return entries
+
+    def issue_tokens(self, user_ids) -> dict:
+        return {user.pk: str(AccessToken.for_user(user)) for user in User.objects.filter(pk__in=user_ids)}
+
+    def replay(self, client, entry):
+        headers = {}
+        token = self.tokens.get(entry['user_id'])
+        if token:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+        path = entry['path'] + (f"?{entry['query']}" if entry['query'] else '')
+        body = json.dumps(entry['body']) if entry['body'] is not None else ''
+
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            started = time.perf_counter()
+            response = client.generic(entry['method'], path, body, content_type='application/json', **headers)
+            latency_ms = (time.perf_counter() - started) * 1000
+        return endpoint_name(entry['method'], entry['path']), response.status_code, latency_ms, recorder.count
@@ -0,0 +1,103 @@
+import json
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from itinerary.models import Itinerary
+from users_app.models import User
+from voyage_craft.benchmarking import compare, summarize
+from voyage_craft.metrics import QueryRecorder
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic catalog at each size and report p50/p99 latency and query counts of the hot endpoints '
+        'as JSON. Flushes the configured database; run it with --settings=voyage_craft.settings_test.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,100000,1000000',
+                            help='Comma-separated destination counts to benchmark.')
+        parser.add_argument('--requests', type=int, default=50, help='Requests per endpoint and size.')
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--output', help='Write the JSON report to this file as well.')
+        parser.add_argument('--baseline', help='Previous JSON report to compare against.')
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        database = connection.settings_dict['NAME']
+        if options['interactive']:
+            answer = input(f"This flushes every table in '{database}'. Type 'yes' to continue: ")
+            if answer != 'yes':
+                raise CommandError('Benchmark cancelled.')
+
+        call_command('migrate', interactive=False, verbosity=0)
+        report = {'vendor': connection.vendor, 'sizes': {}}
+        # Throttling would turn the tail of each run into 429s.
+        with override_settings(TOKEN_BUCKET_THROTTLES={}):
+            for size in sizes:
+                call_command('flush', interactive=False, verbosity=0)
+                started = time.perf_counter()
+                call_command('seed_catalog', destinations=size, users=options['users'], verbosity=0)
+                seconds = time.perf_counter() - started
+                results = self.run_endpoints(options['requests'])
+                report['sizes'][str(size)] = {'seed_seconds': round(seconds, 3), 'endpoints': results}
+
+        if options['baseline']:
+            with open(options['baseline']) as handle:
+                baseline = json.load(handle)
+            report['comparison'] = {
+                size: compare(result['endpoints'], baseline['sizes'][size]['endpoints'])
+                for size, result in report['sizes'].items() if size in baseline.get('sizes', {})
+            }
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                handle.write(output + '\n')
+        self.stdout.write(output)
+
+    def run_endpoints(self, count: int) -> dict:
+        users = list(User.objects.order_by('pk')[:count])
+        clients = []
+        for user in users:
+            client = Client(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+            itinerary_id = Itinerary.objects.filter(user=user).values_list('pk', flat=True).first()
+            clients.append((client, itinerary_id))
+
+        def requests():
+            for index in range(count):
+                yield clients[index % len(clients)]
+
+        preference_payload = json.dumps({'preferences': [
+            {'preference_type': 'climate', 'preference_value': 'Sunny'},
+            {'preference_type': 'landscape', 'preference_value': 'Beach'},
+        ]})
+        endpoints = {
+            'recommended-destinations': lambda client, pk: client.get(reverse('recommended-destinations')),
+            'itinerary-list': lambda client, pk: client.get(reverse('itinerary-list')),
+            'itinerary-detail': lambda client, pk: client.get(reverse('itinerary-detail', args=[pk])),
+            'preferences-write': lambda client, pk: client.post(reverse('preferences'), preference_payload,
+                                                                content_type='application/json'),
+        }
+        return {name: self.measure(call, requests()) for name, call in endpoints.items()}
+
+    def measure(self, call, requests) -> dict:
+        latencies, queries, statuses = [], [], {}
+        for client, itinerary_id in requests:
+            recorder = QueryRecorder()
+            with connection.execute_wrapper(recorder):
+                started = time.perf_counter()
+                response = call(client, itinerary_id)
+                latencies.append((time.perf_counter() - started) * 1000)
+            queries.append(recorder.count)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        summary = summarize(latencies, queries)
+        summary['statuses'] = statuses
+        return summary
@@ -0,0 +1,152 @@
+import random
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from destinations.models import Activity, Destination, WeatherData
+from destinations.utils import CATALOG_NAMESPACE, SNAPSHOT_NAMESPACE
+from itinerary.models import Itinerary, ItineraryStep
+from users_app.models import Preference, User
+from voyage_craft.cache import two_tier_cache
+
+
+def choice_keys(choices) -> list:
+    return [key for key, _ in choices]
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate a synthetic catalog, users with preferences, and itineraries with steps.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--destinations', type=int, default=1000)
+        parser.add_argument('--activities-per-destination', type=int, default=2)
+        parser.add_argument('--weather-months', type=int, default=3, help='Weather rows per destination.')
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--itineraries-per-user', type=int, default=5)
+        parser.add_argument('--steps-per-itinerary', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        with transaction.atomic():
+            destination_ids = self.seed_destinations(options['destinations'])
+            activity_ids = self.seed_activities(destination_ids, options['activities_per_destination'])
+            self.seed_weather(destination_ids, options['weather_months'])
+            user_ids = self.seed_users(options['users'])
+            self.seed_itineraries(user_ids, destination_ids, activity_ids, options['itineraries_per_user'],
+                                  options['steps_per_itinerary'])
+        # bulk_create sends no signals, so invalidate cached catalog reads here.
+        two_tier_cache.bump(CATALOG_NAMESPACE)
+        two_tier_cache.bump(SNAPSHOT_NAMESPACE)
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(destination_ids)} destinations, {len(activity_ids)} activities and {len(user_ids)} users."
+        ))
+
+    def bulk(self, model, objects):
+        created = model.objects.bulk_create(objects, batch_size=self.batch_size)
+        if created and created[0].pk is None:
+            # Backends that cannot return ids from bulk inserts: read them back in insertion order.
+            return list(model.objects.order_by('-pk').values_list('pk', flat=True)[:len(created)])[::-1]
+        return [obj.pk for obj in created]
+
+    def seed_destinations(self, count: int) -> list:
+        rng = self.rng
+        landscapes = choice_keys(Destination.LANDSCAPE_CHOICES)
+        tourism_types = choice_keys(Destination.TOURISM_TYPE_CHOICES)
+        cost_levels = choice_keys(Destination.COST_LEVEL_CHOICES)
+        start = Destination.objects.count()
+
+        def make(index, destination_type, parent_id=None):
+            return Destination(
+                name=f'{destination_type} {start + index}',
+                slug=f'seed-{destination_type.lower()}-{start + index}',
+                description=f'Synthetic {destination_type.lower()} number {start + index}.',
+                type=destination_type,
+                parent_id=parent_id,
+                landscape=rng.choice(landscapes),
+                tourism_type=rng.choice(tourism_types),
+                cost_level=rng.choice(cost_levels),
+                family_friendly=rng.random() < 0.5,
+                accessibility=rng.random() < 0.3,
+            )
+
+        # Roughly 1% regions, 10% cities under regions and the rest POIs under cities.
+        region_count = max(1, count // 100)
+        city_count = max(1, count // 10)
+        poi_count = max(0, count - region_count - city_count)
+        region_ids = self.bulk(Destination, [make(index, 'Region') for index in range(region_count)])
+        city_ids = self.bulk(Destination, [
+            make(region_count + index, 'City', rng.choice(region_ids)) for index in range(city_count)
+        ])
+        poi_ids = self.bulk(Destination, [
+            make(region_count + city_count + index, 'POI', rng.choice(city_ids)) for index in range(poi_count)
+        ])
+        return region_ids + city_ids + poi_ids
+
+    def seed_activities(self, destination_ids: list, per_destination: int) -> list:
+        rng = self.rng
+        weathers = choice_keys(Activity.WEATHER_CHOICES)
+        return self.bulk(Activity, [
+            Activity(
+                name=f'Activity {destination_id}-{index}',
+                suitable_weather=rng.choice(weathers),
+                duration_hours=rng.choice([1, 1.5, 2, 3, 4, 6]),
+                family_friendly=rng.random() < 0.5,
+                accessibility=rng.random() < 0.3,
+                pet_friendly=rng.random() < 0.2,
+                destination_id=destination_id,
+            )
+            for destination_id in destination_ids for index in range(per_destination)
+        ])
+
+    def seed_weather(self, destination_ids: list, months: int):
+        rng = self.rng
+        month_names = choice_keys(WeatherData.MONTH_CHOICES)
+        weathers = choice_keys(WeatherData.WEATHER_CHOICES)
+        self.bulk(WeatherData, [
+            WeatherData(destination_id=destination_id, month=month, weather=rng.choice(weathers))
+            for destination_id in destination_ids for month in rng.sample(month_names, min(months, 12))
+        ])
+
+    def seed_users(self, count: int) -> list:
+        rng = self.rng
+        start = User.objects.count()
+        password = make_password('benchmark')
+        user_ids = self.bulk(User, [
+            User(username=f'seed-user-{start + index}', password=password) for index in range(count)
+        ])
+        preference_types = ['climate', 'landscape', 'tourism_type', 'cost_level', 'trip_duration',
+                            'family_friendly', 'accessibility']
+        self.bulk(Preference, [
+            Preference(user_id=user_id, preference_type=preference_type,
+                       preference_value=rng.choice(Preference.VALID_VALUES[preference_type]))
+            for user_id in user_ids for preference_type in rng.sample(preference_types, 4)
+        ])
+        return user_ids
+
+    def seed_itineraries(self, user_ids, destination_ids, activity_ids, per_user: int, steps: int):
+        rng = self.rng
+        itineraries = []
+        for user_id in user_ids:
+            start_date = date(2025, 1, 1)
+            for index in range(per_user):
+                length = rng.randrange(2, 10)
+                itineraries.append(Itinerary(
+                    user_id=user_id,
+                    name=f'Trip {index}',
+                    description='Synthetic itinerary.',
+                    start_date=start_date,
+                    end_date=start_date + timedelta(days=length),
+                    destination_id=rng.choice(destination_ids),
+                ))
+                start_date += timedelta(days=length + rng.randrange(1, 30))
+        itinerary_ids = self.bulk(Itinerary, itineraries)
+        self.bulk(ItineraryStep, [
+            ItineraryStep(itinerary_id=itinerary_id, step_order=order, stay_duration_hours=rng.choice([2, 4, 8]),
+                          activity_id=rng.choice(activity_ids) if activity_ids else None)
+            for itinerary_id in itinerary_ids for order in range(1, steps + 1)
+        ])
@@ -0,0 +1,177 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Optional dependencies that must stay out of the boot path; load them with voyage_craft.lazy.lazy_import.
+HEAVY_MODULES = ('numpy', 'pandas', 'lxml')
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$')
+
+# Boots Django the way a worker does, timing each phase; -X importtime reports every module on stderr.
+# importtime only sees the import statement, and Django loads settings, models and URLconfs through
+# importlib.import_module, so absolute imports are routed through __import__ first.
+BOOT_SCRIPT = '''
+import importlib, json, sys, time
+from pathlib import Path
+
+import_module = importlib.import_module
+
+def timed_import_module(name, package=None):
+    if package or name.startswith('.'):
+        return import_module(name, package)
+    __import__(name)
+    return sys.modules[name]
+
+importlib.import_module = timed_import_module
+
+started = time.perf_counter()
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+phases = {'settings': time.perf_counter() - started}
+
+mark = time.perf_counter()
+django.setup()
+phases['setup (models, app ready)'] = time.perf_counter() - mark
+
+from django.apps import apps
+from django.utils.module_loading import module_has_submodule
+mark = time.perf_counter()
+for app_config in apps.get_app_configs():
+    if Path(app_config.path).is_relative_to(settings.BASE_DIR):
+        for name in ('views', 'urls'):
+            if module_has_submodule(app_config.module, name):
+                importlib.import_module(f'{app_config.name}.{name}')
+importlib.import_module(settings.ROOT_URLCONF)
+phases['views and urls'] = time.perf_counter() - mark
+
+from django.urls import get_resolver
+mark = time.perf_counter()
+get_resolver().reverse_dict
+phases['url resolver'] = time.perf_counter() - mark
+phases['total'] = time.perf_counter() - started
+print(json.dumps({phase: seconds * 1000 for phase, seconds in phases.items()}))
+'''
+
+
+def parse_importtime(output: str) -> list:
+    """``(module, self_us, cumulative_us, depth)`` for each line of ``-X importtime`` output."""
+    modules = []
+    for line in output.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, indent, name = match.groups()
+            modules.append((name, int(own), int(cumulative), len(indent) // 2))
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        'Boot Django in a fresh interpreter under -X importtime and report where worker start-up goes: '
+        'time per boot phase, import cost of the settings and of each project app\'s models, views and '
+        'urls, and the third-party packages loaded on the way. Import costs belong to whichever module '
+        'imported a dependency first, so a later target shows only what it added.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help='Boots to run; medians are reported.')
+        parser.add_argument('--top', type=int, default=15, help='Third-party packages to list.')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+        parser.add_argument('--log', help='Write the raw -X importtime output of the last boot to this path.')
+        parser.add_argument('--fail-on-heavy', action='store_true',
+                            help=f'Exit with an error if any of {", ".join(HEAVY_MODULES)} is imported at boot.')
+
+    def handle(self, *args, **options):
+        runs = [self.boot(options) for _ in range(max(options['repeat'], 1))]
+        report = self.build_report(runs, options['top'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self.write_report(report)
+
+        if options['fail_on_heavy'] and report['heavy_modules']:
+            raise CommandError(f'Heavy modules imported at boot: {", ".join(report["heavy_modules"])}')
+
+    def boot(self, options) -> dict:
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE}
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT], env=env,
+                                cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if result.returncode:
+            raise CommandError(f'Boot failed:\n{result.stderr[-2000:]}')
+        if options['log']:
+            Path(options['log']).write_text(result.stderr)
+        return {'phases': json.loads(result.stdout.splitlines()[-1]), 'modules': parse_importtime(result.stderr)}
+
+    @staticmethod
+    def targets() -> list:
+        names = [settings.SETTINGS_MODULE]
+        for app_config in apps.get_app_configs():
+            if Path(app_config.path).is_relative_to(settings.BASE_DIR):
+                names += [f'{app_config.name}.{name}' for name in ('models', 'views', 'urls')]
+        return names + [settings.ROOT_URLCONF]
+
+    def build_report(self, runs: list, top: int) -> dict:
+        project = {app_config.name.split('.')[0] for app_config in apps.get_app_configs()
+                   if Path(app_config.path).is_relative_to(settings.BASE_DIR)}
+        project.add(settings.SETTINGS_MODULE.split('.')[0])
+
+        phases = defaultdict(list)
+        cumulative = defaultdict(list)
+        packages = defaultdict(list)
+        loaded = set()
+        for run in runs:
+            for phase, ms in run['phases'].items():
+                phases[phase].append(ms)
+            package_us = defaultdict(int)
+            for name, own, total, depth in run['modules']:
+                cumulative[name].append(total)
+                loaded.add(name)
+                root = name.split('.')[0]
+                if root not in project and root not in sys.stdlib_module_names and not root.startswith('_'):
+                    package_us[root] += own
+            for root, us in package_us.items():
+                packages[root].append(us)
+
+        def median_ms(values):
+            return round(statistics.median(values) / 1000, 2)
+
+        return {
+            'boots': len(runs),
+            'phases_ms': {phase: round(statistics.median(values), 2) for phase, values in phases.items()},
+            'targets_ms': {name: median_ms(cumulative[name]) if name in cumulative else None
+                           for name in dict.fromkeys(self.targets())},
+            'third_party_ms': dict(sorted(((root, median_ms(values)) for root, values in packages.items()),
+                                          key=lambda item: item[1], reverse=True)[:top]),
+            'heavy_modules': sorted(name for name in HEAVY_MODULES if name in loaded),
+        }
+
+    def write_report(self, report: dict):
+        self.stdout.write(f'Boot phases (median of {report["boots"]}):')
+        for phase, ms in report['phases_ms'].items():
+            self.stdout.write(f'  {phase:<28} {ms:>9.2f} ms')
+
+        self.stdout.write('Project modules (cumulative import time):')
+        for name, ms in report['targets_ms'].items():
+            shown = f'{ms:>9.2f} ms' if ms is not None else '   loaded earlier or missing'
+            self.stdout.write(f'  {name:<40} {shown}')
+
+        self.stdout.write('Third-party packages (own import time):')
+        for root, ms in report['third_party_ms'].items():
+            self.stdout.write(f'  {root:<40} {ms:>9.2f} ms')
+
+        if report['heavy_modules']:
+            self.stdout.write(self.style.WARNING(
+                f'Heavy modules imported at boot: {", ".join(report["heavy_modules"])}; '
+                'use voyage_craft.lazy.lazy_import'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'None of {", ".join(HEAVY_MODULES)} is imported at boot.'))
@@ -0,0 +1,21 @@
+# Generated by Django 5.1 on 2026-10-19 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destinations', '0004_activity_created_at_activity_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['updated_at'], name='destinations_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='weatherdata',
+            index=models.Index(fields=['updated_at'], name='weather_data_updated_idx'),
+        ),
+    ]
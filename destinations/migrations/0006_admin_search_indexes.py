@@ -0,0 +1,25 @@
+# Generated by Django 5.1 on 2026-10-19 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destinations', '0005_updated_at_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activity',
+            index=models.Index(fields=['name'], name='activities_name_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['name'], name='destinations_name_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddIndex(
+            model_name='destination',
+            index=models.Index(fields=['type'], name='destinations_type_idx'),
+        ),
+    ]
@@ -53,6 +53,12 @@ class Destination(models.Model):
 
     class Meta:
         db_table = 'destinations'
+        indexes = [
+            models.Index(fields=['updated_at'], name='destinations_updated_idx'),
+            # pattern_ops lets PostgreSQL use the index for the admin's prefix search (LIKE 'abc%').
+            models.Index(fields=['name'], name='destinations_name_idx', opclasses=['varchar_pattern_ops']),
+            models.Index(fields=['type'], name='destinations_type_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
@@ -90,6 +96,9 @@ class Activity(models.Model):
 
     class Meta:
         db_table = 'activities'
+        indexes = [
+            models.Index(fields=['name'], name='activities_name_idx', opclasses=['varchar_pattern_ops']),
+        ]
 
 
 class WeatherData(models.Model):
@@ -129,3 +138,6 @@ class WeatherData(models.Model):
 
     class Meta:
         db_table = 'weather_data'
+        indexes = [
+            models.Index(fields=['updated_at'], name='weather_data_updated_idx'),
+        ]
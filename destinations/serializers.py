@@ -1,11 +1,17 @@
-from .models import Destination
+from .models import Activity, Destination
 from rest_framework import serializers
+from voyage_craft.sparse import SparseFieldsSerializerMixin
 
 
-class DestinationSerializer(serializers.ModelSerializer):
+class DestinationSerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Destination
         fields = ['id', 'name', 'description', 'type', 'landscape', 'tourism_type', 'cost_level', 'family_friendly',
                   'accessibility']
 
 
+class ActivitySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Activity
+        fields = ['id', 'name', 'description', 'suitable_weather', 'duration_hours', 'pet_friendly', 'family_friendly',
+                  'accessibility', 'destination']
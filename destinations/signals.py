@@ -0,0 +1,28 @@
+import copy
+import functools
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from voyage_craft.cache import two_tier_cache
+from .bitmap import apply_change
+from .models import Activity, Destination, WeatherData
+from .tasks import schedule_snapshot
+from .utils import CATALOG_NAMESPACE, SNAPSHOT_NAMESPACE
+
+
+@receiver([post_save, post_delete], sender=Destination)
+@receiver([post_save, post_delete], sender=Activity)
+@receiver([post_save, post_delete], sender=WeatherData)
+def catalog_changed(sender, instance, signal, **kwargs):
+    # A copy: deleting clears the instance's pk before the transaction commits.
+    transaction.on_commit(functools.partial(publish_change, sender, copy.copy(instance), signal is post_delete))
+
+
+def publish_change(sender, instance, deleted: bool):
+    # Bumped once committed: a worker rebuilding meanwhile would otherwise cache the old rows under the new version.
+    two_tier_cache.bump(CATALOG_NAMESPACE)
+    if sender is not Activity:
+        apply_change(sender, instance, deleted, two_tier_cache.bump(SNAPSHOT_NAMESPACE))
+        schedule_snapshot()
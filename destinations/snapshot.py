@@ -0,0 +1,216 @@
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+
+from voyage_craft.cache import two_tier_cache
+from voyage_craft.lazy import lazy_import
+from .models import Destination, WeatherData
+from .utils import SNAPSHOT_NAMESPACE
+
+np = lazy_import('numpy')
+
+MAGIC = b'VCCATALOG1\n'
+ALIGNMENT = 64
+
+# Categorical columns stored as uint8 codes into their model choices.
+CATEGORICAL_COLUMNS = {
+    'type': Destination.TYPE_CHOICES,
+    'landscape': Destination.LANDSCAPE_CHOICES,
+    'tourism_type': Destination.TOURISM_TYPE_CHOICES,
+    'cost_level': Destination.COST_LEVEL_CHOICES,
+}
+FLAG_COLUMNS = ('family_friendly', 'accessibility')
+# Bit i of a destination's climate is set when any month has WEATHER_CHOICES[i].
+CLIMATES = [key for key, _ in WeatherData.WEATHER_CHOICES]
+
+
+def align(size: int) -> int:
+    return -(-size // ALIGNMENT) * ALIGNMENT
+
+
+def snapshot_path() -> str:
+    return getattr(settings, 'CATALOG_SNAPSHOT_PATH', None)
+
+
+def catalog_arrays() -> dict:
+    """The catalog as NumPy columns, one row per destination ordered by id."""
+    rows = list(Destination.objects.order_by('pk').values_list(
+        'pk', 'name', *CATEGORICAL_COLUMNS, *FLAG_COLUMNS
+    ).iterator(chunk_size=5000))
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    arrays = {'ids': ids}
+
+    for offset, (column, choices) in enumerate(CATEGORICAL_COLUMNS.items(), start=2):
+        codes = {key: code for code, (key, _) in enumerate(choices)}
+        # Values outside the choices (never validated on save) get the code one past the last.
+        arrays[column] = np.fromiter((codes.get(row[offset], len(codes)) for row in rows), dtype=np.uint8,
+                                     count=len(rows))
+    for offset, column in enumerate(FLAG_COLUMNS, start=2 + len(CATEGORICAL_COLUMNS)):
+        arrays[column] = np.fromiter((row[offset] for row in rows), dtype=np.bool_, count=len(rows))
+
+    climate = np.zeros(len(rows), dtype=np.uint8)
+    bits = {weather: 1 << index for index, weather in enumerate(CLIMATES)}
+    pairs = list(WeatherData.objects.values_list('destination_id', 'weather').distinct())
+    if pairs and len(ids):
+        destination_ids = np.fromiter((pair[0] for pair in pairs), dtype=np.int64, count=len(pairs))
+        weather_bits = np.fromiter((bits.get(pair[1], 0) for pair in pairs), dtype=np.uint8, count=len(pairs))
+        index = np.minimum(np.searchsorted(ids, destination_ids), len(ids) - 1)
+        # Weather of destinations created after the destinations were read is left out.
+        known = ids[index] == destination_ids
+        np.bitwise_or.at(climate, index[known], weather_bits[known])
+    arrays['climate'] = climate
+
+    names = [row[1].encode() for row in rows]
+    arrays['name_offsets'] = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in names], out=arrays['name_offsets'][1:])
+    arrays['names'] = np.frombuffer(b''.join(names), dtype=np.uint8)
+    return arrays
+
+
+def write_snapshot(path: str, arrays: dict, version: int = None, catalog_version: int = None) -> int:
+    """
+    Write ``arrays`` to ``path`` and return the snapshot's version.
+
+    ``catalog_version`` is the ``SNAPSHOT_NAMESPACE`` version the data is at
+    least as new as; readers use the snapshot as current when it still is.
+
+    The file is written next to ``path`` and moved over it with
+    ``os.replace``, so readers see either the old or the new snapshot, never
+    a partial one; processes still mapping the old file keep reading it.
+    """
+    version = time.time_ns() if version is None else version
+    header = {'version': version, 'catalog_version': catalog_version, 'count': len(arrays['ids']), 'arrays': {},
+              'categories': {column: [key for key, _ in choices] for column, choices in CATEGORICAL_COLUMNS.items()},
+              'climates': CLIMATES}
+    offset = 0
+    for name, array in arrays.items():
+        header['arrays'][name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset += align(array.nbytes)
+    encoded = json.dumps(header).encode()
+    data_start = align(len(MAGIC) + 4 + len(encoded))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.catalog-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(MAGIC + struct.pack('<I', len(encoded)) + encoded)
+            for name, array in arrays.items():
+                file.seek(data_start + header['arrays'][name]['offset'])
+                file.write(np.ascontiguousarray(array).tobytes())
+            file.truncate(data_start + offset)
+            file.flush()
+            os.fsync(file.fileno())
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return version
+
+
+def build_snapshot(path: str = None) -> 'CatalogSnapshot':
+    path = path or snapshot_path()
+    # Read before the catalog, so a change made while building leaves the snapshot marked as older; changes
+    # bump the version once committed, so the rows read next are at least as new as it.
+    catalog_version = two_tier_cache.version(SNAPSHOT_NAMESPACE)
+    write_snapshot(path, catalog_arrays(), catalog_version=catalog_version)
+    return CatalogSnapshot(path)
+
+
+class CatalogSnapshot:
+    """
+    Read-only view of a snapshot file, mapped with ``np.memmap``.
+
+    Every column is a zero-copy view of the shared mapping, so the pages are
+    held once in the OS page cache however many workers map the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stat = os.stat(path)
+        self.buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(self.buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f'{path} is not a catalog snapshot')
+        (length,) = struct.unpack('<I', bytes(self.buffer[len(MAGIC):len(MAGIC) + 4]))
+        self.header = json.loads(bytes(self.buffer[len(MAGIC) + 4:len(MAGIC) + 4 + length]))
+        data_start = align(len(MAGIC) + 4 + length)
+
+        self.arrays = {}
+        for name, spec in self.header['arrays'].items():
+            dtype, shape = np.dtype(spec['dtype']), tuple(spec['shape'])
+            start = data_start + spec['offset']
+            count = int(np.prod(shape))
+            self.arrays[name] = np.frombuffer(self.buffer, dtype=dtype, count=count, offset=start).reshape(shape)
+
+    @property
+    def version(self) -> int:
+        return self.header['version']
+
+    def __len__(self) -> int:
+        return self.header['count']
+
+    def __getitem__(self, column: str):
+        return self.arrays[column]
+
+    def code(self, column: str, value) -> int:
+        """The uint8 code of ``value`` in a categorical column, or -1 when no destination can have it."""
+        categories = self.header['categories'][column]
+        return categories.index(value) if value in categories else -1
+
+    def climate_bit(self, weather: str) -> int:
+        climates = self.header['climates']
+        return 1 << climates.index(weather) if weather in climates else 0
+
+    def index_of(self, destination_id: int) -> int:
+        ids = self.arrays['ids']
+        index = int(np.searchsorted(ids, destination_id))
+        return index if index < len(ids) and ids[index] == destination_id else -1
+
+    def name(self, index: int) -> str:
+        offsets = self.arrays['name_offsets']
+        return bytes(self.arrays['names'][offsets[index]:offsets[index + 1]]).decode()
+
+    def is_current(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        return (stat.st_ino, stat.st_mtime_ns) == (self.stat.st_ino, self.stat.st_mtime_ns)
+
+
+_current = {'snapshot': None, 'checked_at': 0.0}
+_lock = threading.Lock()
+
+
+def current_snapshot():
+    """
+    This process's mapping of ``CATALOG_SNAPSHOT_PATH``, or None when there is none.
+
+    The file is checked for a newer version at most every
+    ``CATALOG_SNAPSHOT_CHECK_INTERVAL`` seconds; a replaced file is mapped
+    again and the old mapping is released once no caller holds it.
+    """
+    path = snapshot_path()
+    if not path:
+        return None
+    now = time.monotonic()
+    snapshot = _current['snapshot']
+    if snapshot is not None and snapshot.path == path and \
+            now - _current['checked_at'] < getattr(settings, 'CATALOG_SNAPSHOT_CHECK_INTERVAL', 5):
+        return snapshot
+
+    with _lock:
+        snapshot = _current['snapshot']
+        if snapshot is None or snapshot.path != path or not snapshot.is_current():
+            try:
+                snapshot = CatalogSnapshot(path)
+            except FileNotFoundError:
+                snapshot = None
+        _current.update(snapshot=snapshot, checked_at=now)
+    return snapshot
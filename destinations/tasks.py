@@ -0,0 +1,15 @@
+from jobs.registry import task
+from .snapshot import build_snapshot, snapshot_path
+
+
+@task('destinations.build_catalog_snapshot')
+def build_catalog_snapshot():
+    """Rebuild the catalog snapshot at CATALOG_SNAPSHOT_PATH; workers map the new one within seconds."""
+    if snapshot_path():
+        build_snapshot()
+
+
+def schedule_snapshot():
+    """Queue a snapshot rebuild; changes made before a worker picks it up share the one job."""
+    if snapshot_path():
+        build_catalog_snapshot.enqueue(dedup_key=build_catalog_snapshot.task_name)
@@ -1,11 +1,34 @@
-from django.test import TestCase
-from rest_framework.test import APIClient, APITestCase
+import io
+import json
+import os
+import random
+import tempfile
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.test.utils import CaptureQueriesContext
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory, APITestCase, force_authenticate
 from rest_framework import status
 from django.contrib.auth import get_user_model
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import Destination, WeatherData
+from .bitmap import BitmapIndex, UnsupportedQuery, destination_index
+from .models import Activity, Destination, WeatherData
+from .snapshot import CatalogSnapshot, build_snapshot, current_snapshot
+from itinerary.models import Itinerary, ItineraryStep
+from jobs.models import Job
 from users_app.models import Preference
 from .views import DestinationRecommendationView
+from voyage_craft.cache import two_tier_cache
+from voyage_craft.throttling import bucket_store
+from .utils import CATALOG_NAMESPACE, SNAPSHOT_NAMESPACE, build_flexible_query, build_relevance_conditions, \
+    build_strict_query, build_type_query, get_user_preferences
 
 User = get_user_model()
 
@@ -149,3 +172,702 @@ class DestinationRecommendationUnauthorizedTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertIn('detail', response.data)
         self.assertEqual(response.data['detail'], 'Authentication credentials were not provided.')
+
+
+class DestinationRecommendationETagTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        self.destination = Destination.objects.create(
+            name='Test Destination 1',
+            type='City',
+            landscape='Urban',
+            tourism_type='Cultural',
+            cost_level='Medium',
+            family_friendly=True,
+            accessibility=True
+        )
+        Preference.objects.create(user=self.user, preference_type='cost_level', preference_value='Medium')
+
+    def test_matching_etag_returns_not_modified(self):
+        """
+        Given: an authenticated user who already fetched their recommendations, with a shared cache
+        When: the user requests them again with the returned ETag in If-None-Match
+        Then: the response should be 304 without a body
+        And: the check should not query the database
+        """
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+        }):
+            response = self.client.get('/api/v1/recommended-destinations/')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            etag = response['ETag']
+
+            with self.assertNumQueries(0):
+                response = self.client.get('/api/v1/recommended-destinations/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+    def test_per_process_cache_validates_against_the_catalog_tables(self):
+        """
+        Given: a per-process memory cache and a user with a cached ETag
+        When: another worker changes a destination, which this worker's catalog version never sees
+        Then: the same If-None-Match should return a fresh 200 response
+        """
+        etag = self.client.get('/api/v1/recommended-destinations/')['ETag']
+        version = two_tier_cache.version(CATALOG_NAMESPACE)
+
+        Destination.objects.filter(pk=self.destination.pk).update(
+            name='Renamed', updated_at=self.destination.updated_at + timedelta(minutes=1)
+        )
+        response = self.client.get('/api/v1/recommended-destinations/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(two_tier_cache.version(CATALOG_NAMESPACE), version)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_catalog_change_invalidates_etag(self):
+        """
+        Given: an authenticated user with a cached ETag
+        When: a destination is added
+        Then: the catalog version should only change once the transaction commits
+        And: the same If-None-Match should then return a fresh 200 response
+        """
+        etag = self.client.get('/api/v1/recommended-destinations/')['ETag']
+        version = two_tier_cache.version(CATALOG_NAMESPACE)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Destination.objects.create(name='Another', type='City', landscape='Urban', tourism_type='Cultural',
+                                       cost_level='Low')
+            self.assertEqual(two_tier_cache.version(CATALOG_NAMESPACE), version)
+        response = self.client.get('/api/v1/recommended-destinations/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_fields_change_etag(self):
+        """
+        Given: an authenticated user with the ETag of their full recommendations
+        When: the user requests only some fields with that ETag in If-None-Match
+        Then: the response should be a fresh 200 with its own ETag
+        """
+        etag = self.client.get('/api/v1/recommended-destinations/')['ETag']
+
+        response = self.client.get('/api/v1/recommended-destinations/?fields=id,name', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data[0]), {'id', 'name'})
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_preference_change_invalidates_etag(self):
+        """
+        Given: an authenticated user with a cached ETag
+        When: the user changes a preference
+        Then: the same If-None-Match should return a fresh 200 response
+        """
+        etag = self.client.get('/api/v1/recommended-destinations/')['ETag']
+
+        preference = Preference.objects.get(user=self.user)
+        preference.preference_value = 'Low'
+        preference.save()
+        response = self.client.get('/api/v1/recommended-destinations/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(TOKEN_BUCKET_THROTTLES={'recommendations': {'rate': '1/min', 'burst': 2}})
+class DestinationRecommendationThrottleTests(TestCase):
+    def setUp(self):
+        bucket_store.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+        Preference.objects.create(user=self.user, preference_type='cost_level', preference_value='Medium')
+
+    def tearDown(self):
+        bucket_store.clear()
+
+    def test_requests_over_the_burst_are_throttled(self):
+        """
+        Given: an authenticated user with a bucket of two requests
+        When: the user requests recommendations three times in a row
+        Then: the third response should be 429 with a Retry-After header
+        And: other users should not be affected
+        """
+        for _ in range(2):
+            response = self.client.get('/api/v1/recommended-destinations/')
+            self.assertNotEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        response = self.client.get('/api/v1/recommended-destinations/')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertTrue(0 < int(response['Retry-After']) <= 60)
+
+        other_user = User.objects.create_user(username='otheruser', password='testpassword')
+        self.client.force_authenticate(user=other_user)
+        response = self.client.get('/api/v1/recommended-destinations/')
+        self.assertNotEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+class SeedCatalogCommandTests(TestCase):
+
+    def test_seed_catalog_builds_a_hierarchy(self):
+        """
+        Given: an empty database
+        When: seed_catalog generates 200 destinations and 3 users
+        Then: every city should hang off a region and every POI off a city
+        And: activities, weather rows, preferences, itineraries and steps should be created
+        """
+        call_command('seed_catalog', destinations=200, users=3, itineraries_per_user=2, steps_per_itinerary=3,
+                     verbosity=0)
+
+        self.assertEqual(Destination.objects.count(), 200)
+        self.assertEqual(Destination.objects.filter(type='Region').count(), 2)
+        self.assertFalse(Destination.objects.filter(type='City').exclude(parent__type='Region').exists())
+        self.assertFalse(Destination.objects.filter(type='POI').exclude(parent__type='City').exists())
+        self.assertEqual(Activity.objects.count(), 400)
+        self.assertEqual(WeatherData.objects.count(), 600)
+        self.assertEqual(Preference.objects.count(), 12)
+        self.assertEqual(Itinerary.objects.count(), 6)
+        self.assertEqual(ItineraryStep.objects.count(), 18)
+
+
+class StartupProfileCommandTests(SimpleTestCase):
+
+    def test_startup_profile_reports_phases_modules_and_packages(self):
+        """
+        Given: the project settings
+        When: startup_profile boots Django once in a fresh interpreter
+        Then: it should report the boot phases and the import cost of each app's models, views and urls
+        And: Django should appear among the third-party packages while numpy, pandas and lxml stay unloaded
+        """
+        out = io.StringIO()
+        call_command('startup_profile', repeat=1, json=True, fail_on_heavy=True, stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertGreater(report['phases_ms']['total'], 0)
+        for app in ('destinations', 'itinerary', 'users_app'):
+            for module in ('models', 'views', 'urls'):
+                self.assertIsNotNone(report['targets_ms'][f'{app}.{module}'])
+        self.assertIn('django', report['third_party_ms'])
+        self.assertEqual(report['heavy_modules'], [])
+
+
+class AsyncDestinationRecommendationViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        Destination.objects.create(name='Urban', type='City', landscape='Urban', tourism_type='Cultural',
+                                   cost_level='Medium', family_friendly=True, accessibility=True)
+        Destination.objects.create(name='Beach', type='POI', landscape='Beach', tourism_type='Relaxation',
+                                   cost_level='Medium')
+        Preference.objects.create(user=self.user, preference_type='cost_level', preference_value='Medium')
+        Preference.objects.create(user=self.user, preference_type='landscape', preference_value='Urban')
+
+    async def test_async_view_matches_sync_view(self):
+        """
+        Given: an authenticated user with preferences
+        When: the user requests recommendations from the sync and async endpoints
+        Then: both should return the same destinations and ETag
+        And: the async ETag should answer a conditional request with 304
+        """
+        sync_response = await self.async_client.get('/api/v1/recommended-destinations/', headers=self.headers)
+        response = await self.async_client.get('/api/v1/async/recommended-destinations/', headers=self.headers)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), sync_response.json())
+        self.assertEqual(response['ETag'], sync_response['ETag'])
+
+        response = await self.async_client.get('/api/v1/async/recommended-destinations/',
+                                               headers={**self.headers, 'If-None-Match': sync_response['ETag']})
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_async_view_requires_a_token(self):
+        """
+        Given: no credentials or a malformed token
+        When: requesting the async recommendations
+        Then: a 401 status code should be returned with a WWW-Authenticate header
+        """
+        response = await self.async_client.get('/api/v1/async/recommended-destinations/')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertTrue(response['WWW-Authenticate'].startswith('Bearer'))
+
+        response = await self.async_client.get('/api/v1/async/recommended-destinations/',
+                                               headers={'Authorization': 'Bearer not-a-token'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()['code'], 'token_not_valid')
+
+
+class DestinationRecommendationCacheTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        Destination.objects.create(name='Urban', type='City', landscape='Urban', tourism_type='Cultural',
+                                   cost_level='Medium')
+        self.users = [User.objects.create_user(username=f'user{index}', password='testpassword') for index in range(2)]
+        for user in self.users:
+            Preference.objects.create(user=user, preference_type='cost_level', preference_value='Medium')
+
+    def test_users_with_the_same_preferences_share_cached_recommendations(self):
+        """
+        Given: two users with identical preferences
+        When: the second user requests recommendations after the first
+        Then: the destinations should come from the cache without querying the catalog
+        And: a catalog change should be visible on the next request
+        """
+        self.client.force_authenticate(user=self.users[0])
+        with CaptureQueriesContext(connection) as first_queries:
+            first = self.client.get('/api/v1/recommended-destinations/')
+
+        self.client.force_authenticate(user=self.users[1])
+        with CaptureQueriesContext(connection) as second_queries:
+            second = self.client.get('/api/v1/recommended-destinations/')
+
+        self.assertEqual(second.json(), first.json())
+        # Only the recommendation queries themselves (EXISTS and the ordered SELECT) are skipped.
+        self.assertEqual(len(second_queries), len(first_queries) - 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Destination.objects.create(name='Another', type='City', landscape='Urban', tourism_type='Cultural',
+                                       cost_level='Medium')
+        response = self.client.get('/api/v1/recommended-destinations/')
+        self.assertEqual(len(response.json()), 2)
+
+
+    def test_errors_are_not_cached(self):
+        """
+        Given: a recommendation request that fails with a 500
+        When: the same preferences are requested again
+        Then: the recommendations should be computed again instead of replaying the error
+        """
+        class FlakyRecommendationView(DestinationRecommendationView):
+            failures = [Response({'error': 'database unavailable'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)]
+
+            def build_recommendations(self, user_preferences, fields=None):
+                return self.failures.pop() if self.failures else super().build_recommendations(user_preferences,
+                                                                                                 fields)
+
+        view = FlakyRecommendationView.as_view()
+        request = APIRequestFactory().get('/api/v1/recommended-destinations/')
+        force_authenticate(request, user=self.users[0])
+
+        self.assertEqual(view(request).status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(view(request).status_code, status.HTTP_200_OK)
+
+
+class DestinationSparseFieldsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        Preference.objects.create(user=self.user, preference_type='cost_level', preference_value='Medium')
+        Destination.objects.create(name='Urban', description='A long description', type='City',
+                                   landscape='Urban', tourism_type='Cultural', cost_level='Medium')
+        self.client.force_authenticate(user=self.user)
+
+    def test_fields_limits_the_response_and_the_selected_columns(self):
+        """
+        Given: a user whose preferences match one destination
+        When: the user requests recommendations with ?fields=id,name
+        Then: only those keys should be returned
+        And: the description column should not be read
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/recommended-destinations/', {'fields': 'id,name'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json(), [{'id': response.json()[0]['id'], 'name': 'Urban'}])
+        catalog_sql = [query['sql'] for query in queries if 'FROM "destinations"' in query['sql']]
+        self.assertTrue(catalog_sql)
+        self.assertFalse(any('"description"' in sql for sql in catalog_sql))
+
+        full = self.client.get('/api/v1/recommended-destinations/')
+        self.assertEqual(full.json()[0]['description'], 'A long description')
+
+    def test_unknown_fields_are_rejected(self):
+        """
+        Given: an authenticated user
+        When: the user requests a field the serializer does not have
+        Then: the response should be 400 naming the field
+        """
+        response = self.client.get('/api/v1/recommended-destinations/', {'fields': 'id,secret'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'fields': ['Unknown field: secret.']})
+
+    async def test_async_view_applies_fields(self):
+        """
+        Given: a user with a JWT
+        When: the user requests async recommendations with ?fields=
+        Then: known fields should trim the response and unknown ones should be a 400
+        """
+        headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.user).access_token}'}
+        response = await self.async_client.get('/api/v1/async/recommended-destinations/', {'fields': 'name'},
+                                               headers=headers)
+        self.assertEqual(response.json(), [{'name': 'Urban'}])
+
+        response = await self.async_client.get('/api/v1/async/recommended-destinations/', {'fields': 'secret'},
+                                               headers=headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {'fields': ['Unknown field: secret.']})
+
+
+class MultiGetViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=User.objects.create_user(username='testuser', password='testpassword'))
+        self.destinations = [
+            Destination.objects.create(name=f'Destination {index}', type='City', landscape='Urban',
+                                       tourism_type='Cultural', cost_level='Medium')
+            for index in range(3)
+        ]
+        self.activity = Activity.objects.create(name='Museum', duration_hours=2, destination=self.destinations[0])
+
+    def test_destinations_are_fetched_in_one_query_and_then_cached(self):
+        """
+        Given: three destinations, one of them already requested
+        When: a client requests all of them plus an unknown id
+        Then: only the two uncached ones should be loaded, in a single query
+        And: the results should be keyed by id, with null for the unknown one
+        """
+        first, second, third = (destination.pk for destination in self.destinations)
+        self.client.get('/api/v1/destinations/batch/', {'ids': str(first)})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/destinations/batch/', {'ids': f'{first},{second},{third},999999'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.json()), [str(first), str(second), str(third), '999999'])
+        self.assertEqual(response.json()[str(second)]['name'], 'Destination 1')
+        self.assertIsNone(response.json()['999999'])
+        catalog_queries = [query['sql'] for query in queries if 'FROM "destinations"' in query['sql']]
+        self.assertEqual(len(catalog_queries), 1)
+        loaded_ids = catalog_queries[0].split(' IN (')[1].split(')')[0].split(', ')
+        self.assertEqual(sorted(loaded_ids), sorted([str(second), str(third), '999999']))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/v1/destinations/batch/', {'ids': f'{first},{second},{third}'})
+        self.assertFalse([query for query in queries if 'FROM "destinations"' in query['sql']])
+
+    def test_activities_follow_catalog_changes(self):
+        """
+        Given: a cached activity
+        When: the activity is renamed
+        Then: the next batched lookup should return the new name
+        """
+        self.client.get('/api/v1/activities/batch/', {'ids': str(self.activity.pk)})
+        self.activity.name = 'Gallery'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.activity.save()
+
+        response = self.client.get('/api/v1/activities/batch/', {'ids': str(self.activity.pk)})
+        self.assertEqual(response.json()[str(self.activity.pk)]['name'], 'Gallery')
+
+    @override_settings(MULTI_GET_MAX_IDS=2)
+    def test_invalid_or_too_many_ids_are_rejected(self):
+        """
+        Given: a limit of two ids per request
+        When: a client sends no ids, a non-integer id or three ids
+        Then: each request should be answered with 400
+        """
+        for ids in ('', '1,x', '1,2,3'):
+            response = self.client.get('/api/v1/destinations/batch/', {'ids': ids})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, ids)
+
+
+class CatalogSnapshotTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'catalog.snap')
+        self.beach = Destination.objects.create(name='Playa Dorada', type='POI', landscape='Beach',
+                                                tourism_type='Relaxation', cost_level='Low', family_friendly=True)
+        self.city = Destination.objects.create(name='Zürich', type='City', landscape='Urban',
+                                               tourism_type='Cultural', cost_level='High', accessibility=True)
+        WeatherData.objects.create(destination=self.beach, month='July', weather='Sunny')
+        WeatherData.objects.create(destination=self.beach, month='August', weather='Hot')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_snapshot_round_trips_the_catalog(self):
+        """
+        Given: two destinations, one with weather data
+        When: the snapshot command writes the catalog and it is mapped again
+        Then: ids, codes, flags, climates and names should match the database
+        """
+        out = io.StringIO()
+        call_command('build_catalog_snapshot', path=self.path, stdout=out)
+        self.assertIn('2 destinations', out.getvalue())
+
+        snapshot = CatalogSnapshot(self.path)
+        beach, city = snapshot.index_of(self.beach.pk), snapshot.index_of(self.city.pk)
+        self.assertEqual(list(snapshot['ids']), sorted([self.beach.pk, self.city.pk]))
+        self.assertEqual(snapshot['landscape'][beach], snapshot.code('landscape', 'Beach'))
+        self.assertEqual(snapshot['cost_level'][city], snapshot.code('cost_level', 'High'))
+        self.assertEqual([bool(snapshot['family_friendly'][beach]), bool(snapshot['accessibility'][city])],
+                         [True, True])
+        self.assertEqual(snapshot['climate'][beach], snapshot.climate_bit('Sunny') | snapshot.climate_bit('Hot'))
+        self.assertEqual(snapshot['climate'][city], 0)
+        self.assertEqual([snapshot.name(beach), snapshot.name(city)], ['Playa Dorada', 'Zürich'])
+        self.assertEqual(snapshot.index_of(999999), -1)
+
+    def test_workers_switch_to_a_new_snapshot_atomically(self):
+        """
+        Given: a mapped snapshot
+        When: a new destination is saved and a new snapshot is published
+        Then: a rebuild job should be queued once the save commits
+        And: the process should map the new file on its next check
+        And: the old mapping should stay readable
+        """
+        with override_settings(CATALOG_SNAPSHOT_PATH=self.path, CATALOG_SNAPSHOT_CHECK_INTERVAL=0):
+            build_snapshot()
+            old = current_snapshot()
+            self.assertIs(current_snapshot(), old)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Destination.objects.create(name='Andes', type='Region', landscape='Mountains',
+                                           tourism_type='Adventure', cost_level='Medium')
+                self.assertFalse(Job.objects.filter(name='destinations.build_catalog_snapshot').exists())
+            self.assertEqual(Job.objects.filter(name='destinations.build_catalog_snapshot').count(), 1)
+            build_snapshot()
+            new = current_snapshot()
+
+        self.assertGreater(new.version, old.version)
+        self.assertEqual((len(old), len(new)), (2, 3))
+        self.assertEqual(old.name(old.index_of(self.city.pk)), 'Zürich')
+        self.assertEqual([name for name in os.listdir(self.directory.name)], ['catalog.snap'])
+
+    def test_snapshot_requires_a_shared_cache(self):
+        """
+        Given: a catalog snapshot path with a per-process memory cache
+        When: the destinations app is loaded
+        Then: it should refuse to start
+        """
+        with override_settings(CATALOG_SNAPSHOT_PATH=self.path):
+            with self.assertRaises(ImproperlyConfigured):
+                apps.get_app_config('destinations').ready()
+
+
+class BitmapIndexTests(TestCase):
+    PROFILES = [
+        {'climate': 'Sunny', 'cost_level': 'Low'},
+        {'climate': 'Sunny', 'landscape': 'Beach', 'tourism_type': 'Cultural'},
+        {'climate': 'Rainy', 'trip_duration': '1-3 days', 'family_friendly': 'True'},
+        {'cost_level': 'High', 'landscape': 'Mountains', 'accessibility': 'False', 'trip_duration': '2 weeks or more'},
+        {'landscape': 'Forest'},
+    ]
+
+    def setUp(self):
+        rng = random.Random(7)
+        for index in range(150):
+            destination = Destination.objects.create(
+                name=f'Destination {index}', type=rng.choice(['City', 'POI', 'Region']),
+                landscape=rng.choice(['Beach', 'Mountains', 'Forest', 'Urban']),
+                tourism_type=rng.choice(['Cultural', 'Adventure', 'Relaxation']),
+                cost_level=rng.choice(['Low', 'Medium', 'High']),
+                family_friendly=rng.random() < 0.5, accessibility=rng.random() < 0.5,
+            )
+            for month in rng.sample(['January', 'April', 'July', 'October'], rng.randint(0, 2)):
+                WeatherData.objects.create(destination=destination, month=month,
+                                           weather=rng.choice(['Sunny', 'Rainy', 'Cold']))
+        self.queries = []
+        for index, preferences in enumerate(self.PROFILES):
+            user = User.objects.create_user(username=f'user{index}', password='testpassword')
+            for preference_type, value in preferences.items():
+                Preference.objects.create(user=user, preference_type=preference_type, preference_value=value)
+            profile = get_user_preferences(user)
+            self.queries.append((build_strict_query(profile), build_type_query(profile),
+                                 build_flexible_query(profile)))
+        self.queries.append((Q(weather_data__weather='Sunny') & Q(weather_data__weather='Rainy'),))
+        self.queries.append((Q(weather_data__weather='Sunny') | Q(weather_data__weather='Cold') | Q(type='POI'),))
+        self.queries.append((~Q(landscape='Beach') & Q(id__gte=Destination.objects.order_by('pk')[75].pk),))
+
+    def database_ids(self, queries):
+        queryset = Destination.objects.all()
+        for query in queries:
+            queryset = queryset.filter(query)
+        return sorted(queryset.distinct().values_list('pk', flat=True))
+
+    def assert_matches_database(self, index):
+        for queries in self.queries:
+            self.assertEqual(sorted(index.candidates(*queries)), self.database_ids(queries), queries)
+
+    def test_index_matches_the_database(self):
+        """
+        Given: a random catalog and the queries built from several preference profiles
+        When: the queries are evaluated by the bitmap index
+        Then: the candidates should be exactly the destinations the database returns, whether the index is
+            loaded from the database or from a snapshot
+        And: two weather conditions in one filter() should match no destination, as in SQL
+        """
+        index = BitmapIndex.from_database()
+        self.assert_matches_database(index)
+        self.assertTrue(any(self.database_ids(queries) for queries in self.queries))
+        with tempfile.TemporaryDirectory() as directory:
+            self.assert_matches_database(BitmapIndex.from_snapshot(build_snapshot(os.path.join(directory, 'c.snap'))))
+        self.assertEqual(index.candidates(self.queries[5][0]), [])
+        with self.assertRaises(UnsupportedQuery):
+            index.candidates(Q(name__startswith='Destination'))
+
+    def test_index_is_maintained_on_catalog_changes(self):
+        """
+        Given: a loaded index
+        When: destinations and weather rows are created, updated and deleted
+        Then: the same index should be updated in place and keep matching the database
+        """
+        index = destination_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            first = Destination.objects.order_by('pk').first()
+            first.landscape, first.cost_level = 'Beach', 'Low'
+            first.save()
+            WeatherData.objects.create(destination=first, month='May', weather='Sunny')
+            Destination.objects.order_by('pk').last().delete()
+            for number in range(80):
+                added = Destination.objects.create(name=f'Added {number}', type='POI', landscape='Beach',
+                                                   tourism_type='Cultural', cost_level='Low')
+                WeatherData.objects.create(destination=added, month='July', weather='Sunny')
+
+        self.assertIs(destination_index(), index)
+        self.assert_matches_database(index)
+
+    def test_index_ranks_by_relevance_up_to_a_limit(self):
+        """
+        Given: a loaded index and the queries and relevance conditions of a profile
+        When: the matches are ranked
+        Then: they should be the database's matches, the ones meeting fewest conditions first
+        And: more matches than the limit should return None
+        """
+        index = BitmapIndex.from_database()
+        queries = self.queries[1]
+        conditions = build_relevance_conditions(get_user_preferences(User.objects.get(username='user1')))
+
+        ranked = index.rank(queries, conditions)
+
+        self.assertEqual(sorted(ranked), self.database_ids(queries))
+        scores = [sum(Destination.objects.filter(condition, pk=pk).exists() for condition in conditions)
+                  for pk in ranked]
+        self.assertEqual(scores, sorted(scores))
+        self.assertGreater(len(set(scores)), 1)
+        self.assertIsNone(index.rank(queries, conditions, limit=len(ranked) - 1))
+
+    def test_activity_changes_keep_the_index(self):
+        """
+        Given: a loaded index
+        When: an activity is saved
+        Then: the catalog namespace should be bumped but not the version the index follows
+        """
+        index = destination_index()
+        snapshot_version = two_tier_cache.version(SNAPSHOT_NAMESPACE)
+        catalog_version = two_tier_cache.version(CATALOG_NAMESPACE)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Activity.objects.create(name='Museum', destination=Destination.objects.first(), suitable_weather='Sunny',
+                                    duration_hours=2)
+
+        self.assertGreater(two_tier_cache.version(CATALOG_NAMESPACE), catalog_version)
+        self.assertEqual(two_tier_cache.version(SNAPSHOT_NAMESPACE), snapshot_version)
+        self.assertIs(destination_index(), index)
+
+    def test_index_requires_a_shared_cache(self):
+        """
+        Given: the bitmap index enabled with a per-process memory cache
+        When: the destinations app is loaded
+        Then: it should refuse to start
+        """
+        with override_settings(RECOMMENDATION_BITMAP_INDEX=True):
+            with self.assertRaises(ImproperlyConfigured):
+                apps.get_app_config('destinations').ready()
+
+    @override_settings(RECOMMENDATION_BITMAP_INDEX=True)
+    def test_recommendations_are_the_same_with_the_index(self):
+        """
+        Given: users with different preferences
+        When: the recommendations are requested with and without the bitmap index
+        Then: the responses should be identical and in the same order, also when more destinations match than the
+        index loads by id
+        """
+        client = APIClient()
+        for user in User.objects.filter(username__startswith='user'):
+            client.force_authenticate(user=user)
+            with override_settings(RECOMMENDATION_BITMAP_INDEX=False):
+                expected = client.get('/api/v1/recommended-destinations/').json()
+            for limit in (1000, 1):
+                two_tier_cache.bump(CATALOG_NAMESPACE)
+                with override_settings(RECOMMENDATION_INDEX_MAX_IDS=limit):
+                    response = client.get('/api/v1/recommended-destinations/').json()
+                self.assertEqual(response, expected)
+
+
+class CatalogAdminTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='password123')
+        self.client.force_login(self.admin)
+        self.region = Destination.objects.create(name='Region', type='Region', landscape='Forest',
+                                                 tourism_type='Nature', cost_level='Low')
+
+    def create_cities(self, count, prefix='City'):
+        Destination.objects.bulk_create([
+            Destination(name=f'{prefix} {index}', slug=f'{prefix.lower()}-{index}', type='City', parent=self.region,
+                        landscape='Urban', tourism_type='Cultural', cost_level='Medium')
+            for index in range(count)
+        ])
+
+    def changelist_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:destinations_destination_changelist'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """
+        Given: destinations whose parent is listed in the changelist
+        When: the changelist is rendered with 5 and then 40 rows
+        Then: both renders should run the same number of queries
+        """
+        self.create_cities(5, prefix='City')
+        few = self.changelist_queries()
+        self.create_cities(35, prefix='Town')
+
+        self.assertEqual(self.changelist_queries(), few)
+
+    def test_parent_uses_autocomplete_widget(self):
+        """
+        Given: the destination change form
+        Then: parent should be an autocomplete field instead of a select listing every destination
+        """
+        response = self.client.get(reverse('admin:destinations_destination_add'))
+
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertNotContains(response, f'<option value="{self.region.pk}">')
+
+    def test_bulk_action_updates_rows_and_invalidates_catalog(self):
+        """
+        Given: cached catalog data and two selected destinations
+        When: the "Mark as family friendly" action runs
+        Then: both rows should be updated with one UPDATE
+        And: the catalog namespace version should be bumped
+        """
+        self.create_cities(2)
+        selected = list(Destination.objects.filter(type='City').values_list('pk', flat=True))
+        version = two_tier_cache.version(CATALOG_NAMESPACE)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:destinations_destination_changelist'),
+                             {'action': 'set_family_friendly_true', '_selected_action': selected})
+
+        self.assertEqual(Destination.objects.filter(pk__in=selected, family_friendly=True).count(), 2)
+        self.assertGreater(two_tier_cache.version(CATALOG_NAMESPACE), version)
+
+    def test_export_streams_csv(self):
+        """
+        Given: a selected destination
+        When: the CSV export action runs
+        Then: a streamed CSV with a header row and one line per row should be returned
+        """
+        response = self.client.post(reverse('admin:destinations_destination_changelist'),
+                                    {'action': 'export_as_csv', '_selected_action': [self.region.pk]})
+
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'name', 'slug'])
+        self.assertEqual(len(lines), 2)
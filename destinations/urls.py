@@ -1,8 +1,13 @@
 from django.urls import path
-from destinations.views import DestinationRecommendationView
+from destinations.views import ActivityMultiGetView, AsyncDestinationRecommendationView, \
+    DestinationMultiGetView, DestinationRecommendationView
 
 urlpatterns = [
     path('recommended-destinations/', DestinationRecommendationView.as_view(), name="recommended-destinations"),
+    path('async/recommended-destinations/', AsyncDestinationRecommendationView.as_view(),
+         name="recommended-destinations-async"),
+    path('destinations/batch/', DestinationMultiGetView.as_view(), name="destinations-batch"),
+    path('activities/batch/', ActivityMultiGetView.as_view(), name="activities-batch"),
 ]
 
 
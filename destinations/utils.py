@@ -1,52 +1,67 @@
-from django.db.models import Q
+from django.db.models import Count, Max, Q
 
-from users_app.models import Preference
+from users_app.models import PreferenceProfile
+from users_app.profile import aget_preference_profile, get_preference_profile
+from voyage_craft.cache import cache_setting, is_shared_cache, two_tier_cache
+from voyage_craft.conditional import make_etag
+from .models import Destination, WeatherData
 
 
-def get_user_preferences(user) -> Preference:
-    return Preference.objects.filter(user=user)
+CATALOG_NAMESPACE = 'catalog'
+# Bumped, besides CATALOG_NAMESPACE, by changes to what the catalog snapshot and the bitmap index hold:
+# destinations and their weather, not activities. Only its version is used.
+SNAPSHOT_NAMESPACE = 'catalog-snapshot'
 
+# Everything the build_* queries read from a profile.
+PROFILE_QUERY_FIELDS = ('landscapes', 'tourism_types', 'climates', 'cost_level', 'trip_duration', 'accessibility',
+                        'family_friendly')
 
-def build_strict_query(user_preferences) -> Q:
+
+def recommendation_cache_key(profile: PreferenceProfile, fields=None) -> str:
+    key = 'recommendations:' + ':'.join(str(getattr(profile, field)) for field in PROFILE_QUERY_FIELDS)
+    return key if fields is None else f'{key}:fields={",".join(fields)}'
+
+
+def get_user_preferences(user) -> PreferenceProfile:
+    return get_preference_profile(user)
+
+
+def build_strict_query(profile: PreferenceProfile) -> Q:
     strict_query = Q()
 
-    for pref in user_preferences:
-        if pref.preference_type == 'accessibility':
-            strict_query &= Q(accessibility=pref.preference_value.strip().lower() == 'true')
-        elif pref.preference_type == 'family_friendly':
-            strict_query &= Q(family_friendly=pref.preference_value.strip().lower() == 'true')
+    if profile.accessibility is not None:
+        strict_query &= Q(accessibility=profile.accessibility)
+    if profile.family_friendly is not None:
+        strict_query &= Q(family_friendly=profile.family_friendly)
 
     return strict_query
 
 
-def build_type_query(user_preferences) -> Q:
+def build_type_query(profile: PreferenceProfile) -> Q:
     type_query = Q()
-    has_duration_pref = False
+    has_duration_pref = profile.trip_duration is not None
 
-    for pref in user_preferences:
-        if pref.preference_type == 'travel_duration':
-            has_duration_pref = True
-            type_query |= build_duration_query(pref.preference_value)
+    if has_duration_pref:
+        type_query |= build_duration_query(profile.trip_duration_value)
 
     return type_query | add_default_type_query(has_duration_pref)
 
 
-def build_flexible_query(user_preferences) -> Q:
+def build_flexible_query(profile: PreferenceProfile) -> Q:
     flexible_query = Q()
     flexible_or_query = Q()
     important_pref_applied = False
 
-    for pref in user_preferences:
-        if pref.preference_type == 'preferred_climate':
-            flexible_query &= Q(weather_data__weather=pref.preference_value)
-            important_pref_applied = True
-        elif pref.preference_type == 'landscape':
-            flexible_or_query |= Q(landscape=pref.preference_value)
-        elif pref.preference_type == 'tourism_type':
-            flexible_or_query |= Q(tourism_type=pref.preference_value)
-        elif pref.preference_type == 'cost_level':
-            flexible_query &= Q(cost_level=pref.preference_value)
-            important_pref_applied = True
+    for climate in profile.climate_values:
+        flexible_query &= Q(weather_data__weather=climate)
+        important_pref_applied = True
+    for landscape in profile.landscape_values:
+        flexible_or_query |= Q(landscape=landscape)
+    for tourism_type in profile.tourism_type_values:
+        flexible_or_query |= Q(tourism_type=tourism_type)
+    if profile.cost_level is not None:
+        flexible_query &= Q(cost_level=profile.cost_level_value)
+        important_pref_applied = True
 
     final_query = flexible_query & flexible_or_query
 
@@ -56,6 +71,21 @@ def build_flexible_query(user_preferences) -> Q:
     return final_query
 
 
+def build_relevance_conditions(profile: PreferenceProfile) -> list:
+    conditions = [Q(weather_data__weather=climate) for climate in profile.climate_values]
+    conditions += [Q(landscape=landscape) for landscape in profile.landscape_values]
+    conditions += [Q(tourism_type=tourism_type) for tourism_type in profile.tourism_type_values]
+    if profile.accessibility is not None:
+        conditions.append(Q(accessibility=profile.accessibility))
+    if profile.family_friendly is not None:
+        conditions.append(Q(family_friendly=profile.family_friendly))
+    if profile.cost_level is not None:
+        conditions.append(Q(cost_level=profile.cost_level_value))
+    if profile.trip_duration is not None:
+        conditions.append(build_duration_query(profile.trip_duration_value))
+    return conditions
+
+
 def build_duration_query(duration_pref: str) -> Q:
     if duration_pref in ['1-3 days', '4-7 days']:
         return Q(type__in=['City', 'POI'])
@@ -68,3 +98,34 @@ def add_default_type_query(has_duration_pref: bool) -> Q:
     if not has_duration_pref:
         return Q(type__in=['City', 'POI', 'Region'])
     return Q()
+
+
+CATALOG_STATE = {'updated': Max('updated_at'), 'count': Count('pk')}
+
+
+def catalog_state() -> tuple:
+    # A per-process cache's version only moves with this worker's own writes, so the tables are read instead.
+    if is_shared_cache(cache_setting('ALIAS')):
+        return (two_tier_cache.version(CATALOG_NAMESPACE),)
+    return (*Destination.objects.aggregate(**CATALOG_STATE).values(),
+            *WeatherData.objects.aggregate(**CATALOG_STATE).values())
+
+
+async def acatalog_state() -> tuple:
+    if is_shared_cache(cache_setting('ALIAS')):
+        return (two_tier_cache.version(CATALOG_NAMESPACE),)
+    return (*(await Destination.objects.aaggregate(**CATALOG_STATE)).values(),
+            *(await WeatherData.objects.aaggregate(**CATALOG_STATE)).values())
+
+
+def profile_etag(profile: PreferenceProfile, catalog: tuple, fields=None) -> str:
+    # The same profile, fields and catalog select the cached body, so they validate it too.
+    return make_etag('recommendations', *catalog, recommendation_cache_key(profile, fields))
+
+
+def recommendation_etag(user, fields=None) -> str:
+    return profile_etag(get_preference_profile(user), catalog_state(), fields)
+
+
+async def arecommendation_etag(user, fields=None) -> str:
+    return profile_etag(await aget_preference_profile(user), await acatalog_state(), fields)
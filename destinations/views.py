@@ -1,90 +1,235 @@
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models.functions import Coalesce
-from django.db.models import Q, When, Case, Sum, IntegerField, Value
-from .models import Destination
-from .utils import get_user_preferences, build_strict_query, build_type_query, build_flexible_query
-from .serializers import DestinationSerializer
+from rest_framework.exceptions import ValidationError
+from django.db.models import Q, When, Case, Exists, IntegerField, OuterRef, Value
+from .bitmap import indexed_recommendations
+from .models import Activity, Destination
+from .utils import get_user_preferences, build_strict_query, build_type_query, build_flexible_query, \
+    build_relevance_conditions, recommendation_etag, arecommendation_etag, recommendation_cache_key, \
+    CATALOG_NAMESPACE
+from .serializers import ActivitySerializer, DestinationSerializer
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated
+from users_app.profile import aget_preference_profile
+from voyage_craft.async_views import AsyncAPIView
+from voyage_craft.cache import two_tier_cache
+from voyage_craft.conditional import ConditionalETagMixin
+from voyage_craft.multiget import MultiGetView
+from voyage_craft.sparse import SparseFieldsetMixin, only_columns, requested_fields, validate_fields
+from voyage_craft.throttling import RecommendationThrottle
+
+logger = logging.getLogger(__name__)
+
+# Recommendation results worth sharing until the catalog changes; errors are recomputed on the next request.
+CACHEABLE_STATUSES = (status.HTTP_200_OK, status.HTTP_404_NOT_FOUND)
+
+
+class UncachedResponse(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def sparse_destinations(queryset, fields):
+    return queryset if fields is None else queryset.only(*only_columns(DestinationSerializer, fields))
+
+
+def filter_recommendations(queryset, queries):
+    # One filter() per query keeps the weather joins separate.
+    for query in queries:
+        queryset = queryset.filter(query)
+    return queryset.distinct()
+
+
+def relevance_term(condition: Q) -> Case:
+    # A condition on related rows counts once per destination, not once per matching weather row.
+    if any(Destination._meta.get_field(name).is_relation for name in condition.referenced_base_fields):
+        condition = Exists(Destination.objects.filter(condition, pk=OuterRef('pk')))
+    return Case(When(condition, then=1), default=0, output_field=IntegerField())
+
+
+def indexed_destinations(destinations_by_id: dict, ranked_ids) -> list:
+    # Destinations deleted since the index was read are left out.
+    return [destinations_by_id[pk] for pk in ranked_ids if pk in destinations_by_id]
 
 
 # views.py
 
-class DestinationRecommendationView(generics.GenericAPIView):
+class DestinationRecommendationView(SparseFieldsetMixin, ConditionalETagMixin, generics.GenericAPIView):
     serializer_class = DestinationSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [RecommendationThrottle]
+
+    def get_etag(self, request, *args, **kwargs):
+        return recommendation_etag(request.user, self.sparse_fields)
 
     def get(self, request, *args, **kwargs) -> Response:
         user = request.user
         user_preferences = get_user_preferences(user)
 
-        if not user_preferences.exists():
+        if not user_preferences.has_preferences:
             return Response({"message": "User has no preferences set."}, status=status.HTTP_400_BAD_REQUEST)
 
-            # Build queries
+        # Users with the same preferences share one cached result until the catalog changes.
+        fields = self.sparse_fields
+        try:
+            data, status_code = two_tier_cache.get_or_set(
+                CATALOG_NAMESPACE, recommendation_cache_key(user_preferences, fields),
+                lambda: self.recommend(user_preferences, fields),
+            )
+        except UncachedResponse as uncached:
+            return uncached.response
+        return Response(data, status=status_code)
+
+    def recommend(self, user_preferences, fields=None) -> tuple:
+        response = self.build_recommendations(user_preferences, fields)
+        if response.status_code not in CACHEABLE_STATUSES:
+            # Raised through get_or_set so that nothing is stored.
+            raise UncachedResponse(response)
+        return response.data, response.status_code
+
+    def build_recommendations(self, user_preferences, fields=None) -> Response:
+        # Build queries
         strict_query = build_strict_query(user_preferences)
         type_query = build_type_query(user_preferences)
         flexible_query = build_flexible_query(user_preferences)
+        queries = (strict_query, type_query, flexible_query)
 
+        destinations = sparse_destinations(Destination.objects.all(), fields)
         try:
-            recommended_destinations = Destination.objects.filter(strict_query)
-            recommended_destinations = recommended_destinations.filter(type_query)
-            recommended_destinations = recommended_destinations.filter(flexible_query)
-            recommended_destinations = recommended_destinations.distinct()
+            # Evaluated here, so that a failing query is answered by the except below.
+            ranked_ids = indexed_recommendations(queries, build_relevance_conditions(user_preferences))
+            if ranked_ids is not None:
+                ordered_destinations = indexed_destinations(destinations.in_bulk(ranked_ids), ranked_ids)
+            else:
+                recommended_destinations = filter_recommendations(destinations, queries)
+                ordered_destinations = list(
+                    self.annotate_and_order_destinations(recommended_destinations, user_preferences)
+                ) if recommended_destinations.exists() else []
 
         except Exception as e:
-            print(f"Error occurred during filtering: {e}")
+            logger.exception("Error occurred during filtering")
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        if not recommended_destinations.exists():
-            return self.handle_no_recommendations()
+        if not ordered_destinations:
+            return self.handle_no_recommendations(fields)
 
-        ordered_destinations = self.annotate_and_order_destinations(recommended_destinations, user_preferences)
-        destination_serializer = DestinationSerializer(ordered_destinations, many=True)
+        destination_serializer = DestinationSerializer(ordered_destinations, many=True, fields=fields)
         return Response(destination_serializer.data, status=status.HTTP_200_OK)
 
     @staticmethod
-    def handle_no_recommendations() -> Response:
-        generic_recommendations = Destination.objects.filter(
+    def handle_no_recommendations(fields=None) -> Response:
+        generic_recommendations = sparse_destinations(Destination.objects.filter(
             Q(family_friendly=True) | Q(accessibility=True)
-        ).distinct()
-        print("Didn't find recommedetions so I am here ")
+        ), fields).distinct()
+        logger.info("No destination matched the preferences; falling back to generic recommendations")
         if not generic_recommendations.exists():
             return Response({
                 "message": "No destinations match your preferences. No alternative destinations available at this time."
             }, status=status.HTTP_404_NOT_FOUND)
 
         limited_recommendations = generic_recommendations.order_by('name')[:10]
-        destination_serializer = DestinationSerializer(limited_recommendations, many=True)
+        destination_serializer = DestinationSerializer(limited_recommendations, many=True, fields=fields)
         return Response({
             "message": "No exact matches found based on your preferences. Here are some alternative destinations.",
             "recommendations": destination_serializer.data
         }, status=status.HTTP_200_OK)
 
-    def annotate_and_order_destinations(self, destinations, user_preferences) -> Destination:
-        preference_mapping = {
-            'accessibility': 'accessibility',
-            'family_friendly': 'family_friendly',
-            'climate': 'weather_data__weather',
-            'landscape': 'landscape',
-            'tourism_type': 'tourism_type',
-            'cost_level': 'cost_level',
-            'travel_duration': 'type',
-        }
-
-        relevance_annotation = Sum(
-            Case(
-                *[
-                    When(
-                        Q(**{preference_mapping[pref.preference_type]: pref.preference_value}),
-                        then=1
-                    )
-                    for pref in user_preferences if pref.preference_type in preference_mapping
-                ],
-                default=Value(0),
-                output_field=IntegerField()
-            )
+    @staticmethod
+    def annotate_and_order_destinations(destinations, user_preferences) -> Destination:
+        # Relevance is the number of conditions met, as ranked by the bitmap index; ties go by id.
+        relevance = sum(map(relevance_term, build_relevance_conditions(user_preferences)), Value(0))
+        return destinations.annotate(relevance=relevance).order_by('relevance', 'pk')
+
+
+class AsyncDestinationRecommendationView(AsyncAPIView):
+    """Same recommendations as ``DestinationRecommendationView``, served without blocking an ASGI worker."""
+    throttle_classes = [RecommendationThrottle]
+
+    async def get(self, request, *args, **kwargs) -> JsonResponse:
+        try:
+            fields = requested_fields(request.GET)
+            fields = fields and validate_fields(DestinationSerializer, fields)
+        except ValidationError as exc:
+            return self.error_response(exc.detail, exc.status_code)
+
+        etag = await arecommendation_etag(request.user, fields)
+        if etag is not None:
+            etag = quote_etag(etag)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await self.recommend(request.user, fields)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+            return response
+        return await self.recommend(request.user, fields)
+
+    async def recommend(self, user, fields=None) -> JsonResponse:
+        user_preferences = await aget_preference_profile(user)
+        if not user_preferences.has_preferences:
+            return JsonResponse({"message": "User has no preferences set."}, status=status.HTTP_400_BAD_REQUEST)
+
+        data, status_code = await two_tier_cache.aget_or_set(
+            CATALOG_NAMESPACE, recommendation_cache_key(user_preferences, fields),
+            lambda: self.build_recommendations(user_preferences, fields),
         )
-        destinations = destinations.annotate(relevance=Coalesce(relevance_annotation, 0))
-        return destinations.order_by('relevance')
+        return JsonResponse(data, status=status_code, safe=False)
+
+    async def build_recommendations(self, user_preferences, fields=None) -> tuple:
+        queries = (build_strict_query(user_preferences), build_type_query(user_preferences),
+                   build_flexible_query(user_preferences))
+        destinations = sparse_destinations(Destination.objects.all(), fields)
+        ranked_ids = await sync_to_async(indexed_recommendations)(queries, build_relevance_conditions(user_preferences))
+        if ranked_ids is not None:
+            ordered_destinations = indexed_destinations(await destinations.ain_bulk(ranked_ids), ranked_ids)
+        else:
+            recommended_destinations = filter_recommendations(destinations, queries)
+            ordered_destinations = [
+                destination async for destination in DestinationRecommendationView.annotate_and_order_destinations(
+                    recommended_destinations, user_preferences
+                ).aiterator()
+            ] if await recommended_destinations.aexists() else []
+
+        if not ordered_destinations:
+            return await self.handle_no_recommendations(fields)
+        return DestinationSerializer(ordered_destinations, many=True, fields=fields).data, status.HTTP_200_OK
+
+    @staticmethod
+    async def handle_no_recommendations(fields=None) -> tuple:
+        generic_recommendations = sparse_destinations(Destination.objects.filter(
+            Q(family_friendly=True) | Q(accessibility=True)
+        ), fields).distinct()
+        if not await generic_recommendations.aexists():
+            return {
+                "message": "No destinations match your preferences. No alternative destinations available at this time."
+            }, status.HTTP_404_NOT_FOUND
+
+        limited_recommendations = generic_recommendations.order_by('name')[:10]
+        destinations = [destination async for destination in limited_recommendations.aiterator()]
+        return {
+            "message": "No exact matches found based on your preferences. Here are some alternative destinations.",
+            "recommendations": DestinationSerializer(destinations, many=True, fields=fields).data
+        }, status.HTTP_200_OK
+
+
+class DestinationMultiGetView(MultiGetView):
+    """Destinations by id for clients resolving ``Itinerary.destination``; cached until the catalog changes."""
+    queryset = Destination.objects.all()
+    serializer_class = DestinationSerializer
+    permission_classes = [IsAuthenticated]
+    cache_namespace = CATALOG_NAMESPACE
+    cache_prefix = 'destination'
+
+
+class ActivityMultiGetView(MultiGetView):
+    """Activities by id for clients resolving ``ItineraryStep.activity``; cached until the catalog changes."""
+    queryset = Activity.objects.all()
+    serializer_class = ActivitySerializer
+    permission_classes = [IsAuthenticated]
+    cache_namespace = CATALOG_NAMESPACE
+    cache_prefix = 'activity'
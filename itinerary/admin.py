@@ -1 +1,22 @@
+from django.contrib import admin
 
+from voyage_craft.admin import LargeTableAdmin
+from .models import Itinerary, ItineraryStep
+
+
+@admin.register(Itinerary)
+class ItineraryAdmin(LargeTableAdmin):
+    list_display = ('name', 'user', 'destination', 'start_date', 'end_date', 'updated_at')
+    list_select_related = ('user', 'destination')
+    search_fields = ('=user__username',)
+    raw_id_fields = ('user',)
+    autocomplete_fields = ('destination',)
+
+
+@admin.register(ItineraryStep)
+class ItineraryStepAdmin(LargeTableAdmin):
+    list_display = ('itinerary', 'step_order', 'activity', 'stay_duration_hours')
+    list_select_related = ('itinerary', 'activity')
+    search_fields = ('=itinerary__id',)
+    raw_id_fields = ('itinerary',)
+    autocomplete_fields = ('activity',)
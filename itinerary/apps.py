@@ -2,10 +2,14 @@ from django.apps import AppConfig
 
 
 class ItineraryConfig(AppConfig):
+    default = True
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'itinerary'
 
+    def ready(self):
+        from . import signals  # noqa: F401
+
 
 class ItineraryStepAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'itinerary_step'
\ No newline at end of file
+    name = 'itinerary_step'
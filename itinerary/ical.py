@@ -0,0 +1,104 @@
+from datetime import datetime, time, timedelta, timezone
+
+from .models import Itinerary, ItineraryStep
+
+STREAM_CHUNK_SIZE = 500
+CALENDAR_PRODID = '-//VoyageCraft//Itineraries//EN'
+
+
+def escape_text(value: str) -> str:
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def fold_line(line: str) -> str:
+    # RFC 5545 limits content lines to 75 octets; continuation lines start with a space.
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+
+    parts = []
+    start = 0
+    limit = 75
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(encoded[start:end].decode('utf-8'))
+        start = end
+        limit = 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def format_datetime(value: datetime) -> str:
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def format_date(value) -> str:
+    return value.strftime('%Y%m%d')
+
+
+def itinerary_event(itinerary) -> str:
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:itinerary-{itinerary.id}@voyagecraft',
+        f'DTSTAMP:{format_datetime(itinerary.updated_at)}',
+        f'DTSTART;VALUE=DATE:{format_date(itinerary.start_date)}',
+        f'DTEND;VALUE=DATE:{format_date(itinerary.end_date + timedelta(days=1))}',
+        f'SUMMARY:{escape_text(itinerary.name)}',
+        f'DESCRIPTION:{escape_text(itinerary.description)}',
+        'END:VEVENT',
+    ]
+    return ''.join(fold_line(line) for line in lines)
+
+
+def step_event(step, itinerary, starts_at: datetime) -> str:
+    ends_at = starts_at + timedelta(hours=step.stay_duration_hours)
+    summary = step.activity.name if step.activity_id else f'Step {step.step_order}'
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:itinerary-step-{step.id}@voyagecraft',
+        f'DTSTAMP:{format_datetime(step.updated_at)}',
+        f'DTSTART:{format_datetime(starts_at)}',
+        f'DTEND:{format_datetime(ends_at)}',
+        f'SUMMARY:{escape_text(f"{itinerary.name}: {summary}")}',
+    ]
+    if step.note:
+        lines.append(f'DESCRIPTION:{escape_text(step.note)}')
+    lines.append('END:VEVENT')
+    return ''.join(fold_line(line) for line in lines)
+
+
+def iter_calendar(itineraries):
+    """
+    Yield an iCalendar document for ``itineraries`` one event at a time.
+
+    Steps are read through a server-side cursor and laid end to end from the
+    itinerary start date, so only the current row is held in memory.
+    """
+    yield fold_line('BEGIN:VCALENDAR')
+    yield fold_line('VERSION:2.0')
+    yield fold_line(f'PRODID:{CALENDAR_PRODID}')
+    yield fold_line('CALSCALE:GREGORIAN')
+
+    for itinerary in itineraries.order_by('id').iterator(chunk_size=STREAM_CHUNK_SIZE):
+        yield itinerary_event(itinerary)
+
+    steps = ItineraryStep.objects.filter(
+        itinerary__in=itineraries.values('id')
+    ).select_related('itinerary', 'activity').order_by('itinerary_id', 'step_order', 'id')
+
+    current_itinerary = None
+    starts_at = None
+    for step in steps.iterator(chunk_size=STREAM_CHUNK_SIZE):
+        if step.itinerary_id != current_itinerary:
+            current_itinerary = step.itinerary_id
+            starts_at = datetime.combine(step.itinerary.start_date, time.min, tzinfo=timezone.utc)
+        yield step_event(step, step.itinerary, starts_at)
+        starts_at += timedelta(hours=step.stay_duration_hours)
+
+    yield fold_line('END:VCALENDAR')
+
+
+def calendar_filename(itinerary: Itinerary = None) -> str:
+    return f'itinerary-{itinerary.id}.ics' if itinerary else 'itineraries.ics'
@@ -0,0 +1,92 @@
+import json
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from destinations.models import Destination
+from itinerary.models import Itinerary
+from itinerary.utils import overlapping_itineraries, overlapping_pairs
+from users_app.models import User
+
+
+def pairwise_overlaps(intervals) -> int:
+    found = 0
+    for index, (_, start, end) in enumerate(intervals):
+        for _, other_start, other_end in intervals[index + 1:]:
+            if start <= other_end and other_start <= end:
+                found += 1
+    return found
+
+
+def synthetic_intervals(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    first_day = date(2020, 1, 1)
+    intervals = []
+    for itinerary_id in range(1, count + 1):
+        start = first_day + timedelta(days=rng.randrange(count * 3))
+        intervals.append((itinerary_id, start, start + timedelta(days=rng.randrange(1, 15))))
+    return intervals
+
+
+def timed(function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    return result, round((time.perf_counter() - started) * 1000, 3)
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Benchmark itinerary overlap detection for users with thousands of itineraries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,5000', help='Comma separated itinerary counts per user.')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--db', action='store_true',
+                            help='Also time the indexed validation query; data is rolled back afterwards.')
+
+    def handle(self, *args, **options):
+        results = []
+        for size in [int(size) for size in options['sizes'].split(',')]:
+            intervals = synthetic_intervals(size, options['seed'])
+            pairs, sweep_ms = timed(overlapping_pairs, intervals)
+            pairwise, pairwise_ms = timed(pairwise_overlaps, intervals)
+            result = {
+                'itineraries': size,
+                'overlaps': len(pairs),
+                'sweep_ms': sweep_ms,
+                'pairwise_ms': pairwise_ms,
+            }
+            if pairwise != len(pairs):
+                raise CommandError(f'Sweep found {len(pairs)} overlaps but pairwise found {pairwise}.')
+            if options['db']:
+                result['validation_query_ms'] = self.time_validation_query(intervals)
+            results.append(result)
+
+        self.stdout.write(json.dumps(results, indent=2))
+
+    @staticmethod
+    def time_validation_query(intervals) -> float:
+        timings = {}
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username='bench-overlaps', password=None)
+                destination = Destination.objects.create(name='Bench destination', type='City')
+                Itinerary.objects.bulk_create(
+                    Itinerary(user=user, name=f'Trip {itinerary_id}', description='', start_date=start,
+                              end_date=end, destination=destination)
+                    for itinerary_id, start, end in intervals
+                )
+                _, probe_start, probe_end = intervals[len(intervals) // 2]
+                _, timings['ms'] = timed(
+                    lambda: overlapping_itineraries(user, probe_start, probe_end).exists()
+                )
+                raise Rollback
+        except Rollback:
+            pass
+        return timings['ms']
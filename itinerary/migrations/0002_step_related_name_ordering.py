@@ -0,0 +1,23 @@
+# Generated by Django 5.1 on 2026-10-19 17:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('itinerary', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='itinerarystep',
+            options={'ordering': ['step_order', 'id']},
+        ),
+        migrations.AlterField(
+            model_name='itinerarystep',
+            name='itinerary',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='steps', to='itinerary.itinerary'),
+        ),
+    ]
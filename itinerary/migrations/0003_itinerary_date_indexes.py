@@ -0,0 +1,36 @@
+# Generated by Django 5.1 on 2026-10-19 17:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def create_period_gist_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS itinerary_period_gist_idx ON itinerary_itinerary "
+        "USING gist (daterange(start_date, end_date, '[]'))"
+    )
+
+
+def drop_period_gist_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS itinerary_period_gist_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('destinations', '0004_activity_created_at_activity_updated_at'),
+        ('itinerary', '0002_step_related_name_ordering'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='itinerary',
+            index=models.Index(fields=['user', 'start_date', 'end_date'], name='itinerary_user_dates_idx'),
+        ),
+        migrations.RunPython(create_period_gist_index, drop_period_gist_index),
+    ]
@@ -13,12 +13,17 @@ class Itinerary(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     destination = models.ForeignKey(Destination, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'start_date', 'end_date'], name='itinerary_user_dates_idx'),
+        ]
+
     def __str__(self):
         return self.name
 
 
 class ItineraryStep(models.Model):
-    itinerary = models.ForeignKey(Itinerary, on_delete=models.CASCADE)
+    itinerary = models.ForeignKey(Itinerary, on_delete=models.CASCADE, related_name='steps')
     step_order = models.IntegerField()
     stay_duration_hours = models.FloatField()
     note = models.TextField(null=True, blank=True)
@@ -26,5 +31,8 @@ class ItineraryStep(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     activity = models.ForeignKey(Activity, on_delete=models.CASCADE, null=True, blank=True)
 
+    class Meta:
+        ordering = ['step_order', 'id']
+
     def __str__(self):
         return f"Step {self.step_order} of {self.itinerary.name}"
@@ -1,18 +1,42 @@
 from rest_framework import serializers
 from .models import Itinerary, ItineraryStep
+from .utils import overlapping_itineraries
+from voyage_craft.sparse import SparseFieldsSerializerMixin
 
 class ItineraryStepSerializer(serializers.ModelSerializer):
     class Meta:
         model = ItineraryStep
-        fields = ['id', 'description', 'date', 'order']
+        fields = ['id', 'step_order', 'stay_duration_hours', 'note', 'activity']
 
-class ItinerarySerializer(serializers.ModelSerializer):
+class ItinerarySerializer(SparseFieldsSerializerMixin, serializers.ModelSerializer):
     steps = ItineraryStepSerializer(many=True, required=False)
 
     class Meta:
         model = Itinerary
         fields = ['id', 'user', 'name', 'description', 'start_date', 'end_date', 'destination', 'steps']
 
+    def validate(self, data):
+        instance = self.instance
+        user = data.get('user', getattr(instance, 'user', None))
+        start_date = data.get('start_date', getattr(instance, 'start_date', None))
+        end_date = data.get('end_date', getattr(instance, 'end_date', None))
+
+        if start_date and end_date:
+            if start_date > end_date:
+                raise serializers.ValidationError({'end_date': 'End date must not be before the start date.'})
+
+            if user is not None:
+                conflicts = list(overlapping_itineraries(
+                    user, start_date, end_date, exclude_pk=getattr(instance, 'pk', None)
+                ).values_list('id', flat=True)[:10])
+                if conflicts:
+                    raise serializers.ValidationError({
+                        'non_field_errors': ['This itinerary overlaps with other itineraries.'],
+                        'conflicts': conflicts,
+                    })
+
+        return data
+
     def create(self, validated_data):
         steps_data = validated_data.pop('steps', [])
         itinerary = Itinerary.objects.create(**validated_data)
@@ -34,9 +58,10 @@ class ItinerarySerializer(serializers.ModelSerializer):
             step_id = step_data.get('id')
             if step_id:
                 step = existing_steps.pop(step_id)
-                step.description = step_data.get('description', step.description)
-                step.date = step_data.get('date', step.date)
-                step.order = step_data.get('order', step.order)
+                step.step_order = step_data.get('step_order', step.step_order)
+                step.stay_duration_hours = step_data.get('stay_duration_hours', step.stay_duration_hours)
+                step.note = step_data.get('note', step.note)
+                step.activity = step_data.get('activity', step.activity)
                 step.save()
             else:
                 ItineraryStep.objects.create(itinerary=instance, **step_data)
@@ -45,3 +70,14 @@ class ItinerarySerializer(serializers.ModelSerializer):
 
         return instance
 
+
+
+class ItinerarySummaryListSerializer(ItinerarySerializer):
+    step_count = serializers.IntegerField(read_only=True)
+    total_hours = serializers.FloatField(read_only=True)
+    family_friendly_steps = serializers.IntegerField(read_only=True)
+    accessible_steps = serializers.IntegerField(read_only=True)
+
+    class Meta(ItinerarySerializer.Meta):
+        fields = ItinerarySerializer.Meta.fields + ['step_count', 'total_hours', 'family_friendly_steps',
+                                                    'accessible_steps']
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Itinerary, ItineraryStep
+
+
+@receiver([post_save, post_delete], sender=ItineraryStep)
+def touch_itinerary(sender, instance, **kwargs):
+    # Step changes bump the parent's updated_at so conditional requests see them.
+    Itinerary.objects.filter(pk=instance.itinerary_id).update(updated_at=timezone.now())
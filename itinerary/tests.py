@@ -1,10 +1,16 @@
 import pytest
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient
 from django.urls import reverse
 from rest_framework.test import APIClient
 from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
 from itinerary.models import Itinerary, ItineraryStep
 from users_app.models import User
-from destinations.models import Destination
+from destinations.models import Destination, Activity
+from itinerary.management.commands.bench_overlaps import pairwise_overlaps, synthetic_intervals
+from itinerary.utils import overlapping_pairs
 
 
 @pytest.mark.django_db
@@ -35,9 +41,9 @@ def test_create_itinerary():
         "destination": destination.id,
         "steps": [
             {
-                "description": "Arrive at the beach",
-                "date": "2024-09-01",
-                "order": 1
+                "step_order": 1,
+                "stay_duration_hours": 6,
+                "note": "Arrive at the beach"
             }
         ]
     }
@@ -49,6 +55,7 @@ def test_create_itinerary():
     assert response.status_code == status.HTTP_201_CREATED
     assert Itinerary.objects.count() == 1
     assert Itinerary.objects.get().name == "My Test Itinerary"
+    assert Itinerary.objects.get().steps.get().note == "Arrive at the beach"
 
 
 @pytest.mark.django_db
@@ -105,9 +112,9 @@ def test_create_itinerary_step():
     client.force_authenticate(user=user)
     url = reverse('itinerarystep-create', args=[itinerary.id])
     data = {
-        "description": "Step 1",
-        "date": "2024-09-02",
-        "order": 1
+        "step_order": 1,
+        "stay_duration_hours": 4,
+        "note": "Step 1"
     }
 
     # When: Enviar una solicitud POST para agregar un paso al itinerario
@@ -116,7 +123,8 @@ def test_create_itinerary_step():
     # Then: Verificar que el paso se ha creado correctamente
     assert response.status_code == status.HTTP_201_CREATED
     assert ItineraryStep.objects.count() == 1
-    assert ItineraryStep.objects.get().description == "Step 1"
+    assert ItineraryStep.objects.get().note == "Step 1"
+    assert ItineraryStep.objects.get().itinerary == itinerary
 
 
 @pytest.mark.django_db
@@ -140,17 +148,17 @@ def test_update_itinerary_step():
     )
     step = ItineraryStep.objects.create(
         itinerary=itinerary,
-        description="Original Step",
-        date="2024-09-02",
-        order=1
+        step_order=1,
+        stay_duration_hours=4,
+        note="Original Step"
     )
     client = APIClient()
     client.force_authenticate(user=user)
     url = reverse('itinerarystep-detail', args=[step.id])
     data = {
-        "description": "Updated Step",
-        "date": "2024-09-03",
-        "order": 2
+        "step_order": 2,
+        "stay_duration_hours": 5.5,
+        "note": "Updated Step"
     }
 
     # When: Enviar una solicitud PATCH para actualizar el paso del itinerario
@@ -159,9 +167,9 @@ def test_update_itinerary_step():
     # Then: Verificar que el paso se ha actualizado correctamente
     assert response.status_code == status.HTTP_200_OK
     step.refresh_from_db()
-    assert step.description == "Updated Step"
-    assert step.date == "2024-09-03"
-    assert step.order == 2
+    assert step.note == "Updated Step"
+    assert step.stay_duration_hours == 5.5
+    assert step.step_order == 2
 
 
 @pytest.mark.django_db
@@ -185,9 +193,9 @@ def test_delete_itinerary_step():
     )
     step = ItineraryStep.objects.create(
         itinerary=itinerary,
-        description="Step to be deleted",
-        date="2024-09-02",
-        order=1
+        step_order=1,
+        stay_duration_hours=4,
+        note="Step to be deleted"
     )
     client = APIClient()
     client.force_authenticate(user=user)
@@ -199,3 +207,402 @@ def test_delete_itinerary_step():
     # Then: Verificar que el paso se ha eliminado correctamente
     assert response.status_code == status.HTTP_204_NO_CONTENT
     assert ItineraryStep.objects.count() == 0
+
+
+def create_itinerary_with_steps(user):
+    destination = Destination.objects.create(name="Test Destination", description="A test destination")
+    beach = Activity.objects.create(name="Beach day", suitable_weather='Sunny', duration_hours=6,
+                                    family_friendly=True, accessibility=True, destination=destination)
+    museum = Activity.objects.create(name="Museum", suitable_weather='Rainy', duration_hours=3,
+                                     family_friendly=True, destination=destination)
+    itinerary = Itinerary.objects.create(
+        user=user,
+        name="My Test Itinerary",
+        description="A simple test.",
+        start_date="2024-09-01",
+        end_date="2024-09-07",
+        destination=destination
+    )
+    ItineraryStep.objects.create(itinerary=itinerary, step_order=1, stay_duration_hours=20, activity=beach)
+    ItineraryStep.objects.create(itinerary=itinerary, step_order=2, stay_duration_hours=4, activity=museum)
+    ItineraryStep.objects.create(itinerary=itinerary, step_order=3, stay_duration_hours=5)
+    return itinerary
+
+
+@pytest.mark.django_db
+def test_itinerary_summary(django_assert_max_num_queries):
+    """
+    Prueba el resumen agregado de un itinerario.
+
+    **Given** un usuario autenticado y un itinerario con pasos repartidos en dos días.
+    **When** el usuario envía una solicitud GET al resumen del itinerario.
+    **Then** se devuelven los totales por día, la mezcla de clima y la cobertura calculados en la base de datos.
+    """
+    user = User.objects.create_user(username='testuser', password='testpassword')
+    itinerary = create_itinerary_with_steps(user)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('itinerary-summary', args=[itinerary.id])
+
+    # When: una consulta para el itinerario y una sola consulta agregada para el resumen
+    with django_assert_max_num_queries(2):
+        response = client.get(url, format='json')
+
+    # Then: Verificar los agregados
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['step_count'] == 3
+    assert response.data['total_hours'] == 29
+    assert [(day['day'], day['step_count'], day['hours']) for day in response.data['days']] == [
+        (1, 2, 24), (2, 1, 5)
+    ]
+    assert str(response.data['days'][1]['date']) == "2024-09-02"
+    assert response.data['weather_mix']['Sunny'] == 1
+    assert response.data['weather_mix']['Rainy'] == 1
+    assert response.data['family_friendly_steps'] == 2
+    assert response.data['accessibility_coverage'] == round(1 / 3, 4)
+
+
+@pytest.mark.django_db
+def test_itinerary_summary_of_another_user():
+    """
+    Prueba que el resumen solo se sirve a la persona dueña del itinerario.
+
+    **Given** un itinerario de otro usuario.
+    **When** un usuario autenticado pide su resumen por id.
+    **Then** se devuelve un 404.
+    """
+    owner = User.objects.create_user(username='owner', password='testpassword')
+    itinerary = create_itinerary_with_steps(owner)
+    client = APIClient()
+    client.force_authenticate(user=User.objects.create_user(username='testuser', password='testpassword'))
+
+    response = client.get(reverse('itinerary-summary', args=[itinerary.id]), format='json')
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_list_itineraries_with_summary():
+    """
+    Prueba la anotación opcional del resumen en el listado de itinerarios.
+
+    **Given** un usuario autenticado y un itinerario con pasos.
+    **When** el usuario lista los itinerarios con ``?summary=true``.
+    **Then** cada itinerario incluye el número de pasos y las horas totales.
+    """
+    user = User.objects.create_user(username='testuser', password='testpassword')
+    create_itinerary_with_steps(user)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get(reverse('itinerary-list'), {'summary': 'true'}, format='json')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data[0]['step_count'] == 3
+    assert response.data[0]['total_hours'] == 29
+    assert response.data[0]['accessible_steps'] == 1
+
+
+@pytest.mark.django_db
+def test_async_list_itineraries_matches_sync(django_assert_max_num_queries):
+    """
+    Prueba la variante asíncrona del listado de itinerarios.
+
+    **Given** un usuario con un token JWT y un itinerario con pasos.
+    **When** el usuario lista los itinerarios por la ruta asíncrona, con y sin ``?summary=true``.
+    **Then** la respuesta coincide con la del listado síncrono y los pasos se cargan con una sola consulta.
+    """
+    user = User.objects.create_user(username='testuser', password='testpassword')
+    create_itinerary_with_steps(user)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+    for params in ({}, {'summary': 'true'}):
+        expected = client.get(reverse('itinerary-list'), params, format='json').json()
+
+        # When: usuario, itinerarios y pasos precargados
+        with django_assert_max_num_queries(3):
+            response = async_to_sync(AsyncClient().get)(reverse('itinerary-list-async'), params, headers=headers)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == expected
+
+
+@pytest.mark.django_db
+def test_list_itineraries_with_sparse_fields(django_assert_num_queries):
+    """
+    Prueba la selección de campos con ``?fields=`` en el listado de itinerarios.
+
+    **Given** un usuario autenticado y un itinerario con pasos.
+    **When** el usuario lista los itinerarios con ``?fields=id,name``.
+    **Then** solo se devuelven esos campos, sin leer la descripción ni cargar los pasos.
+    """
+    user = User.objects.create_user(username='testuser', password='testpassword')
+    itinerary = create_itinerary_with_steps(user)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    # When: una sola consulta, sin precarga de pasos
+    with django_assert_num_queries(1) as queries:
+        response = client.get(reverse('itinerary-list'), {'fields': 'id,name'}, format='json')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == [{'id': itinerary.id, 'name': "My Test Itinerary"}]
+    assert '"description"' not in queries.captured_queries[0]['sql']
+
+    response = client.get(reverse('itinerary-list'), {'fields': 'id,steps'}, format='json')
+    assert [len(item['steps']) for item in response.json()] == [3]
+
+    response = client.get(reverse('itinerary-list'), {'fields': 'id,nope'}, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_itinerary_calendar_export():
+    """
+    Prueba la exportación iCalendar de un itinerario.
+
+    **Given** un usuario autenticado y un itinerario con pasos.
+    **When** el usuario descarga ``calendar.ics`` del itinerario.
+    **Then** se devuelve un calendario en streaming con un evento por itinerario y por paso.
+    """
+    user = User.objects.create_user(username='testuser', password='testpassword')
+    itinerary = create_itinerary_with_steps(user)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get(reverse('itinerary-calendar', args=[itinerary.id]), HTTP_ACCEPT='text/calendar')
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.streaming
+    assert response['Content-Type'] == 'text/calendar; charset=utf-8'
+    body = b''.join(response.streaming_content).decode()
+    assert body.startswith('BEGIN:VCALENDAR\r\n')
+    assert body.count('BEGIN:VEVENT') == 4
+    assert 'DTSTART:20240901T000000Z' in body
+    assert 'DTSTART:20240902T000000Z' in body
+    assert 'SUMMARY:My Test Itinerary: Beach day' in body
+
+
+@pytest.mark.django_db
+def test_itinerary_calendar_of_another_user():
+    """
+    Prueba que el calendario solo se sirve a la persona dueña del itinerario.
+
+    **Given** un itinerario de otro usuario.
+    **When** un usuario autenticado descarga su ``calendar.ics`` por id.
+    **Then** se devuelve un 404.
+    """
+    owner = User.objects.create_user(username='owner', password='testpassword')
+    itinerary = create_itinerary_with_steps(owner)
+    client = APIClient()
+    client.force_authenticate(user=User.objects.create_user(username='testuser', password='testpassword'))
+
+    response = client.get(reverse('itinerary-calendar', args=[itinerary.id]), HTTP_ACCEPT='text/calendar')
+
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+def test_itinerary_calendar_conditional_get():
+    """
+    Prueba la petición condicional del calendario.
+
+    **Given** un cliente que ya descargó el calendario y guarda su ``ETag``.
+    **When** vuelve a pedirlo con ``If-None-Match``, después se modifica un itinerario y luego se borra otro.
+    **Then** primero recibe un 304 y, tras cada cambio, incluido el borrado, el calendario completo.
+    """
+    user = User.objects.create_user(username='testuser', password='testpassword')
+    itinerary = create_itinerary_with_steps(user)
+    older = Itinerary.objects.create(user=user, name="Older", description="", start_date="2024-08-01",
+                                     end_date="2024-08-02", destination=itinerary.destination)
+    Itinerary.objects.filter(pk=older.pk).update(updated_at=itinerary.updated_at - timedelta(days=1))
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('itinerary-calendar-feed')
+
+    first = client.get(url)
+    assert first.status_code == status.HTTP_200_OK
+    assert 'Last-Modified' not in first
+
+    cached = client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+
+    Itinerary.objects.filter(pk=itinerary.pk).update(updated_at=itinerary.updated_at + timedelta(minutes=5))
+    refreshed = client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+    assert refreshed.status_code == status.HTTP_200_OK
+
+    # When: se borra un itinerario que no era el último modificado
+    older.delete()
+    after_delete = client.get(url, HTTP_IF_NONE_MATCH=refreshed['ETag'])
+    assert after_delete.status_code == status.HTTP_200_OK
+    assert b'Older' not in b''.join(after_delete.streaming_content)
+
+
+@pytest.mark.django_db
+def test_update_itinerary_rejects_overlap():
+    """
+    Prueba la validación de solapamiento al actualizar un itinerario.
+
+    **Given** un usuario con dos itinerarios en fechas distintas.
+    **When** el usuario mueve uno de ellos para que se solape con el otro.
+    **Then** se rechaza la actualización con un 400 indicando el itinerario en conflicto.
+    """
+    user = User.objects.create_user(username='testuser', password='testpassword')
+    destination = Destination.objects.create(name="Test Destination", description="A test destination")
+    first = Itinerary.objects.create(user=user, name="First", description="", start_date="2024-09-01",
+                                     end_date="2024-09-07", destination=destination)
+    second = Itinerary.objects.create(user=user, name="Second", description="", start_date="2024-10-01",
+                                      end_date="2024-10-07", destination=destination)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('itinerary-detail', args=[second.id])
+
+    response = client.patch(url, {"start_date": "2024-09-07"}, format='json')
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.data['conflicts'] == [str(first.id)]
+
+    response = client.patch(url, {"start_date": "2024-09-08"}, format='json')
+    assert response.status_code == status.HTTP_200_OK
+
+
+@pytest.mark.django_db
+def test_itinerary_conflicts():
+    """
+    Prueba el endpoint de conflictos entre itinerarios del usuario.
+
+    **Given** un usuario con tres itinerarios, dos de ellos solapados.
+    **When** el usuario consulta sus conflictos.
+    **Then** solo se devuelve el par solapado con el rango de fechas común.
+    """
+    user = User.objects.create_user(username='testuser', password='testpassword')
+    destination = Destination.objects.create(name="Test Destination", description="A test destination")
+    first = Itinerary.objects.create(user=user, name="First", description="", start_date="2024-09-01",
+                                     end_date="2024-09-07", destination=destination)
+    second = Itinerary.objects.create(user=user, name="Second", description="", start_date="2024-09-05",
+                                      end_date="2024-09-10", destination=destination)
+    Itinerary.objects.create(user=user, name="Third", description="", start_date="2024-09-11",
+                             end_date="2024-09-12", destination=destination)
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    response = client.get(reverse('itinerary-conflicts'))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['count'] == 1
+    conflict = response.data['conflicts'][0]
+    assert conflict['itineraries'] == [first.id, second.id]
+    assert str(conflict['overlap_start']) == "2024-09-05"
+    assert str(conflict['overlap_end']) == "2024-09-07"
+
+
+def test_overlapping_pairs_matches_pairwise():
+    """
+    Prueba que el barrido por fechas encuentra los mismos solapamientos que la comparación por pares.
+    """
+    intervals = synthetic_intervals(300, seed=7)
+    assert len(overlapping_pairs(intervals)) == pairwise_overlaps(intervals)
+
+
+@pytest.mark.django_db
+def test_itinerary_detail_etag(django_assert_num_queries):
+    """
+    Prueba las peticiones condicionales sobre el detalle de un itinerario.
+
+    **Given** un usuario autenticado que ya obtuvo un itinerario y su ``ETag``.
+    **When** vuelve a pedirlo con ``If-None-Match`` y después se añade un paso.
+    **Then** primero recibe un 304 con una sola consulta y, tras el cambio, el itinerario completo.
+    """
+    user = User.objects.create_user(username='testuser', password='testpassword')
+    itinerary = create_itinerary_with_steps(user)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('itinerary-detail', args=[itinerary.id])
+
+    etag = client.get(url)['ETag']
+    with django_assert_num_queries(1):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    ItineraryStep.objects.create(itinerary=itinerary, step_order=4, stay_duration_hours=2)
+    response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_itinerary_detail_etag_of_sparse_fields():
+    """
+    Prueba que el ``ETag`` de una respuesta parcial no valida la respuesta completa.
+
+    **Given** un usuario autenticado que obtuvo un itinerario con ``?fields=id,name`` y su ``ETag``.
+    **When** pide el itinerario completo con ese ``If-None-Match``.
+    **Then** recibe un 200 con todos los campos y un ``ETag`` distinto, que sí valida la respuesta completa.
+    """
+    user = User.objects.create_user(username='testuser', password='testpassword')
+    itinerary = create_itinerary_with_steps(user)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('itinerary-detail', args=[itinerary.id])
+
+    sparse_etag = client.get(url, {'fields': 'id,name'})['ETag']
+    response = client.get(url, HTTP_IF_NONE_MATCH=sparse_etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert 'steps' in response.data
+    assert response['ETag'] != sparse_etag
+
+    response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+@pytest.mark.django_db
+def test_itinerary_update_requires_matching_etag():
+    """
+    Prueba que ``If-Match`` evita sobrescribir cambios ajenos.
+
+    **Given** un usuario autenticado con un ``ETag`` obsoleto de un itinerario.
+    **When** envía un PATCH con ese ``If-Match``.
+    **Then** se rechaza con 412 y, con el ``ETag`` vigente, se aplica el cambio.
+    """
+    user = User.objects.create_user(username='testuser', password='testpassword')
+    itinerary = create_itinerary_with_steps(user)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('itinerary-detail', args=[itinerary.id])
+
+    stale_etag = client.get(url)['ETag']
+    Itinerary.objects.filter(pk=itinerary.pk).update(updated_at=itinerary.updated_at + timedelta(minutes=5))
+
+    response = client.patch(url, {"name": "Renamed"}, format='json', HTTP_IF_MATCH=stale_etag)
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+
+    current_etag = client.get(url)['ETag']
+    response = client.patch(url, {"name": "Renamed"}, format='json', HTTP_IF_MATCH=current_etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response['ETag'] != current_etag
+
+
+@pytest.mark.django_db
+def test_admin_lists_itineraries_and_steps(client, django_assert_max_num_queries):
+    """
+    Prueba las listas del admin de itinerarios y pasos.
+
+    **Given** un superusuario y un itinerario con tres pasos.
+    **When** el superusuario abre la lista y el formulario de cada modelo.
+    **Then** las listas se cargan sin una consulta por fila y los formularios usan widgets de id o autocompletado.
+    """
+    admin = User.objects.create_superuser(username='admin', password='password123')
+    itinerary = create_itinerary_with_steps(admin)
+    client.force_login(admin)
+
+    # When/Then: usuario, destino, pasos y actividades llegan en la misma consulta que las filas
+    for model in ('itinerary', 'itinerarystep'):
+        with django_assert_max_num_queries(6):
+            response = client.get(reverse(f'admin:itinerary_{model}_changelist'))
+        assert response.status_code == status.HTTP_200_OK
+
+    response = client.get(reverse('admin:itinerary_itinerarystep_change', args=[itinerary.steps.first().pk]))
+    assert response.status_code == status.HTTP_200_OK
+    assert 'vForeignKeyRawIdAdminField' in response.content.decode()
+    assert 'admin-autocomplete' in response.content.decode()
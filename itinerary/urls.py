@@ -1,16 +1,26 @@
 from django.urls import path
 from .views import (
     ListItinerariesView,
+    AsyncListItinerariesView,
     CreateItineraryView,
     RetrieveUpdateDeleteItineraryView,
+    ItinerarySummaryView,
+    ItineraryConflictsView,
+    ItineraryCalendarView,
+    UserCalendarFeedView,
     CreateItineraryStepView,
     RetrieveUpdateDeleteItineraryStepView
 )
 
 urlpatterns = [
     path('itineraries/', ListItinerariesView.as_view(), name='itinerary-list'),
+    path('async/itineraries/', AsyncListItinerariesView.as_view(), name='itinerary-list-async'),
+    path('itineraries/calendar.ics', UserCalendarFeedView.as_view(), name='itinerary-calendar-feed'),
+    path('itineraries/conflicts/', ItineraryConflictsView.as_view(), name='itinerary-conflicts'),
     path('itineraries/create/', CreateItineraryView.as_view(), name='itinerary-create'),
     path('itineraries/<int:pk>/', RetrieveUpdateDeleteItineraryView.as_view(), name='itinerary-detail'),
+    path('itineraries/<int:pk>/summary/', ItinerarySummaryView.as_view(), name='itinerary-summary'),
+    path('itineraries/<int:pk>/calendar.ics', ItineraryCalendarView.as_view(), name='itinerary-calendar'),
     path('itineraries/<int:itinerary_id>/steps/create/', CreateItineraryStepView.as_view(), name='itinerarystep-create'),
     path('itinerarysteps/<int:pk>/', RetrieveUpdateDeleteItineraryStepView.as_view(), name='itinerarystep-detail'),
 ]
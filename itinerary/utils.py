@@ -0,0 +1,142 @@
+import heapq
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Count, F, FloatField, Func, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Floor
+
+from destinations.models import Activity
+from voyage_craft.conditional import make_etag
+from .models import Itinerary, ItineraryStep
+
+HOURS_PER_DAY = 24
+
+
+def weather_count_key(weather: str) -> str:
+    return f"weather_{weather.lower()}"
+
+
+def step_day_expression():
+    # Steps are laid end to end from the itinerary start date following step_order,
+    # so the day a step falls on is the sum of the durations of the steps before it.
+    previous_hours = ItineraryStep.objects.filter(
+        itinerary=OuterRef('itinerary'),
+    ).filter(
+        Q(step_order__lt=OuterRef('step_order')) | Q(step_order=OuterRef('step_order'), id__lt=OuterRef('id'))
+    ).order_by().values('itinerary').annotate(total=Sum('stay_duration_hours')).values('total')
+
+    hours_before = Coalesce(Subquery(previous_hours, output_field=FloatField()), Value(0.0))
+    return Cast(Floor(hours_before / HOURS_PER_DAY), IntegerField())
+
+
+def step_aggregates(prefix: str = '') -> dict:
+    step = f'{prefix}id' if prefix else 'id'
+    activity = f'{prefix}activity__'
+    aggregates = {
+        'step_count': Count(step),
+        'total_hours': Coalesce(Sum(f'{prefix}stay_duration_hours'), Value(0.0)),
+        'family_friendly_steps': Count(step, filter=Q(**{f'{activity}family_friendly': True})),
+        'accessible_steps': Count(step, filter=Q(**{f'{activity}accessibility': True})),
+    }
+    for weather, _ in Activity.WEATHER_CHOICES:
+        aggregates[weather_count_key(weather)] = Count(step, filter=Q(**{f'{activity}suitable_weather': weather}))
+    return aggregates
+
+
+def annotate_step_summary(itineraries):
+    return itineraries.annotate(**step_aggregates('steps__'))
+
+
+def coverage(count: int, total: int) -> float:
+    return round(count / total, 4) if total else 0.0
+
+
+def summarize_itinerary(itinerary) -> dict:
+    rows = ItineraryStep.objects.filter(itinerary=itinerary).annotate(
+        day=step_day_expression()
+    ).order_by().values('day').annotate(**step_aggregates()).order_by('day')
+
+    summary = {
+        'itinerary': itinerary.id,
+        'step_count': 0,
+        'total_hours': 0.0,
+        'days': [],
+        'weather_mix': {weather: 0 for weather, _ in Activity.WEATHER_CHOICES},
+        'family_friendly_steps': 0,
+        'accessible_steps': 0,
+    }
+
+    # One row per day: only the per-day subtotals are combined here.
+    for row in rows:
+        summary['step_count'] += row['step_count']
+        summary['total_hours'] += row['total_hours']
+        summary['family_friendly_steps'] += row['family_friendly_steps']
+        summary['accessible_steps'] += row['accessible_steps']
+        for weather in summary['weather_mix']:
+            summary['weather_mix'][weather] += row[weather_count_key(weather)]
+        summary['days'].append({
+            'day': row['day'] + 1,
+            'date': itinerary.start_date + timedelta(days=row['day']),
+            'step_count': row['step_count'],
+            'hours': row['total_hours'],
+        })
+
+    summary['family_friendly_coverage'] = coverage(summary['family_friendly_steps'], summary['step_count'])
+    summary['accessibility_coverage'] = coverage(summary['accessible_steps'], summary['step_count'])
+    return summary
+
+
+def itinerary_etag(pk, fields=None):
+    # Step changes bump Itinerary.updated_at (see signals.py), so one column covers both.
+    updated_at = Itinerary.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    if fields is None:
+        return make_etag('itinerary', pk, updated_at.isoformat())
+    return make_etag('itinerary', pk, updated_at.isoformat(), f'fields={",".join(fields)}')
+
+
+def overlapping_itineraries(user, start_date, end_date, exclude_pk=None):
+    itineraries = Itinerary.objects.filter(user=user)
+    if exclude_pk is not None:
+        itineraries = itineraries.exclude(pk=exclude_pk)
+
+    if connection.vendor == 'postgresql':
+        # Matches the expression of the GiST index created in migration 0003.
+        from django.contrib.postgres.fields import DateRangeField
+        from django.db.backends.postgresql.psycopg_any import DateRange
+
+        period = Func(F('start_date'), F('end_date'), Value('[]'), function='daterange',
+                      output_field=DateRangeField())
+        return itineraries.annotate(period=period).filter(period__overlap=DateRange(start_date, end_date, '[]'))
+
+    return itineraries.filter(start_date__lte=end_date, end_date__gte=start_date)
+
+
+def overlapping_pairs(intervals) -> list:
+    """
+    Return every overlapping pair among ``(id, start, end)`` intervals.
+
+    Sweeps the intervals by start date keeping the open ones in a heap keyed
+    by end date, so the cost is O(n log n + k) for k overlaps instead of
+    comparing every pair. Dates are inclusive on both ends.
+    """
+    pairs = []
+    active = []
+    for itinerary_id, start, end in sorted(intervals, key=lambda interval: (interval[1], interval[0])):
+        while active and active[0][0] < start:
+            heapq.heappop(active)
+        for other_end, other_id in active:
+            pairs.append((other_id, itinerary_id, start, min(end, other_end)))
+        heapq.heappush(active, (end, itinerary_id))
+    return pairs
+
+
+def user_itinerary_conflicts(user) -> list:
+    intervals = Itinerary.objects.filter(user=user).order_by('start_date', 'id').values_list(
+        'id', 'start_date', 'end_date'
+    )
+    return [
+        {'itineraries': [first, second], 'overlap_start': overlap_start, 'overlap_end': overlap_end}
+        for first, second, overlap_start, overlap_end in overlapping_pairs(intervals)
+    ]
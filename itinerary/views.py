@@ -1,28 +1,158 @@
-from rest_framework import generics
+from django.db.models import Count, Max
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from voyage_craft.async_views import AsyncAPIView
+from voyage_craft.conditional import ConditionalETagMixin, make_etag
+from voyage_craft.sparse import SparseFieldsetMixin, only_columns, requested_fields, validate_fields
+from voyage_craft.throttling import WriteThrottle
 from .models import Itinerary, ItineraryStep
-from .serializer import ItinerarySerializer, ItineraryStepSerializer
+from .serializer import ItinerarySerializer, ItineraryStepSerializer, ItinerarySummaryListSerializer
+from .ical import calendar_filename, iter_calendar
+from .utils import itinerary_etag, annotate_step_summary, summarize_itinerary, user_itinerary_conflicts
 
 
-class ListItinerariesView(generics.ListAPIView):
+class ListItinerariesView(SparseFieldsetMixin, generics.ListAPIView):
     queryset = Itinerary.objects.all()
     serializer_class = ItinerarySerializer
     permission_classes = [IsAuthenticated]
 
+    def include_summary(self) -> bool:
+        return self.request.query_params.get('summary', '').lower() in ('1', 'true')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.sparse_fields is None or 'steps' in self.sparse_fields:
+            queryset = queryset.prefetch_related('steps')
+        if self.include_summary():
+            queryset = annotate_step_summary(queryset).order_by('id')
+        return queryset
+
+    def get_serializer_class(self):
+        if self.include_summary():
+            return ItinerarySummaryListSerializer
+        return super().get_serializer_class()
+
+
+class AsyncListItinerariesView(AsyncAPIView):
+    """``ListItinerariesView`` for ASGI workers; steps are prefetched per chunk instead of per itinerary."""
+
+    async def get(self, request, *args, **kwargs) -> JsonResponse:
+        queryset = Itinerary.objects.all()
+        serializer_class = ItinerarySerializer
+        if request.GET.get('summary', '').lower() in ('1', 'true'):
+            queryset = annotate_step_summary(queryset).order_by('id')
+            serializer_class = ItinerarySummaryListSerializer
+
+        try:
+            fields = requested_fields(request.GET)
+            fields = fields and validate_fields(serializer_class, fields)
+        except ValidationError as exc:
+            return self.error_response(exc.detail, exc.status_code)
+        if fields is not None:
+            queryset = queryset.only(*only_columns(serializer_class, fields))
+        if fields is None or 'steps' in fields:
+            queryset = queryset.prefetch_related('steps')
+
+        itineraries = [itinerary async for itinerary in queryset.aiterator(chunk_size=500)]
+        return JsonResponse(serializer_class(itineraries, many=True, fields=fields).data, safe=False)
+
 
 class CreateItineraryView(generics.CreateAPIView):
     serializer_class = ItinerarySerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [WriteThrottle]
 
-class RetrieveUpdateDeleteItineraryView(generics.RetrieveUpdateDestroyAPIView):
+class RetrieveUpdateDeleteItineraryView(SparseFieldsetMixin, ConditionalETagMixin,
+                                        generics.RetrieveUpdateDestroyAPIView):
     queryset = Itinerary.objects.all()
     serializer_class = ItinerarySerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [WriteThrottle]
+
+    def get_etag(self, request, *args, **kwargs):
+        return itinerary_etag(kwargs['pk'], self.sparse_fields)
+
+
+class ItinerarySummaryView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Itinerary.objects.filter(user=self.request.user)
+
+    def get(self, request, *args, **kwargs) -> Response:
+        itinerary = self.get_object()
+        return Response(summarize_itinerary(itinerary), status=status.HTTP_200_OK)
+
+
+class ItineraryConflictsView(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs) -> Response:
+        conflicts = user_itinerary_conflicts(request.user)
+        return Response({'count': len(conflicts), 'conflicts': conflicts}, status=status.HTTP_200_OK)
+
+
+class CalendarResponseMixin:
+    def perform_content_negotiation(self, request, force=False):
+        # Calendar clients send Accept: text/calendar, which no DRF renderer claims.
+        return super().perform_content_negotiation(request, force=True)
+
+    def calendar_response(self, request, itineraries, filename, last_modified=None, etag=None):
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        etag = quote_etag(etag) if etag else None
+        not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            return not_modified
+
+        response = StreamingHttpResponse(iter_calendar(itineraries), content_type='text/calendar; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+
+
+class ItineraryCalendarView(CalendarResponseMixin, generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Itinerary.objects.filter(user=self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        itinerary = self.get_object()
+        itineraries = Itinerary.objects.filter(pk=itinerary.pk)
+        return self.calendar_response(request, itineraries, calendar_filename(itinerary),
+                                      last_modified=itinerary.updated_at)
+
+
+class UserCalendarFeedView(CalendarResponseMixin, generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Itinerary.objects.filter(user=self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        itineraries = self.get_queryset()
+        # Deleting an itinerary or a step lowers a count without moving any updated_at, so the
+        # feed is validated by an ETag only; Last-Modified alone would answer 304 after deletions.
+        state = itineraries.aggregate(
+            itinerary_count=Count('id', distinct=True), itinerary_updated=Max('updated_at'),
+            step_count=Count('steps'), step_updated=Max('steps__updated_at'),
+        )
+        etag = make_etag(request.user.pk, *state.values())
+        return self.calendar_response(request, itineraries, calendar_filename(), etag=etag)
 
 
 class CreateItineraryStepView(generics.CreateAPIView):
     serializer_class = ItineraryStepSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [WriteThrottle]
 
     def perform_create(self, serializer):
         itinerary_id = self.kwargs.get('itinerary_id')
@@ -34,3 +164,4 @@ class RetrieveUpdateDeleteItineraryStepView(generics.RetrieveUpdateDestroyAPIVie
     queryset = ItineraryStep.objects.all()
     serializer_class = ItineraryStepSerializer
     permission_classes = [IsAuthenticated]
+    throttle_classes = [WriteThrottle]
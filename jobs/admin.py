@@ -0,0 +1,22 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from voyage_craft.admin import LargeTableAdmin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_at', 'started_at', 'duration_ms', 'queries', 'locked_by')
+    list_filter = ('status',)
+    search_fields = ('name__startswith', '=dedup_key')
+    readonly_fields = ('locked_by', 'locked_at', 'started_at', 'finished_at', 'duration_ms', 'queries',
+                       'created_at', 'updated_at')
+    actions = (*LargeTableAdmin.actions, 'retry_now')
+
+    @admin.action(description='Retry failed jobs now')
+    def retry_now(self, request, queryset):
+        now = timezone.now()
+        updated = queryset.filter(status=Job.Status.FAILED).update(status=Job.Status.QUEUED, run_at=now, attempts=0,
+                                                                   updated_at=now)
+        self.message_user(request, f'{updated} jobs queued again.', messages.SUCCESS)
@@ -0,0 +1,50 @@
+import signal
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from jobs.registry import tasks
+from jobs.worker import Worker
+from voyage_craft.benchmarking import summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Run background jobs from the database queue on a pool of threads or processes until interrupted. '
+        'SIGINT/SIGTERM stop claiming and wait for running jobs. On exit, per-task timings are printed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help='Threads for I/O-bound tasks, spawned processes for CPU-bound ones.')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls when idle.')
+        parser.add_argument('--once', action='store_true', help='Exit when no job is due.')
+        parser.add_argument('--max-jobs', type=int, help='Exit after running this many jobs.')
+
+    def handle(self, *args, **options):
+        worker = Worker(options['concurrency'], options['pool'], options['poll_interval'])
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, worker.stop)
+        if options['verbosity']:
+            pool = 'threads' if options['pool'] == 'thread' else 'processes'
+            self.stdout.write(f'Worker {worker.id}: {options["concurrency"]} {pool}, {len(tasks)} tasks registered')
+
+        results = worker.run(once=options['once'], max_jobs=options['max_jobs'])
+
+        if options['verbosity']:
+            self.write_summary(results)
+
+    def write_summary(self, results: list):
+        by_task = defaultdict(list)
+        for result in results:
+            by_task[result['task']].append(result)
+        for name, runs in sorted(by_task.items()):
+            stats = summarize([run['duration_ms'] for run in runs], [run['queries'] for run in runs])
+            statuses = defaultdict(int)
+            for run in runs:
+                statuses[run['status']] += 1
+            self.stdout.write(
+                f'{name}: {len(runs)} runs ({", ".join(f"{count} {status}" for status, count in statuses.items())}) '
+                f'p50 {stats["p50_ms"]} ms, p99 {stats["p99_ms"]} ms, {stats["mean_queries"]} queries per run'
+            )
@@ -0,0 +1,159 @@
+import random
+from datetime import timedelta
+
+from django.db import IntegrityError, connections, models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .registry import job_setting
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter: about RETRY_BACKOFF * 2**(attempts - 1) seconds, capped."""
+    delay = min(job_setting('RETRY_BACKOFF') * 2 ** (attempts - 1), job_setting('RETRY_BACKOFF_MAX'))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class JobManager(models.Manager):
+
+    def enqueue(self, name: str, payload: dict = None, *, dedup_key: str = None, run_at=None, priority: int = 0,
+                max_attempts: int = None):
+        """
+        Queue task ``name`` with ``payload`` and return its job.
+
+        While a job with the same ``dedup_key`` is still waiting, that job is
+        returned instead of queueing another one. Once it has been claimed a
+        new job can be queued, so changes made during a run are not lost.
+        """
+        job = Job(name=name, payload=payload or {}, dedup_key=dedup_key, run_at=run_at or timezone.now(),
+                  priority=priority, max_attempts=max_attempts or job_setting('MAX_ATTEMPTS'))
+        if dedup_key is None:
+            job.save(using=self.db)
+            return job
+        try:
+            with transaction.atomic(using=self.db):
+                job.save(using=self.db)
+            return job
+        except IntegrityError:
+            waiting = self.filter(dedup_key=dedup_key, status=Job.Status.QUEUED).first()
+            # Claimed between the failed insert and this read: try again.
+            return waiting or self.enqueue(name, payload, dedup_key=dedup_key, run_at=run_at, priority=priority,
+                                           max_attempts=max_attempts)
+
+    def claim(self, worker: str, limit: int = 1) -> list:
+        """
+        Mark up to ``limit`` due jobs as running for ``worker`` and return them.
+
+        On PostgreSQL ``FOR UPDATE SKIP LOCKED`` lets concurrent workers claim
+        different rows without waiting on each other. Databases without it
+        (SQLite) claim each candidate with an UPDATE conditioned on it still
+        being queued; writers are serialised there, so only one worker wins.
+        """
+        now = timezone.now()
+        ready = self.filter(status=Job.Status.QUEUED, run_at__lte=now).order_by('-priority', 'run_at', 'pk')
+        claimed = {'status': Job.Status.RUNNING, 'locked_by': worker, 'locked_at': now, 'started_at': now,
+                   'finished_at': None, 'attempts': F('attempts') + 1, 'updated_at': now}
+
+        if connections[self.db].features.has_select_for_update_skip_locked:
+            with transaction.atomic(using=self.db):
+                ids = list(ready.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+                self.filter(pk__in=ids).update(**claimed)
+        else:
+            ids = []
+            for pk in ready.values_list('pk', flat=True)[:limit]:
+                if self.filter(pk=pk, status=Job.Status.QUEUED).update(**claimed):
+                    ids.append(pk)
+        return list(self.filter(pk__in=ids).order_by('-priority', 'run_at', 'pk'))
+
+    def finish(self, job, worker: str, error: str = None, duration_ms: float = None, queries: int = None):
+        """
+        Record the outcome of ``worker``'s run of ``job`` and return the new status.
+
+        Failures are queued again after ``retry_delay`` until ``max_attempts``
+        runs have failed. If the job was requeued as stale meanwhile, nothing
+        is written and None is returned.
+        """
+        now = timezone.now()
+        values = {'status': Job.Status.SUCCEEDED, 'last_error': error or '', 'locked_by': '', 'locked_at': None,
+                  'finished_at': now, 'duration_ms': duration_ms, 'queries': queries, 'updated_at': now}
+        if error is not None:
+            if job.attempts >= job.max_attempts:
+                values['status'] = Job.Status.FAILED
+            else:
+                values.update(status=Job.Status.QUEUED, run_at=now + timedelta(seconds=retry_delay(job.attempts)))
+
+        owned = self.filter(pk=job.pk, status=Job.Status.RUNNING, locked_by=worker)
+        try:
+            with transaction.atomic(using=self.db):
+                updated = owned.update(**values)
+        except IntegrityError:
+            # A job with the same dedup key was queued meanwhile and will do the same work.
+            values.update(status=Job.Status.FAILED, last_error=f'{error}\nNot retried: a queued job has the same '
+                                                                 f'dedup key.')
+            updated = owned.update(**values)
+        return values['status'] if updated else None
+
+    def requeue_stale(self) -> int:
+        """Queue again the jobs whose worker has held them longer than LOCK_TIMEOUT seconds, presumably dead."""
+        now = timezone.now()
+        stale = self.filter(status=Job.Status.RUNNING,
+                            locked_at__lt=now - timedelta(seconds=job_setting('LOCK_TIMEOUT')))
+        lost = {'locked_by': '', 'locked_at': None, 'updated_at': now}
+        failed = {'status': Job.Status.FAILED, 'last_error': 'Worker lost while running the job.',
+                  'finished_at': now, **lost}
+        stale.filter(attempts__gte=F('max_attempts')).update(**failed)
+
+        requeued = 0
+        # Few rows: one by one, so a job whose dedup key is queued again meanwhile fails alone.
+        for pk in stale.values_list('pk', flat=True):
+            running = self.filter(pk=pk, status=Job.Status.RUNNING)
+            try:
+                with transaction.atomic(using=self.db):
+                    requeued += running.update(status=Job.Status.QUEUED, run_at=now, **lost)
+            except IntegrityError:
+                running.update(**failed)
+        return requeued
+
+
+class Job(models.Model):
+    class Status(models.TextChoices):
+        QUEUED = 'queued', 'Queued'
+        RUNNING = 'running', 'Running'
+        SUCCEEDED = 'succeeded', 'Succeeded'
+        FAILED = 'failed', 'Failed'
+
+    name = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.QUEUED)
+    dedup_key = models.CharField(max_length=255, null=True, blank=True)
+    priority = models.SmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    last_error = models.TextField(blank=True)
+    locked_by = models.CharField(max_length=255, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration_ms = models.FloatField(null=True, blank=True)
+    queries = models.PositiveIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = JobManager()
+
+    class Meta:
+        db_table = 'jobs'
+        indexes = [
+            # Partial indexes: the queue and running set stay small however many finished jobs are kept.
+            models.Index(fields=['-priority', 'run_at'], condition=Q(status='queued'), name='jobs_ready_idx'),
+            models.Index(fields=['locked_at'], condition=Q(status='running'), name='jobs_running_idx'),
+            models.Index(fields=['finished_at'], name='jobs_finished_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['dedup_key'], condition=Q(status='queued'),
+                                    name='jobs_queued_dedup_key'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
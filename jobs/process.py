@@ -0,0 +1,16 @@
+"""
+Process pool entry points.
+
+Spawned children import these by reference before the initializer has run,
+so this module must not import models at load time.
+"""
+import django
+
+
+def setup():
+    django.setup()
+
+
+def execute(job_id: int, worker: str) -> dict:
+    from .worker import execute_and_close
+    return execute_and_close(job_id, worker)
@@ -0,0 +1,39 @@
+from django.conf import settings
+
+DEFAULTS = {
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 5,
+    'RETRY_BACKOFF_MAX': 3600,
+    'LOCK_TIMEOUT': 600,
+    'KEEP_FINISHED_DAYS': 7,
+}
+
+# Task name -> function; filled by @task as the tasks modules are imported.
+tasks = {}
+
+
+def job_setting(name):
+    return getattr(settings, 'JOBS', {}).get(name, DEFAULTS[name])
+
+
+def task(name: str = None):
+    """
+    Register a function as a background task under ``name`` (default ``module.function``).
+
+    The function is called with the job's JSON payload as keyword arguments.
+    It gains an ``enqueue(payload=None, **options)`` method taking the options
+    of ``Job.objects.enqueue``. A task may run more than once when a worker
+    dies mid-job or it fails and is retried, so it should be idempotent.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        tasks[task_name] = func
+
+        def enqueue(payload: dict = None, **options):
+            from .models import Job
+            return Job.objects.enqueue(task_name, payload, **options)
+
+        func.task_name = task_name
+        func.enqueue = enqueue
+        return func
+    return decorator
@@ -0,0 +1,13 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Job
+from .registry import job_setting, task
+
+
+@task('jobs.purge_finished')
+def purge_finished(days: int = None):
+    """Delete succeeded and failed jobs that finished more than ``days`` (default KEEP_FINISHED_DAYS) ago."""
+    cutoff = timezone.now() - timedelta(days=job_setting('KEEP_FINISHED_DAYS') if days is None else days)
+    Job.objects.filter(status__in=[Job.Status.SUCCEEDED, Job.Status.FAILED], finished_at__lt=cutoff).delete()
@@ -0,0 +1,118 @@
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .models import Job
+from .registry import task
+from .worker import execute
+
+calls = []
+
+
+@task('jobs.tests.record')
+def record(value=None):
+    calls.append(value)
+
+
+@task('jobs.tests.fail')
+def fail():
+    raise ValueError('boom')
+
+
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_dedup_key_returns_the_waiting_job(self):
+        """
+        Given a queued job with a dedup key
+        When the same key is enqueued again
+        Then the waiting job should be returned
+        And once it has been claimed, a new job should be queued for the key
+        """
+        first = record.enqueue({'value': 1}, dedup_key='profile:1')
+        again = record.enqueue({'value': 2}, dedup_key='profile:1')
+        self.assertEqual(again.pk, first.pk)
+
+        Job.objects.claim('worker-a')
+        after_claim = record.enqueue({'value': 3}, dedup_key='profile:1')
+
+        self.assertNotEqual(after_claim.pk, first.pk)
+        self.assertEqual(Job.objects.count(), 2)
+
+    def test_claim_takes_due_jobs_by_priority(self):
+        """
+        Given a later job, a normal job and a high-priority job
+        When a worker claims two jobs
+        Then it should get the due ones, high priority first, marked running with one attempt
+        And another worker should find nothing left to claim
+        """
+        normal = record.enqueue()
+        urgent = record.enqueue(priority=10)
+        record.enqueue(run_at=timezone.now() + timedelta(hours=1))
+
+        claimed = Job.objects.claim('worker-a', limit=2)
+
+        self.assertEqual([job.pk for job in claimed], [urgent.pk, normal.pk])
+        self.assertTrue(all(job.status == Job.Status.RUNNING and job.attempts == 1 for job in claimed))
+        self.assertEqual(Job.objects.claim('worker-b', limit=2), [])
+
+    @override_settings(JOBS={'RETRY_BACKOFF': 10})
+    def test_failures_are_retried_with_backoff_then_failed(self):
+        """
+        Given a task that always raises, allowed two attempts
+        When it is run twice
+        Then the first failure should queue it again after the backoff
+        And the second should mark it failed with the traceback
+        """
+        job = fail.enqueue(max_attempts=2)
+
+        Job.objects.claim('worker-a')
+        result = execute(job.pk, 'worker-a')
+        job.refresh_from_db()
+        self.assertEqual((result['status'], job.status), ('queued', Job.Status.QUEUED))
+        self.assertGreaterEqual(job.run_at, timezone.now() + timedelta(seconds=4))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        Job.objects.claim('worker-a')
+        execute(job.pk, 'worker-a')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.FAILED, 2))
+        self.assertIn('ValueError: boom', job.last_error)
+
+    @override_settings(JOBS={'LOCK_TIMEOUT': 60})
+    def test_stale_running_jobs_are_requeued(self):
+        """
+        Given a job claimed by a worker that stopped two minutes ago
+        When stale jobs are requeued
+        Then it should be queued again and the dead worker's result should be ignored
+        """
+        job = record.enqueue()
+        Job.objects.claim('dead-worker')
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(minutes=2))
+
+        self.assertEqual(Job.objects.requeue_stale(), 1)
+        self.assertIsNone(Job.objects.finish(Job.objects.get(pk=job.pk), 'dead-worker'))
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.Status.QUEUED)
+
+
+class RunWorkerCommandTests(TransactionTestCase):
+
+    def test_worker_runs_queued_jobs_and_records_timing(self):
+        """
+        Given five queued jobs
+        When run_worker drains the queue with two threads
+        Then every job should succeed with its duration and query count recorded
+        """
+        calls.clear()
+        for value in range(5):
+            record.enqueue({'value': value})
+
+        call_command('run_worker', concurrency=2, once=True, poll_interval=0.01, verbosity=0)
+
+        self.assertEqual(sorted(calls), [0, 1, 2, 3, 4])
+        self.assertFalse(Job.objects.exclude(status=Job.Status.SUCCEEDED).exists())
+        self.assertFalse(Job.objects.filter(duration_ms__isnull=True).exists())
@@ -0,0 +1,132 @@
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.db import connections
+
+from voyage_craft.metrics import QueryRecorder, record_queries
+from . import process
+from .models import Job
+from .registry import job_setting, tasks
+
+logger = logging.getLogger(__name__)
+
+
+def execute(job_id: int, worker: str) -> dict:
+    """Run one claimed job, record its outcome and timing on the row and return them."""
+    job = Job.objects.get(pk=job_id)
+    recorder = QueryRecorder()
+    started = time.perf_counter()
+    error = None
+    try:
+        func = tasks.get(job.name)
+        if func is None:
+            raise LookupError(f'No task registered as {job.name!r}')
+        with record_queries(recorder):
+            func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+    duration_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    status = Job.objects.finish(job, worker, error, duration_ms, recorder.count)
+    result = {
+        'job_id': job.pk,
+        'task': job.name,
+        'status': status,
+        'attempts': job.attempts,
+        'duration_ms': duration_ms,
+        'queries': recorder.count,
+        'wait_ms': round((job.started_at - job.run_at).total_seconds() * 1000, 3),
+    }
+    logger.log(logging.INFO if error is None else logging.WARNING, 'Job %s %s %s', job.pk, job.name, status,
+               extra=result)
+    return result
+
+
+def execute_and_close(job_id: int, worker: str) -> dict:
+    # Pool threads and processes outlive the job; a connection per job keeps them from holding idle ones.
+    try:
+        return execute(job_id, worker)
+    finally:
+        connections.close_all()
+
+
+class Worker:
+    """
+    Claim due jobs and run them on a pool of ``concurrency`` threads or processes.
+
+    Threads suit tasks that mostly wait on the database or the network;
+    processes (spawned, each with its own Django setup) suit CPU-bound ones.
+    The loop only claims as many jobs as there are free slots, so jobs are
+    never held while waiting for a slot, and requeues jobs left running by
+    dead workers every LOCK_TIMEOUT / 10 seconds.
+    """
+
+    def __init__(self, concurrency: int = 4, pool: str = 'thread', poll_interval: float = 1.0):
+        self.concurrency = concurrency
+        self.pool = pool
+        self.poll_interval = poll_interval
+        self.id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}'
+        self.stopping = threading.Event()
+
+    def executor(self):
+        if self.pool == 'process':
+            # Connections must not be shared with the children.
+            connections.close_all()
+            return ProcessPoolExecutor(self.concurrency, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=process.setup)
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix='job')
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def run(self, once: bool = False, max_jobs: int = None) -> list:
+        """
+        Process jobs until ``stop`` is called and return one result dict per job run.
+
+        With ``once`` the worker exits when no job is due and none is running;
+        ``max_jobs`` stops claiming after that many jobs.
+        """
+        results, running, claimed_total = [], set(), 0
+        next_stale_check = 0.0
+        with self.executor() as executor:
+            while not self.stopping.is_set():
+                if time.monotonic() >= next_stale_check:
+                    Job.objects.requeue_stale()
+                    next_stale_check = time.monotonic() + job_setting('LOCK_TIMEOUT') / 10
+
+                free = self.concurrency - len(running)
+                if max_jobs is not None:
+                    free = min(free, max_jobs - claimed_total)
+                claimed = Job.objects.claim(self.id, free) if free > 0 else []
+                claimed_total += len(claimed)
+                run = process.execute if self.pool == 'process' else execute_and_close
+                running.update(executor.submit(run, job.pk, self.id) for job in claimed)
+
+                if not running:
+                    if once or (max_jobs is not None and claimed_total >= max_jobs):
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                done, running = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                results += self.collect(done)
+
+            results += self.collect(wait(running).done)
+        return results
+
+    @staticmethod
+    def collect(done) -> list:
+        results = []
+        for future in done:
+            try:
+                results.append(future.result())
+            except Exception:
+                # The job stays running and is requeued once its lock times out.
+                logger.exception('Running a job failed outside its task')
+        return results
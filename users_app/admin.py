@@ -1,4 +1,5 @@
 from django.contrib import admin
+from voyage_craft.admin import LargeTableAdmin
 from .models import User, Preference
 
 # Register your models here.
@@ -9,9 +10,12 @@ admin.site.register(User)
 
 
 @admin.register(Preference)
-class PreferenceAdmin(admin.ModelAdmin):
+class PreferenceAdmin(LargeTableAdmin):
     list_display = ('user', 'preference_type', 'preference_value', 'created_at', 'updated_at')
-    search_fields = ('user__username', 'preference_type')
+    list_select_related = ('user',)
+    # Exact match uses the unique username index; a substring search would scan every preference.
+    search_fields = ('=user__username',)
+    raw_id_fields = ('user',)
 
 
 
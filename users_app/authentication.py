@@ -0,0 +1,85 @@
+import copy
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from voyage_craft.lru import TTLLRUCache
+
+user_cache = TTLLRUCache(
+    maxsize=getattr(settings, 'JWT_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'JWT_USER_CACHE_TTL', 60),
+)
+
+
+def user_cache_key(user_id) -> str:
+    return str(user_id)
+
+
+def invalidate_cached_user(user):
+    user_cache.delete(user_cache_key(getattr(user, api_settings.USER_ID_FIELD)))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    ``JWTAuthentication`` that resolves the token's user from a per-worker cache.
+
+    The database is only read on a miss. Saving or deleting a user drops its
+    entry in this worker; other workers pick the change up once the entry
+    expires after ``JWT_USER_CACHE_TTL`` seconds.
+    """
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    def check_password_unchanged(self, validated_token, user):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+    def get_user(self, validated_token):
+        key = user_cache_key(self.get_user_id(validated_token))
+        user = user_cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(key, user)
+            return copy.copy(user)
+
+        self.check_password_unchanged(validated_token, user)
+        # Each request gets its own instance so views can modify it freely.
+        return copy.copy(user)
+
+    async def aauthenticate(self, request):
+        """``authenticate`` for Django async views: only a cache miss touches the database, through ``aget``."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        key = user_cache_key(user_id)
+        user = user_cache.get(key)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            if not user.is_active:
+                raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+            user_cache.set(key, user)
+
+        self.check_password_unchanged(validated_token, user)
+        return copy.copy(user)
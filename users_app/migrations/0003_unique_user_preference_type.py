@@ -0,0 +1,31 @@
+# Generated by Django 5.1 on 2026-10-19 17:15
+
+from django.db import migrations, models
+
+
+def remove_duplicate_preferences(apps, schema_editor):
+    Preference = apps.get_model('users_app', 'Preference')
+    seen = set()
+    duplicates = []
+    for pk, user_id, preference_type in Preference.objects.order_by('-updated_at', '-id').values_list(
+            'pk', 'user_id', 'preference_type').iterator():
+        if (user_id, preference_type) in seen:
+            duplicates.append(pk)
+        else:
+            seen.add((user_id, preference_type))
+    Preference.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users_app', '0002_preference'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_preferences, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='preference',
+            constraint=models.UniqueConstraint(fields=('user', 'preference_type'), name='unique_user_preference_type'),
+        ),
+    ]
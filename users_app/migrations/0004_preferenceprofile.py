@@ -0,0 +1,33 @@
+# Generated by Django 5.1 on 2026-10-19 17:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users_app', '0003_unique_user_preference_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PreferenceProfile',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='preference_profile', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('landscapes', models.PositiveIntegerField(default=0)),
+                ('tourism_types', models.PositiveIntegerField(default=0)),
+                ('climates', models.PositiveIntegerField(default=0)),
+                ('cost_level', models.PositiveSmallIntegerField(blank=True, choices=[(1, 'Low'), (2, 'Medium'), (3, 'High')], null=True)),
+                ('trip_duration', models.PositiveSmallIntegerField(blank=True, choices=[(1, '1-3 days'), (2, '4-7 days'), (3, '1-2 weeks'), (4, '2 weeks or more')], null=True)),
+                ('accessibility', models.BooleanField(blank=True, null=True)),
+                ('family_friendly', models.BooleanField(blank=True, null=True)),
+                ('preference_count', models.PositiveSmallIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'user_preference_profiles',
+            },
+        ),
+    ]
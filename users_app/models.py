@@ -14,6 +14,23 @@ class User(AbstractUser):
 
 
 class Preference(models.Model):
+    VALID_VALUES = {
+        'climate': ['Sunny', 'Cloudy', 'Rainy', 'Cold', 'Warm', 'Tropical', 'Snowy'],
+        'landscape': ['Beach', 'Mountains', 'Forest', 'Desert', 'Urban/Cities', 'Countryside', 'Lakes/Rivers'],
+        'tourism_type': ['Cultural', 'Adventure', 'Relaxation', 'Nature', 'Nightlife', 'Family-friendly',
+                         'Shopping'],
+        'trip_duration': ['1-3 days', '4-7 days', '1-2 weeks', '2 weeks or more'],
+        'cost_level': ['Low', 'Medium', 'High'],
+        'accessibility': ['True', 'False'],
+        'family_friendly': ['True', 'False']
+    }
+
+    # Older clients stored these names for the same preferences.
+    TYPE_ALIASES = {
+        'preferred_climate': 'climate',
+        'travel_duration': 'trip_duration',
+    }
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -35,3 +52,101 @@ class Preference(models.Model):
         permissions = [
             ("can_change_preference_type", "Can change the preference type"),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'preference_type'], name='unique_user_preference_type'),
+        ]
+
+
+class PreferenceProfile(models.Model):
+    """
+    A user's preferences compiled into typed columns.
+
+    Multi-valued categories are bitmasks over ``Preference.VALID_VALUES``;
+    ``None`` means the user expressed no preference.
+    """
+
+    class CostLevel(models.IntegerChoices):
+        LOW = 1, 'Low'
+        MEDIUM = 2, 'Medium'
+        HIGH = 3, 'High'
+
+    class TripDuration(models.IntegerChoices):
+        SHORT = 1, '1-3 days'
+        WEEK = 2, '4-7 days'
+        TWO_WEEKS = 3, '1-2 weeks'
+        LONG = 4, '2 weeks or more'
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='preference_profile'
+    )
+    landscapes = models.PositiveIntegerField(default=0)
+    tourism_types = models.PositiveIntegerField(default=0)
+    climates = models.PositiveIntegerField(default=0)
+    cost_level = models.PositiveSmallIntegerField(choices=CostLevel.choices, null=True, blank=True)
+    trip_duration = models.PositiveSmallIntegerField(choices=TripDuration.choices, null=True, blank=True)
+    accessibility = models.BooleanField(null=True, blank=True)
+    family_friendly = models.BooleanField(null=True, blank=True)
+    preference_count = models.PositiveSmallIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    MASK_FIELDS = {
+        'landscapes': 'landscape',
+        'tourism_types': 'tourism_type',
+        'climates': 'climate',
+    }
+
+    def __str__(self):
+        return f"{self.user_id} preference profile"
+
+    class Meta:
+        db_table = 'user_preference_profiles'
+
+    @property
+    def has_preferences(self) -> bool:
+        return self.preference_count > 0
+
+    @staticmethod
+    def decode(mask: int, preference_type: str) -> list:
+        return [value for bit, value in enumerate(Preference.VALID_VALUES[preference_type]) if mask & (1 << bit)]
+
+    @property
+    def landscape_values(self) -> list:
+        return self.decode(self.landscapes, 'landscape')
+
+    @property
+    def tourism_type_values(self) -> list:
+        return self.decode(self.tourism_types, 'tourism_type')
+
+    @property
+    def climate_values(self) -> list:
+        return self.decode(self.climates, 'climate')
+
+    @property
+    def cost_level_value(self):
+        return self.CostLevel(self.cost_level).label if self.cost_level else None
+
+    @property
+    def trip_duration_value(self):
+        return self.TripDuration(self.trip_duration).label if self.trip_duration else None
+
+
+class RevokedToken(models.Model):
+    jti = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='revoked_tokens'
+    )
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+    class Meta:
+        db_table = 'revoked_tokens'
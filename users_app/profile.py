@@ -0,0 +1,87 @@
+from django.conf import settings
+
+from voyage_craft.lru import TTLLRUCache
+from .models import Preference, PreferenceProfile
+
+profile_cache = TTLLRUCache(
+    maxsize=getattr(settings, 'PREFERENCE_PROFILE_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'PREFERENCE_PROFILE_CACHE_TTL', 60),
+)
+
+MASK_TYPES = {preference_type: field for field, preference_type in PreferenceProfile.MASK_FIELDS.items()}
+
+UPSERT_OPTIONS = {
+    'update_conflicts': True,
+    'unique_fields': ['user'],
+    'update_fields': [field.name for field in PreferenceProfile._meta.concrete_fields if not field.primary_key],
+}
+
+
+def compile_profile(user_id, preferences) -> PreferenceProfile:
+    """
+    Compile ``(preference_type, preference_value)`` pairs into a profile.
+
+    Unknown types still count towards ``preference_count``; values outside
+    ``Preference.VALID_VALUES`` are ignored.
+    """
+    profile = PreferenceProfile(user_id=user_id)
+    for preference_type, preference_value in preferences:
+        profile.preference_count += 1
+        preference_type = Preference.TYPE_ALIASES.get(preference_type, preference_type)
+        valid_values = Preference.VALID_VALUES.get(preference_type)
+        value = preference_value.strip()
+        if preference_type in ('accessibility', 'family_friendly'):
+            setattr(profile, preference_type, value.lower() == 'true')
+            continue
+        if valid_values is None or value not in valid_values:
+            continue
+
+        if preference_type in MASK_TYPES:
+            field = MASK_TYPES[preference_type]
+            setattr(profile, field, getattr(profile, field) | 1 << valid_values.index(value))
+        elif preference_type == 'cost_level':
+            profile.cost_level = PreferenceProfile.CostLevel[value.upper()]
+        elif preference_type == 'trip_duration':
+            profile.trip_duration = valid_values.index(value) + 1
+    return profile
+
+
+def build_preference_profile(user_id) -> PreferenceProfile:
+    preferences = Preference.objects.filter(user_id=user_id).values_list('preference_type', 'preference_value')
+    profile = compile_profile(user_id, preferences)
+    PreferenceProfile.objects.bulk_create([profile], **UPSERT_OPTIONS)
+    profile_cache.set(user_id, profile)
+    return profile
+
+
+async def abuild_preference_profile(user_id) -> PreferenceProfile:
+    preferences = Preference.objects.filter(user_id=user_id).values_list('preference_type', 'preference_value')
+    profile = compile_profile(user_id, [pair async for pair in preferences])
+    await PreferenceProfile.objects.abulk_create([profile], **UPSERT_OPTIONS)
+    profile_cache.set(user_id, profile)
+    return profile
+
+
+def get_preference_profile(user) -> PreferenceProfile:
+    user_id = getattr(user, 'pk', user)
+    profile = profile_cache.get(user_id)
+    if profile is None:
+        profile = PreferenceProfile.objects.filter(user_id=user_id).first() or build_preference_profile(user_id)
+        profile_cache.set(user_id, profile)
+    return profile
+
+
+async def aget_preference_profile(user) -> PreferenceProfile:
+    user_id = getattr(user, 'pk', user)
+    profile = profile_cache.get(user_id)
+    if profile is None:
+        profile = await PreferenceProfile.objects.filter(user_id=user_id).afirst()
+        profile = profile or await abuild_preference_profile(user_id)
+        profile_cache.set(user_id, profile)
+    return profile
+
+
+def invalidate_preference_profile(user_id):
+    # Rebuilt lazily on the next read; safe while the user itself is being deleted.
+    profile_cache.delete(user_id)
+    PreferenceProfile.objects.filter(user_id=user_id).delete()
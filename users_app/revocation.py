@@ -0,0 +1,133 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import RevokedToken
+
+DEFAULTS = {
+    'BLOOM_CAPACITY': 100000,
+    'BLOOM_ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': 5,
+    'SYNC_MARGIN': 60,
+    'REBUILD_INTERVAL': 600,
+}
+
+
+def revocation_setting(name):
+    return getattr(settings, 'TOKEN_REVOCATION', {}).get(name, DEFAULTS[name])
+
+
+class BloomFilter:
+    """
+    Bit array sized for ``capacity`` keys at the given false-positive rate.
+
+    ``key in bloom`` is never wrong for added keys; for other keys it is
+    wrong with probability ``error_rate`` while ``len(bloom) <= capacity``.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        if not 0 < error_rate < 1:
+            raise ValueError('error_rate must be between 0 and 1.')
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.size = math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * second) % self.size for index in range(self.hash_count)]
+
+    def add(self, key: str):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class RevocationStore:
+    """
+    Per-process view of ``RevokedToken`` in front of the database.
+
+    A Bloom filter answers "definitely not revoked" without a query; only
+    possible hits are confirmed against the table. Rows revoked by other
+    workers are pulled in incrementally every ``SYNC_INTERVAL`` seconds, which
+    bounds how long they can go unnoticed here. Set it to 0 to sync on every
+    check.
+
+    Ids are not handed out in commit order, so each pull goes back
+    ``SYNC_MARGIN`` seconds before the previous one by ``created_at`` rather
+    than resuming after the highest id seen; rows already in the filter are
+    skipped. A full rebuild every ``REBUILD_INTERVAL`` seconds catches rows
+    whose transaction took longer than the margin to commit.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.pulled_at = None
+        self.synced_at = 0.0
+        self.rebuilt_at = 0.0
+
+    def rebuild(self):
+        pulled_at = timezone.now()
+        revoked = RevokedToken.objects.filter(expires_at__gt=pulled_at)
+        capacity = max(revocation_setting('BLOOM_CAPACITY'), revoked.count() * 2)
+        bloom = BloomFilter(capacity, revocation_setting('BLOOM_ERROR_RATE'))
+        for jti in revoked.values_list('jti', flat=True).iterator(chunk_size=10000):
+            bloom.add(jti)
+        self.bloom, self.pulled_at = bloom, pulled_at
+        self.synced_at = self.rebuilt_at = time.monotonic()
+
+    def sync(self):
+        with self.lock:
+            now = time.monotonic()
+            if (self.bloom is None or len(self.bloom) > self.bloom.capacity
+                    or now - self.rebuilt_at >= revocation_setting('REBUILD_INTERVAL')):
+                self.rebuild()
+                return
+            if now - self.synced_at < revocation_setting('SYNC_INTERVAL'):
+                return
+            pulled_at = timezone.now()
+            since = self.pulled_at - timedelta(seconds=revocation_setting('SYNC_MARGIN'))
+            for jti in RevokedToken.objects.filter(created_at__gte=since, expires_at__gt=pulled_at).values_list(
+                    'jti', flat=True):
+                if jti not in self.bloom:
+                    self.bloom.add(jti)
+            self.pulled_at, self.synced_at = pulled_at, time.monotonic()
+
+    def is_revoked(self, jti: str) -> bool:
+        self.sync()
+        if jti not in self.bloom:
+            return False
+        return RevokedToken.objects.filter(jti=jti).exists()
+
+    def revoke(self, jti: str, expires_at, user=None):
+        RevokedToken.objects.bulk_create(
+            [RevokedToken(jti=jti, expires_at=expires_at, user=user)], ignore_conflicts=True
+        )
+        self.sync()
+        with self.lock:
+            self.bloom.add(jti)
+
+    def reset(self):
+        with self.lock:
+            self.bloom = None
+            self.pulled_at = None
+
+
+revocation_store = RevocationStore()
@@ -1,5 +1,12 @@
+from datetime import datetime, timezone
+
 from .models import User, Preference
+from .revocation import revocation_store
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -66,18 +73,39 @@ class PreferenceSerializer(serializers.ModelSerializer):
         preference_type = data.get('preference_type')
         preference_value = data.get('preference_value')
 
-        valid_values = {
-            'climate': ['Sunny', 'Cloudy', 'Rainy', 'Cold', 'Warm', 'Tropical', 'Snowy'],
-            'landscape': ['Beach', 'Mountains', 'Forest', 'Desert', 'Urban/Cities', 'Countryside', 'Lakes/Rivers'],
-            'tourism_type': ['Cultural', 'Adventure', 'Relaxation', 'Nature', 'Nightlife', 'Family-friendly',
-                             'Shopping'],
-            'trip_duration': ['1-3 days', '4-7 days', '1-2 weeks', '2 weeks or more'],
-            'cost_level': ['Low', 'Medium', 'High'],
-            'accessibility': ['True', 'False'],
-            'family_friendly': ['True', 'False']
-        }
+        valid_values = Preference.VALID_VALUES
 
         if preference_type in valid_values and preference_value not in valid_values[preference_type]:
             raise serializers.ValidationError(f"Invalid preference value for {preference_type}.")
 
         return data
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        if revocation_store.is_revoked(refresh[api_settings.JTI_CLAIM]):
+            raise InvalidToken('Token has been revoked.')
+        return super().validate(attrs)
+
+
+class LogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate_refresh(self, value):
+        try:
+            return RefreshToken(value)
+        except TokenError as error:
+            raise serializers.ValidationError(str(error))
+
+    def validate(self, data):
+        # Without this anyone logged in could revoke another user's refresh token.
+        user = self.context['request'].user
+        if str(data['refresh'].get(api_settings.USER_ID_CLAIM)) != str(getattr(user, api_settings.USER_ID_FIELD)):
+            raise serializers.ValidationError({'refresh': ['Token does not belong to the authenticated user.']})
+        return data
+
+    def save(self, **kwargs):
+        refresh = self.validated_data['refresh']
+        expires_at = datetime.fromtimestamp(refresh['exp'], tz=timezone.utc)
+        revocation_store.revoke(refresh[api_settings.JTI_CLAIM], expires_at, user=self.context['request'].user)
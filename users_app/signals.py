@@ -0,0 +1,16 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_user
+from .models import Preference, User
+from .profile import invalidate_preference_profile
+
+
+@receiver([post_save, post_delete], sender=Preference)
+def preference_changed(sender, instance, **kwargs):
+    invalidate_preference_profile(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, **kwargs):
+    invalidate_cached_user(instance)
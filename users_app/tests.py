@@ -1,7 +1,17 @@
+from datetime import timedelta
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
-from users_app.models import User, Preference
+from rest_framework_simplejwt.tokens import RefreshToken
+from users_app.models import User, Preference, PreferenceProfile, RevokedToken
+from users_app.authentication import user_cache
+from users_app.profile import compile_profile, get_preference_profile, profile_cache
+from users_app.revocation import BloomFilter, revocation_store
 
 
 class BaseTestCase(APITestCase):
@@ -19,8 +29,8 @@ class BaseTestCase(APITestCase):
             password='password123'
         )
         self.preference_data = {
-            'preference_type': 'Music',
-            'preference_value': 'Jazz'
+            'preference_type': 'climate',
+            'preference_value': 'Sunny'
         }
         self.client.force_authenticate(user=self.user)
         self.create_preference_url = reverse('preferences')
@@ -119,8 +129,8 @@ class PreferenceTestCase(BaseTestCase):
         data = {
             "preferences": [
                 {
-                    "preference_type": "Music",
-                    "preference_value": "Jazz"
+                    "preference_type": "climate",
+                    "preference_value": "Sunny"
                 }
             ]
         }
@@ -128,7 +138,7 @@ class PreferenceTestCase(BaseTestCase):
         response = self.client.post(self.create_preference_url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Preference.objects.filter(user=self.user).count(), 1)
-        self.assertEqual(Preference.objects.get().preference_value, 'Jazz')
+        self.assertEqual(Preference.objects.get().preference_value, 'Sunny')
 
     def test_create_preference_with_invalid_data(self):
         """
@@ -164,8 +174,8 @@ class PreferenceTestCase(BaseTestCase):
         updated_data = {
             "preferences": [
                 {
-                    "preference_type": "Music",
-                    "preference_value": "Rock"
+                    "preference_type": "climate",
+                    "preference_value": "Rainy"
                 }
             ]
         }
@@ -173,7 +183,54 @@ class PreferenceTestCase(BaseTestCase):
         response = self.client.post(self.create_preference_url, updated_data, format='json')
 
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-        self.assertEqual(Preference.objects.get(id=preference.id).preference_value, 'Rock')
+        self.assertEqual(Preference.objects.get(id=preference.id).preference_value, 'Rainy')
+
+    def test_upsert_preferences_in_one_statement(self):
+        """
+        Given an authenticated user
+        And the user has a preference
+        When submitting that preference again together with new ones
+        Then all of them should be written with a single statement
+        And the existing preference should keep its id
+        """
+        preference = Preference.objects.create(user=self.user, **self.preference_data)
+        data = {
+            "preferences": [
+                {"preference_type": "climate", "preference_value": "Cold"},
+                {"preference_type": "cost_level", "preference_value": "Low"},
+                {"preference_type": "accessibility", "preference_value": "True"},
+                {"preference_type": "cost_level", "preference_value": "High"},
+            ]
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.create_preference_url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        preference_writes = [query for query in queries if query['sql'].startswith('INSERT INTO "user_preferences"')]
+        self.assertEqual(len(preference_writes), 1)
+        values = dict(Preference.objects.filter(user=self.user).values_list('preference_type', 'preference_value'))
+        self.assertEqual(values, {'climate': 'Cold', 'cost_level': 'High', 'accessibility': 'True'})
+        self.assertEqual(Preference.objects.get(preference_type='climate').id, preference.id)
+
+    def test_create_preference_with_invalid_value(self):
+        """
+        Given an authenticated user
+        When submitting a preference value that is not allowed for its type
+        Then no preference should be written
+        And a 400 status code should be returned
+        """
+        data = {
+            "preferences": [
+                {"preference_type": "cost_level", "preference_value": "Low"},
+                {"preference_type": "climate", "preference_value": "Foggy"},
+            ]
+        }
+
+        response = self.client.post(self.create_preference_url, data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Preference.objects.filter(user=self.user).count(), 0)
 
     def test_delete_preference(self):
         """
@@ -278,3 +335,227 @@ class RetrieveUpdateUserViewTestCase(BaseTestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('username', response.data)
         self.assertIn('email', response.data)
+
+
+class PreferenceProfileTestCase(BaseTestCase):
+
+    def test_compile_profile(self):
+        """
+        Given free-form preference rows, including a legacy type name
+        When compiling them into a profile
+        Then categories should become bitmasks and flags typed values
+        """
+        profile = compile_profile(self.user.pk, [
+            ('landscape', 'Beach'),
+            ('tourism_type', 'Nature'),
+            ('preferred_climate', 'Sunny'),
+            ('cost_level', 'High'),
+            ('trip_duration', '4-7 days'),
+            ('family_friendly', ' true '),
+            ('accessibility', 'False'),
+            ('Music', 'Jazz'),
+        ])
+
+        self.assertEqual(profile.landscape_values, ['Beach'])
+        self.assertEqual(profile.tourism_type_values, ['Nature'])
+        self.assertEqual(profile.climate_values, ['Sunny'])
+        self.assertEqual(profile.cost_level, PreferenceProfile.CostLevel.HIGH)
+        self.assertEqual(profile.trip_duration_value, '4-7 days')
+        self.assertTrue(profile.family_friendly)
+        self.assertFalse(profile.accessibility)
+        self.assertEqual(profile.preference_count, 8)
+
+    def test_profile_is_stored_on_write_and_cached(self):
+        """
+        Given an authenticated user
+        When submitting preferences
+        Then a compiled profile should be stored
+        And reading it afterwards should not touch the database
+        """
+        data = {"preferences": [{"preference_type": "landscape", "preference_value": "Forest"}]}
+        self.client.post(self.create_preference_url, data, format='json')
+
+        self.assertEqual(PreferenceProfile.objects.get(user=self.user).landscape_values, ['Forest'])
+        with self.assertNumQueries(0):
+            profile = get_preference_profile(self.user)
+        self.assertEqual(profile.landscape_values, ['Forest'])
+
+    def test_deleting_preference_invalidates_profile(self):
+        """
+        Given a user with a cached profile
+        When one of their preferences is deleted
+        Then the next read should rebuild the profile without it
+        """
+        preference = Preference.objects.create(user=self.user, **self.preference_data)
+        self.assertEqual(get_preference_profile(self.user).climate_values, ['Sunny'])
+
+        preference.delete()
+
+        self.assertNotIn(self.user.pk, profile_cache)
+        self.assertFalse(get_preference_profile(self.user).has_preferences)
+
+
+class CachedJWTAuthenticationTestCase(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(user=None)
+        user_cache.clear()
+        access = self.obtain_token().data['access']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.url = reverse('update_user')
+
+    def test_user_is_loaded_once_per_worker(self):
+        """
+        Given a user authenticated with a JWT
+        When making several requests
+        Then only the first request should query the user table
+        """
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['username'], 'testuser')
+
+    def test_user_update_invalidates_cache(self):
+        """
+        Given a user authenticated with a JWT whose user is cached
+        When the user updates their details
+        Then the next request should see the updated user
+        """
+        self.client.get(self.url)
+        response = self.client.patch(self.url, {'first_name': 'Updated'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['first_name'], 'Updated')
+
+    def test_deactivated_user_is_rejected(self):
+        """
+        Given a user authenticated with a JWT whose user is cached
+        When the user is deactivated
+        Then the next request should be rejected
+        """
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenRevocationTestCase(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        revocation_store.reset()
+        self.refresh = self.obtain_token().data['refresh']
+        self.refresh_url = reverse('token_refresh')
+
+    def test_refresh_without_revocations_skips_database(self):
+        """
+        Given a refresh token that was never revoked
+        When refreshing it once the revocation filter is loaded
+        Then an access token should be returned without any query
+        """
+        revocation_store.sync()
+
+        with self.assertNumQueries(0):
+            response = self.client.post(self.refresh_url, {'refresh': self.refresh}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('access', response.data)
+
+    def test_logout_revokes_refresh_token(self):
+        """
+        Given an authenticated user with a refresh token
+        When logging out with that token
+        Then the token should be stored as revoked
+        And refreshing it should return a 401 status code
+        """
+        response = self.client.post(reverse('logout'), {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_205_RESET_CONTENT)
+        self.assertEqual(RevokedToken.objects.filter(user=self.user).count(), 1)
+
+        response = self.client.post(self.refresh_url, {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_logout_rejects_another_users_token(self):
+        """
+        Given a refresh token issued to one user
+        When another authenticated user logs out with it
+        Then a 400 status code should be returned
+        And the token should still refresh
+        """
+        other = User.objects.create_user(username='otheruser', email='other@example.com', password='password123')
+        self.client.force_authenticate(user=other)
+
+        response = self.client.post(reverse('logout'), {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(RevokedToken.objects.exists())
+
+        response = self.client.post(self.refresh_url, {'refresh': self.refresh}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_revocation_from_another_worker_is_found_after_rebuild(self):
+        """
+        Given a token revoked directly in the database
+        When the revocation filter is rebuilt from the table
+        Then the token should be reported as revoked
+        """
+        token = RefreshToken(self.refresh)
+        RevokedToken.objects.create(jti=token['jti'], expires_at=timezone.now() + timedelta(days=1))
+
+        revocation_store.rebuild()
+
+        self.assertTrue(revocation_store.is_revoked(token['jti']))
+        self.assertFalse(revocation_store.is_revoked('never-revoked'))
+
+    @override_settings(TOKEN_REVOCATION={'SYNC_INTERVAL': 0})
+    def test_revocation_committed_with_a_lower_id_is_pulled(self):
+        """
+        Given a filter that already pulled a revocation with a high id
+        When another worker commits a revocation with a lower id afterwards
+        Then the next sync should still report it as revoked
+        """
+        expires_at = timezone.now() + timedelta(days=1)
+        revocation_store.sync()
+        RevokedToken.objects.create(id=100, jti='committed-first', expires_at=expires_at)
+        self.assertTrue(revocation_store.is_revoked('committed-first'))
+
+        RevokedToken.objects.create(id=50, jti='committed-late', expires_at=expires_at)
+
+        self.assertTrue(revocation_store.is_revoked('committed-late'))
+
+    @override_settings(TOKEN_REVOCATION={'SYNC_INTERVAL': 0, 'SYNC_MARGIN': 60})
+    def test_revocation_older_than_the_sync_margin_is_found_after_rebuild(self):
+        """
+        Given a revocation whose creation time is older than the sync margin
+        When it shows up after the filter was loaded
+        Then an incremental sync should miss it
+        And the periodic rebuild should pick it up
+        """
+        revocation_store.sync()
+        token = RevokedToken.objects.create(jti='slow-commit', expires_at=timezone.now() + timedelta(days=1))
+        RevokedToken.objects.filter(pk=token.pk).update(created_at=timezone.now() - timedelta(minutes=5))
+        self.assertFalse(revocation_store.is_revoked('slow-commit'))
+
+        with override_settings(TOKEN_REVOCATION={'REBUILD_INTERVAL': 0}):
+            self.assertTrue(revocation_store.is_revoked('slow-commit'))
+
+    def test_bloom_filter_error_rate(self):
+        """
+        Given a Bloom filter sized for 1000 keys at a 1% error rate
+        When probing it with keys that were never added
+        Then every added key should be found
+        And the false positive rate should stay close to the configured one
+        """
+        bloom = BloomFilter(1000, 0.01)
+        for index in range(1000):
+            bloom.add(f'revoked-{index}')
+
+        self.assertTrue(all(f'revoked-{index}' in bloom for index in range(1000)))
+        false_positives = sum(1 for index in range(10000) if f'unknown-{index}' in bloom)
+        self.assertLess(false_positives / 10000, 0.03)
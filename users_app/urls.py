@@ -7,6 +7,7 @@ urlpatterns = [
     path('register/', views.CreateUserView.as_view(), name="register"),
     path('login/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('login/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('logout/', views.LogoutView.as_view(), name='logout'),
 
     # User update
     path('user/', views.RetrieveUpdateUserView.as_view(), name="update_user"),
@@ -15,6 +16,7 @@ urlpatterns = [
     path('preferences/', views.PreferencesView.as_view(), name="preferences"),
     path('preferences/delete/<int:pk>/', views.DeletePreferenceView.as_view(), name="delete_preference"),
     path('preferences/get/', views.GetUserPreferencesView.as_view(), name="get_preferences"),
+    path('async/preferences/get/', views.AsyncGetUserPreferencesView.as_view(), name="get_preferences_async"),
 
     # DRF browsable API login
     path('auth/', include('rest_framework.urls')),
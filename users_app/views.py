@@ -1,10 +1,14 @@
 from rest_framework.views import APIView
 from .models import User, Preference
 from rest_framework import generics, status
-from .serializers import UserSerializer, PreferenceSerializer, UserUpdateSerializer
+from .serializers import UserSerializer, PreferenceSerializer, UserUpdateSerializer, LogoutSerializer
+from .profile import build_preference_profile
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 import logging
+from django.http import JsonResponse
+from voyage_craft.async_views import AsyncAPIView
+from voyage_craft.throttling import WriteThrottle
 
 logger = logging.getLogger(__name__)
 
@@ -24,30 +28,45 @@ class RetrieveUpdateUserView(generics.RetrieveUpdateAPIView):
         return self.request.user
 
 
+class LogoutView(APIView):
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request):
+        serializer = LogoutSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(status=status.HTTP_205_RESET_CONTENT)
+
+
 class PreferencesView(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_classes = [WriteThrottle]
 
     def post(self, request):
         user = request.user
         data = request.data.get('preferences', [])
-        if not data:
+        if not data or not isinstance(data, list):
             return Response({'error': 'No preferences data provided'}, status=status.HTTP_400_BAD_REQUEST)
 
-        for pref_data in data:
-            preference_type = pref_data.get('preference_type')
-            if not preference_type:
-                return Response({'error': 'Preference type not provided'}, status=status.HTTP_400_BAD_REQUEST)
-
-            preference, created = Preference.objects.update_or_create(
-                user=user,
-                preference_type=preference_type,
-                defaults={'preference_value': pref_data.get('preference_value', '')}
-            )
-
-            if not created:
-                print(f"Preference {preference_type} already exists and was updated for user {user.username}.")
-            else:
-                print(f"Preference {preference_type} created for user {user.username}.")
+        if any(not isinstance(pref_data, dict) or not pref_data.get('preference_type') for pref_data in data):
+            return Response({'error': 'Preference type not provided'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = PreferenceSerializer(data=data, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # The last value wins when a type is submitted twice; one upsert writes them all.
+        values = {pref['preference_type']: pref['preference_value'] for pref in serializer.validated_data}
+        Preference.objects.bulk_create(
+            [Preference(user=user, preference_type=preference_type, preference_value=preference_value)
+             for preference_type, preference_value in values.items()],
+            update_conflicts=True,
+            unique_fields=['user', 'preference_type'],
+            update_fields=['preference_value', 'updated_at'],
+        )
+        build_preference_profile(user.pk)
+        logger.debug('Stored %d preferences', len(values), extra={'user_id': user.pk,
+                                                                  'preference_types': sorted(values)})
 
         return Response({'message': 'Preferences processed successfully.'}, status=status.HTTP_201_CREATED)
 
@@ -90,3 +109,9 @@ class GetUserPreferencesView(generics.ListAPIView):
     def get_queryset(self):
         user = self.request.user
         return Preference.objects.filter(user=user)
+
+
+class AsyncGetUserPreferencesView(AsyncAPIView):
+    async def get(self, request, *args, **kwargs):
+        preferences = [preference async for preference in Preference.objects.filter(user=request.user).aiterator()]
+        return JsonResponse(PreferenceSerializer(preferences, many=True).data, safe=False)
@@ -11,6 +11,10 @@ import os
 
 from django.core.asgi import get_asgi_application
 
+from voyage_craft.lazy import warm_up
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'voyage_craft.settings')
 
 application = get_asgi_application()
+
+warm_up()
@@ -0,0 +1,43 @@
+import math
+
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import APIException
+
+from users_app.authentication import CachedJWTAuthentication
+
+
+class AsyncAPIView(View):
+    """
+    Read-only JSON endpoints for ASGI workers.
+
+    DRF views are synchronous, so these plain Django async views reproduce the
+    parts of ``APIView`` the hot read paths need: JWT bearer authentication
+    (a cached user or one ``aget``), ``throttle_classes`` and JSON errors in
+    DRF's shape. Handlers must only use the async ORM API.
+    """
+    authentication = CachedJWTAuthentication()
+    throttle_classes = ()
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            result = await self.authentication.aauthenticate(request)
+        except APIException as exc:
+            return self.error_response(exc.detail, exc.status_code)
+        if result is None:
+            return self.error_response('Authentication credentials were not provided.', 401)
+        request.user, request.auth = result
+
+        for throttle in [throttle_class() for throttle_class in self.throttle_classes]:
+            if not throttle.allow_request(request, self):
+                response = self.error_response('Request was throttled.', 429)
+                response['Retry-After'] = str(math.ceil(throttle.wait() or 1))
+                return response
+
+        return await super().dispatch(request, *args, **kwargs)
+
+    def error_response(self, detail, status: int) -> JsonResponse:
+        response = JsonResponse(detail if isinstance(detail, dict) else {'detail': detail}, status=status)
+        if status == 401:
+            response['WWW-Authenticate'] = self.authentication.authenticate_header(self.request)
+        return response
@@ -0,0 +1,165 @@
+import contextlib
+import io
+import json
+import logging
+import time
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.http import HttpRequest, JsonResponse, QueryDict
+from django.urls import Resolver404, resolve
+from rest_framework import serializers, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import QueryRecorder, record_queries
+
+logger = logging.getLogger(__name__)
+
+# Response headers copied into each sub-response.
+FORWARDED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Retry-After', 'Location')
+
+
+class SubRequestSerializer(serializers.Serializer):
+    id = serializers.CharField(required=False)
+    method = serializers.ChoiceField(choices=['GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE'], default='GET')
+    path = serializers.CharField()
+    headers = serializers.DictField(child=serializers.CharField(), required=False, default=dict)
+    body = serializers.JSONField(required=False, default=None)
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+    consistent = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        limit = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+        if len(value) > limit:
+            raise ValidationError(f'At most {limit} requests per batch.')
+        return value
+
+    def validate(self, data):
+        if data['consistent'] and any(item['method'] not in ('GET', 'HEAD') for item in data['requests']):
+            raise ValidationError({'consistent': ['Only batches of GET and HEAD requests can share a snapshot.']})
+        return data
+
+
+def build_sub_request(request, item: dict) -> HttpRequest:
+    """
+    An ``HttpRequest`` for ``item`` carrying the batch's headers, plus the item's own.
+
+    DRF views take the batch's user and token from ``_force_auth_user`` and
+    ``_force_auth_token``, so sub-requests are not authenticated again.
+    """
+    url = urlsplit(item['path'])
+    body = b'' if item['body'] is None else json.dumps(item['body']).encode()
+
+    sub_request = HttpRequest()
+    sub_request.method = item['method']
+    sub_request.path = sub_request.path_info = url.path
+    sub_request.META = {key: value for key, value in request.META.items() if not key.startswith('wsgi.')}
+    sub_request.META.update(
+        {f'HTTP_{name.upper().replace("-", "_")}': value for name, value in item['headers'].items()},
+        REQUEST_METHOD=item['method'], PATH_INFO=url.path, QUERY_STRING=url.query,
+        CONTENT_TYPE='application/json', CONTENT_LENGTH=str(len(body)),
+    )
+    sub_request.GET = QueryDict(url.query)
+    sub_request.COOKIES = request.COOKIES
+    sub_request._stream = io.BytesIO(body)
+    sub_request._read_started = False
+    sub_request._force_auth_user = request.user
+    sub_request._force_auth_token = request.auth
+    return sub_request
+
+
+def response_body(response):
+    if response.streaming:
+        content = b''.join(response.streaming_content)
+    else:
+        content = response.content
+    if response.get('Content-Type', '').startswith('application/json') and content:
+        return json.loads(content)
+    return content.decode(response.charset or 'utf-8', errors='replace')
+
+
+class BatchView(APIView):
+    """
+    Run several API requests in one round trip.
+
+    ``POST {"requests": [{"path": "/api/v1/itineraries/"}, ...]}`` resolves
+    each sub-request against the URLconf and calls its view in this process
+    and thread, in order, with the batch's already authenticated user. The
+    response lists each sub-request's ``status``, forwarded headers, ``body``,
+    ``duration_ms`` and ``queries``. Middleware runs once, for the batch.
+
+    With ``"consistent": true`` (GET and HEAD only) the sub-requests run in
+    one transaction on the primary, so they read a single snapshot on
+    PostgreSQL (``REPEATABLE READ``) and SQLite.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, *args, **kwargs) -> Response:
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items, consistent = serializer.validated_data['requests'], serializer.validated_data['consistent']
+
+        started = time.perf_counter()
+        if consistent:
+            connection = connections[DEFAULT_DB_ALIAS]
+            outermost = not connection.in_atomic_block
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                # Not READ ONLY: GETs may still write, e.g. the preference profile built on a cache miss.
+                # The isolation level can only be set before the transaction's first query.
+                if outermost and connection.vendor == 'postgresql':
+                    with connection.cursor() as cursor:
+                        cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+                responses = [self.run(request, item, savepoint=True) for item in items]
+        else:
+            responses = [self.run(request, item) for item in items]
+
+        return Response({
+            'responses': responses,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+        }, status=status.HTTP_200_OK)
+
+    def run(self, request, item: dict, savepoint: bool = False) -> dict:
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with record_queries(recorder):
+            try:
+                # A savepoint, so a failing query does not abort the snapshot the next sub-requests read.
+                with transaction.atomic(using=DEFAULT_DB_ALIAS) if savepoint else contextlib.nullcontext():
+                    response = self.dispatch_sub_request(request, item)
+                    result = {
+                        'status': response.status_code,
+                        'headers': {name: response[name] for name in FORWARDED_HEADERS if response.has_header(name)},
+                        'body': response_body(response),
+                    }
+            except Exception:
+                logger.exception('Batched request to %s failed', item['path'])
+                result = {'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'headers': {}, 'body': None}
+
+        if 'id' in item:
+            result = {'id': item['id'], **result}
+        result.update(duration_ms=round((time.perf_counter() - started) * 1000, 3), queries=recorder.count)
+        return result
+
+    def dispatch_sub_request(self, request, item: dict):
+        sub_request = build_sub_request(request, item)
+        try:
+            match = resolve(sub_request.path_info)
+        except Resolver404:
+            return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+        if getattr(match.func, 'view_class', None) is type(self):
+            return JsonResponse({'detail': 'Batches cannot be nested.'}, status=status.HTTP_400_BAD_REQUEST)
+        sub_request.resolver_match = match
+
+        view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+        response = view(sub_request, *match.args, **match.kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
@@ -0,0 +1,83 @@
+import math
+import queue
+import threading
+
+from django.db import connections
+
+
+def percentile(samples, fraction: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = max(0, math.ceil(fraction * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(latencies_ms, queries=None) -> dict:
+    summary = {
+        'requests': len(latencies_ms),
+        'p50_ms': round(percentile(latencies_ms, 0.50), 3),
+        'p99_ms': round(percentile(latencies_ms, 0.99), 3),
+        'mean_ms': round(sum(latencies_ms) / len(latencies_ms), 3) if latencies_ms else 0.0,
+    }
+    if queries:
+        summary['mean_queries'] = round(sum(queries) / len(queries), 2)
+        summary['max_queries'] = max(queries)
+    return summary
+
+
+def compare(current: dict, baseline: dict, metrics=('p50_ms', 'p99_ms', 'mean_queries')) -> dict:
+    """
+    Per-key deltas between two ``{name: summary}`` reports.
+
+    ``ratio`` above 1 means the current run is slower (or issues more queries)
+    than the baseline.
+    """
+    deltas = {}
+    for name, summary in current.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        deltas[name] = {}
+        for metric in metrics:
+            if metric not in summary or metric not in previous:
+                continue
+            delta = {'baseline': previous[metric], 'current': summary[metric],
+                     'delta': round(summary[metric] - previous[metric], 3)}
+            if previous[metric]:
+                delta['ratio'] = round(summary[metric] / previous[metric], 3)
+            deltas[name][metric] = delta
+    return deltas
+
+
+def run_concurrently(items, concurrency: int, setup, call) -> list:
+    """
+    Call ``call(state, item)`` for every item from ``concurrency`` threads.
+
+    ``setup()`` builds per-thread state such as a test client, so middleware
+    is loaded once per thread. Each thread closes its database connections
+    when the queue is drained. Results come back in completion order.
+    """
+    pending = queue.SimpleQueue()
+    for item in items:
+        pending.put(item)
+    results = []
+
+    def worker():
+        state = setup()
+        try:
+            while True:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    return
+                results.append(call(state, item))
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker) for _ in range(max(1, concurrency))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
@@ -0,0 +1,223 @@
+import asyncio
+import functools
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+
+from .lru import TTLLRUCache
+
+_MISSING = object()
+
+DEFAULTS = {
+    'ALIAS': 'default',
+    'L1_SIZE': 10000,
+    'L1_TTL': 30,
+    'TIMEOUT': 300,
+    'VERSION_TTL': 1,
+    'LOCK_TIMEOUT': 10,
+}
+
+
+def cache_setting(name):
+    return getattr(settings, 'TWO_TIER_CACHE', {}).get(name, DEFAULTS[name])
+
+
+# Backends whose entries live in one process; what one worker stores the others never see.
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_cache(alias: str = 'default') -> bool:
+    return settings.CACHES[alias]['BACKEND'] not in PROCESS_LOCAL_BACKENDS
+
+
+def require_shared_cache(feature: str, alias: str = 'default'):
+    """Raise ``ImproperlyConfigured`` unless cache ``alias`` is shared by the worker processes."""
+    if not is_shared_cache(alias):
+        raise ImproperlyConfigured(
+            f'{feature} needs a cache shared between workers; set REDIS_URL or CACHE_DIR.'
+        )
+
+
+class TwoTierCache:
+    """
+    Per-process LRU (L1) in front of a Django cache shared by all workers (L2).
+
+    Keys live in namespaces whose version is a counter in L2; ``bump`` makes
+    every key of a namespace unreachable at once, so invalidation never has to
+    enumerate keys. Workers remember a namespace's version for
+    ``VERSION_TTL`` seconds, which bounds how long another worker's bump goes
+    unnoticed here.
+
+    A miss is recomputed once: threads of this process wait on a striped lock,
+    and other processes wait for an ``add``-based lock in L2 and then read the
+    value the winner stored, up to ``LOCK_TIMEOUT`` seconds.
+    """
+
+    def __init__(self, stripes: int = 64):
+        self.local = TTLLRUCache(maxsize=cache_setting('L1_SIZE'), ttl=cache_setting('L1_TTL'))
+        self.versions = TTLLRUCache(maxsize=1024, ttl=cache_setting('VERSION_TTL'))
+        self.locks = [threading.Lock() for _ in range(stripes)]
+
+    @property
+    def shared(self):
+        return caches[cache_setting('ALIAS')]
+
+    def version(self, namespace: str) -> int:
+        version = self.versions.get(namespace)
+        if version is None:
+            version_key = f'version:{namespace}'
+            self.shared.add(version_key, 1, timeout=None)
+            version = self.shared.get(version_key, 1)
+            self.versions.set(namespace, version)
+        return version
+
+    def bump(self, namespace: str) -> int:
+        """Invalidate every key of ``namespace`` and return its new version."""
+        version_key = f'version:{namespace}'
+        try:
+            version = self.shared.incr(version_key)
+        except ValueError:
+            # Evicted or never set: restart above anything a worker may still remember.
+            version = int(time.time())
+            self.shared.set(version_key, version, timeout=None)
+        self.versions.set(namespace, version)
+        return version
+
+    def make_key(self, namespace: str, key) -> str:
+        return f'{namespace}:{self.version(namespace)}:{key}'
+
+    def get_or_set(self, namespace: str, key, compute, timeout: int = None):
+        """Return the cached value for ``key`` or store ``compute()``; ``compute`` may return any picklable value."""
+        full_key = self.make_key(namespace, key)
+        value = self.local.get(full_key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = self.shared.get(full_key, _MISSING)
+        if value is not _MISSING:
+            self.local.set(full_key, value)
+            return value
+
+        with self.locks[hash(full_key) % len(self.locks)]:
+            value = self.local.get(full_key, _MISSING)
+            if value is not _MISSING:
+                return value
+            value = self.wait_for_other_process(full_key)
+            if value is _MISSING:
+                value = self.compute_and_store(full_key, compute, timeout)
+            self.local.set(full_key, value)
+            return value
+
+    def wait_for_other_process(self, full_key: str):
+        """Return the value another process stored meanwhile, or ``_MISSING`` once this process should compute."""
+        lock_key, lock_timeout = f'lock:{full_key}', cache_setting('LOCK_TIMEOUT')
+        deadline = time.monotonic() + lock_timeout
+        while not self.shared.add(lock_key, 1, timeout=lock_timeout):
+            if time.monotonic() > deadline:
+                return _MISSING
+            time.sleep(0.01)
+            value = self.shared.get(full_key, _MISSING)
+            if value is not _MISSING:
+                return value
+
+        value = self.shared.get(full_key, _MISSING)
+        if value is not _MISSING:
+            self.shared.delete(lock_key)
+        return value
+
+    def compute_and_store(self, full_key: str, compute, timeout):
+        try:
+            value = compute()
+            self.shared.set(full_key, value, timeout=cache_setting('TIMEOUT') if timeout is None else timeout)
+        finally:
+            self.shared.delete(f'lock:{full_key}')
+        return value
+
+    async def aget_or_set(self, namespace: str, key, compute, timeout: int = None):
+        """``get_or_set`` for async views; ``compute`` is a coroutine function."""
+        full_key = self.make_key(namespace, key)
+        value = self.local.get(full_key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = await self.shared.aget(full_key, _MISSING)
+        if value is not _MISSING:
+            self.local.set(full_key, value)
+            return value
+
+        lock_key, lock_timeout = f'lock:{full_key}', cache_setting('LOCK_TIMEOUT')
+        deadline = time.monotonic() + lock_timeout
+        while not await self.shared.aadd(lock_key, 1, timeout=lock_timeout):
+            if time.monotonic() > deadline:
+                break
+            await asyncio.sleep(0.01)
+            value = await self.shared.aget(full_key, _MISSING)
+            if value is not _MISSING:
+                self.local.set(full_key, value)
+                return value
+
+        try:
+            value = await self.shared.aget(full_key, _MISSING)
+            if value is _MISSING:
+                value = await compute()
+                await self.shared.aset(full_key, value,
+                                       timeout=cache_setting('TIMEOUT') if timeout is None else timeout)
+        finally:
+            await self.shared.adelete(lock_key)
+        self.local.set(full_key, value)
+        return value
+
+    def get_many(self, namespace: str, keys) -> dict:
+        """Cached values of ``keys`` by key, from L1 and then one L2 round trip; misses are left out."""
+        found, remote = {}, {}
+        for key in keys:
+            full_key = self.make_key(namespace, key)
+            value = self.local.get(full_key, _MISSING)
+            if value is _MISSING:
+                remote[full_key] = key
+            else:
+                found[key] = value
+        if remote:
+            for full_key, value in self.shared.get_many(list(remote)).items():
+                self.local.set(full_key, value)
+                found[remote[full_key]] = value
+        return found
+
+    def set_many(self, namespace: str, values: dict, timeout: int = None):
+        full_values = {self.make_key(namespace, key): value for key, value in values.items()}
+        self.shared.set_many(full_values, timeout=cache_setting('TIMEOUT') if timeout is None else timeout)
+        for full_key, value in full_values.items():
+            self.local.set(full_key, value)
+
+    def clear_local(self):
+        self.local.clear()
+        self.versions.clear()
+
+
+two_tier_cache = TwoTierCache()
+
+
+def cached(namespace: str, key=None, timeout: int = None):
+    """
+    Cache a function's result in ``two_tier_cache`` under ``namespace``.
+
+    ``key`` builds the cache key from the call's arguments and defaults to a
+    hash of their ``repr``. Results are shared by every caller with the same key, so
+    only cache functions whose output depends on nothing but those arguments
+    and the namespace's data.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if key:
+                cache_key = key(*args, **kwargs)
+            else:
+                cache_key = hashlib.sha1(repr((func.__qualname__, args, sorted(kwargs.items()))).encode()).hexdigest()
+            return two_tier_cache.get_or_set(namespace, cache_key, lambda: func(*args, **kwargs), timeout)
+        return wrapper
+    return decorator
@@ -0,0 +1,105 @@
+import json
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from .log import request_id
+
+REDACTED_FIELDS = {'password', 'password2', 'refresh', 'access', 'token'}
+REDACTED = '***'
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {key: REDACTED if key in REDACTED_FIELDS else redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def is_redacted(value) -> bool:
+    """Whether a captured body lost a credential to ``redact``; replaying it would only measure a 400 or 401."""
+    if isinstance(value, dict):
+        return any(item == REDACTED if key in REDACTED_FIELDS else is_redacted(item) for key, item in value.items())
+    if isinstance(value, list):
+        return any(is_redacted(item) for item in value)
+    return False
+
+
+def capture_body(request):
+    """Return the JSON body with credentials redacted, or None for empty, oversized or non-JSON bodies."""
+    if request.content_type != 'application/json':
+        return None
+    length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if not length or length > getattr(settings, 'REQUEST_CAPTURE_MAX_BODY', 65536):
+        return None
+    try:
+        return redact(json.loads(request.body))
+    except ValueError:
+        return None
+
+
+class RequestCaptureMiddleware:
+    """
+    Append one JSON line per request to ``settings.REQUEST_CAPTURE_PATH``.
+
+    Disabled unless the setting is given. Entries hold the method, path, query
+    string, redacted JSON body, authenticated user id, status, duration and
+    request id, and are what ``manage.py replay_requests`` reads back. The user
+    id is read after the view runs so DRF's JWT authentication is reflected.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.path = getattr(settings, 'REQUEST_CAPTURE_PATH', None)
+        if not self.path:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.lock = threading.Lock()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        body = capture_body(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.write(request, response, body, time.perf_counter() - started, getattr(request, 'user', None))
+        return response
+
+    async def __acall__(self, request):
+        body = capture_body(request)
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        seconds = time.perf_counter() - started
+        user = getattr(request, 'user', None)
+        if isinstance(user, SimpleLazyObject):
+            # Not replaced by the view's token authentication; resolving the session user must not block.
+            user = await request.auser()
+        # The append blocks on disk; run it in a worker thread rather than on the event loop.
+        await sync_to_async(self.write, thread_sensitive=False)(request, response, body, seconds, user)
+        return response
+
+    def write(self, request, response, body, seconds: float, user):
+        entry = {
+            'timestamp': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'query': request.META.get('QUERY_STRING', ''),
+            'body': body,
+            'user_id': user.pk if user is not None and user.is_authenticated else None,
+            'status': response.status_code,
+            'duration_ms': round(seconds * 1000, 3),
+            'request_id': request_id.get(),
+        }
+        line = json.dumps(entry, default=str) + '\n'
+        with self.lock, open(self.path, 'a') as log:
+            log.write(line)
@@ -0,0 +1,57 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.permissions import SAFE_METHODS
+
+
+def make_etag(*parts) -> str:
+    return hashlib.sha1('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+class ConditionalResponse(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalETagMixin:
+    """
+    Strong ETag support for DRF views.
+
+    Subclasses implement ``get_etag`` with a single cheap query. The check
+    runs after authentication and permissions but before the handler, so a
+    matching ``If-None-Match`` answers 304 and a stale ``If-Match`` answers
+    412 without loading or serializing anything.
+    """
+    etag = None
+
+    def get_etag(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = self.get_etag(request, *args, **kwargs)
+        if self.etag is None:
+            return
+
+        response = get_conditional_response(request, etag=quote_etag(self.etag))
+        if response is not None:
+            raise ConditionalResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConditionalResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if not (200 <= response.status_code < 300 or response.status_code == 304) or response.has_header('ETag'):
+            return response
+
+        etag = self.etag
+        if request.method not in SAFE_METHODS and response.status_code != 304:
+            # The write changed the representation, so hand out the new validator.
+            etag = self.get_etag(request, *args, **kwargs) if request.method != 'DELETE' else None
+        if etag is not None:
+            response['ETag'] = quote_etag(etag)
+        return response
@@ -0,0 +1,127 @@
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .cache import require_shared_cache
+
+STICKY_COOKIE = 'primary_until'
+
+# Alias reads should go to for the current request; None leaves them on the primary.
+read_alias = ContextVar('read_alias', default=None)
+
+
+def sticky_key(user_id) -> str:
+    return f'db-router:primary:{user_id}'
+
+
+class PrimaryReplicaRouter:
+    """
+    Route reads to the replica chosen by ``ReplicaRoutingMiddleware`` and everything else to ``default``.
+
+    Outside a replica-eligible request (management commands, writes, other
+    views) ``read_alias`` is unset and reads stay on the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return read_alias.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {'default', *settings.REPLICA_DATABASES}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+
+def request_user_id(request):
+    """The user id from the bearer token, without touching the database; None when absent or invalid."""
+    header = request.META.get(api_settings.AUTH_HEADER_NAME, '').split()
+    if len(header) != 2 or header[0] not in api_settings.AUTH_HEADER_TYPES:
+        return None
+    try:
+        return AccessToken(header[1])[api_settings.USER_ID_CLAIM]
+    except (TokenError, KeyError):
+        return None
+
+
+def pinned_by_cookie(request) -> bool:
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE) or 0) > time.time()
+    except ValueError:
+        return False
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Send reads of the views named in ``settings.REPLICA_VIEWS`` to a random replica.
+
+    Read-your-writes: a successful unsafe request pins its user to the primary
+    for ``REPLICA_STICKY_SECONDS``, both through the shared cache (keyed by the
+    token's user id) and through a cookie for clients that keep one. Pinned
+    requests read from the primary even on replica views. The pin must be seen
+    by every worker, so replicas require a shared cache.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.REPLICA_DATABASES:
+            require_shared_cache('REPLICA_DATABASES')
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = read_alias.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return self.after_response(request, response)
+
+    async def __acall__(self, request):
+        token = read_alias.set(None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            read_alias.reset(token)
+        return self.after_response(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Runs once the URL is resolved, before the view reads anything.
+        if not settings.REPLICA_DATABASES or request.method not in SAFE_METHODS:
+            return
+        if request.resolver_match.url_name not in settings.REPLICA_VIEWS:
+            return
+        if pinned_by_cookie(request):
+            return
+        user_id = request_user_id(request)
+        if user_id is not None and cache.get(sticky_key(user_id)):
+            return
+        read_alias.set(random.choice(settings.REPLICA_DATABASES))
+
+    @staticmethod
+    def after_response(request, response):
+        if not settings.REPLICA_DATABASES or request.method in SAFE_METHODS or response.status_code >= 400:
+            return response
+
+        window = settings.REPLICA_STICKY_SECONDS
+        user_id = request_user_id(request)
+        if user_id is not None:
+            cache.set(sticky_key(user_id), True, timeout=window)
+        response.set_cookie(STICKY_COOKIE, str(time.time() + window), max_age=window, httponly=True,
+                            samesite='Lax')
+        return response
@@ -0,0 +1,39 @@
+import importlib.util
+import sys
+
+from django.conf import settings
+from django.urls import get_resolver
+
+
+def lazy_import(name: str):
+    """
+    Return module ``name`` without executing it; it is imported on first attribute access.
+
+    Use it at module level for heavy, rarely needed dependencies (numpy,
+    pandas, lxml) so that importing a views or utils module during worker
+    boot does not pay for them. ``from x import y`` defeats the laziness;
+    keep attribute access (``np.zeros``) inside the functions that need it.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f'No module named {name!r}', name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+def warm_up():
+    """
+    Import the URLconf, and with it every view module, and build the resolver's lookup tables.
+
+    Django does both on the first request; calling this from ``wsgi.py`` or
+    ``asgi.py`` moves the cost to worker boot, before the worker accepts traffic.
+    """
+    if getattr(settings, 'WARM_UP_ON_BOOT', False):
+        get_resolver().reverse_dict
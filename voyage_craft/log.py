@@ -0,0 +1,194 @@
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import re
+import time
+import uuid
+import weakref
+import zlib
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+request_id = ContextVar('request_id', default=None)
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+VALID_REQUEST_ID = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+# Attributes every LogRecord has; anything else was passed through ``extra``.
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'request_id'}
+
+access_logger = logging.getLogger('voyage_craft.requests')
+
+# Handlers whose writer thread has to be restarted in forked children.
+queue_handlers = weakref.WeakSet()
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record) -> bool:
+        record.request_id = request_id.get()
+        return True
+
+
+class SampleFilter(logging.Filter):
+    """
+    Keep ``rate`` of the records below ``level``; records at or above it always pass.
+
+    Sampling is decided per request id, so a sampled request keeps all of its
+    debug lines and the rest keep none.
+    """
+
+    def __init__(self, rate: float = 0.01, level: str = 'INFO'):
+        super().__init__()
+        self.rate = rate
+        self.level = logging.getLevelName(level)
+
+    def filter(self, record) -> bool:
+        if record.levelno >= self.level:
+            return True
+        current = getattr(record, 'request_id', None) or request_id.get()
+        if current is None:
+            return random.random() < self.rate
+        return zlib.crc32(current.encode()) % 10000 < self.rate * 10000
+
+
+class JsonFormatter(logging.Formatter):
+    converter = time.gmtime
+
+    def format(self, record) -> str:
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in RECORD_ATTRIBUTES)
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class QueueStreamHandler(QueueHandler):
+    """
+    Hand records to a background thread that formats and writes them.
+
+    The request thread only runs the filters, interpolates the message and
+    enqueues the record. When the queue is full records are dropped and
+    counted in ``dropped`` rather than blocking the request.
+
+    A forked child (e.g. a preloaded gunicorn worker) does not inherit the
+    writer thread, so it gets a fresh queue and thread of its own.
+    """
+
+    def __init__(self, stream=None, queue_size: int = 10000):
+        super().__init__(queue.Queue(queue_size))
+        self.target = logging.StreamHandler(stream)
+        self.dropped = 0
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+        self.running = True
+        queue_handlers.add(self)
+
+    def restart_in_child(self):
+        # Records still queued were copied from the parent, which writes them itself.
+        self.queue = queue.Queue(self.queue.maxsize)
+        self.dropped = 0
+        self.listener = QueueListener(self.queue, self.target)
+        if self.running:
+            self.listener.start()
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Formatting is left to the listener; resolve the message now so later changes to args do not leak in.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        # Drain the queue by letting the listener finish, then carry on with a fresh thread.
+        if self.running:
+            self.listener.stop()
+            self.listener.start()
+
+    def close(self):
+        # logging.shutdown() closes handlers at exit, which writes out whatever is still queued.
+        if self.running:
+            self.listener.stop()
+            self.running = False
+        super().close()
+
+
+def restart_queue_handlers():
+    for handler in list(queue_handlers):
+        handler.restart_in_child()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=restart_queue_handlers)
+
+
+def incoming_request_id(request) -> str:
+    value = request.headers.get(REQUEST_ID_HEADER, '')
+    return value if VALID_REQUEST_ID.match(value) else uuid.uuid4().hex
+
+
+class RequestIdMiddleware:
+    """
+    Tag the request with an id, taken from ``X-Request-ID`` when valid, and echo it on the response.
+
+    Log records carry the id through ``RequestIdFilter``. One line per request
+    goes to the ``voyage_craft.requests`` logger with the status and
+    duration, so log lines can be matched to slow requests.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = request_id.set(incoming_request_id(request))
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            return self.finish(request, response, started)
+        finally:
+            request_id.reset(token)
+
+    async def __acall__(self, request):
+        token = request_id.set(incoming_request_id(request))
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+            return self.finish(request, response, started)
+        finally:
+            request_id.reset(token)
+
+    @staticmethod
+    def finish(request, response, started: float):
+        response[REQUEST_ID_HEADER] = request_id.get()
+        if access_logger.isEnabledFor(logging.INFO):
+            access_logger.info('%s %s %s', request.method, request.path, response.status_code, extra={
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+        return response
@@ -0,0 +1,203 @@
+import functools
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework.permissions import IsAdminUser
+from rest_framework.views import APIView
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class ViewMetrics:
+    __slots__ = ('requests', 'latency_buckets', 'latency_sum', 'queries', 'db_seconds', 'response_bytes',
+                 'statuses')
+
+    def __init__(self):
+        self.requests = 0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.response_bytes = 0
+        self.statuses = Counter()
+
+
+class MetricsRegistry:
+    """Thread-safe in-memory aggregation of per-view request metrics."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def observe(self, view: str, status: int, seconds: float, queries: int, db_seconds: float, size: int):
+        bucket = bisect_left(LATENCY_BUCKETS, seconds)
+        with self.lock:
+            metrics = self.views.get(view)
+            if metrics is None:
+                metrics = self.views[view] = ViewMetrics()
+            metrics.requests += 1
+            metrics.latency_buckets[bucket] += 1
+            metrics.latency_sum += seconds
+            metrics.queries += queries
+            metrics.db_seconds += db_seconds
+            metrics.response_bytes += size
+            metrics.statuses[status] += 1
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+    def render(self) -> str:
+        """Render the metrics in the Prometheus text exposition format."""
+        with self.lock:
+            snapshot = [(view, metrics.requests, list(metrics.latency_buckets), metrics.latency_sum,
+                         metrics.queries, metrics.db_seconds, metrics.response_bytes, dict(metrics.statuses))
+                        for view, metrics in sorted(self.views.items())]
+
+        lines = [
+            '# HELP voyagecraft_request_duration_seconds Request latency by view.',
+            '# TYPE voyagecraft_request_duration_seconds histogram',
+        ]
+        for view, requests, buckets, latency_sum, *_ in snapshot:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), buckets):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'voyagecraft_request_duration_seconds_bucket{{view="{view}",le="{le}"}} {cumulative}')
+            lines.append(f'voyagecraft_request_duration_seconds_sum{{view="{view}"}} {latency_sum}')
+            lines.append(f'voyagecraft_request_duration_seconds_count{{view="{view}"}} {requests}')
+
+        counters = [
+            ('voyagecraft_db_queries_total', 'SQL queries executed by view.', 4),
+            ('voyagecraft_db_duration_seconds_total', 'Time spent in SQL queries by view.', 5),
+            ('voyagecraft_response_bytes_total', 'Response body bytes by view.', 6),
+        ]
+        for name, help_text, index in counters:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            lines += [f'{name}{{view="{row[0]}"}} {row[index]}' for row in snapshot]
+
+        lines += ['# HELP voyagecraft_responses_total Responses by view and status code.',
+                  '# TYPE voyagecraft_responses_total counter']
+        for row in snapshot:
+            for status, count in sorted(row[7].items()):
+                lines.append(f'voyagecraft_responses_total{{view="{row[0]}",status="{status}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - started
+
+
+def response_size(response) -> int:
+    if response.streaming:
+        return int(response.get('Content-Length') or 0)
+    return len(response.content)
+
+
+# The recorders of the current request, innermost last; sync_to_async copies them into the ORM thread.
+active_recorders = ContextVar('active_recorders', default=())
+
+
+def dispatch_queries(execute, sql, params, many, context):
+    for recorder in reversed(active_recorders.get()):
+        execute = functools.partial(recorder, execute)
+    return execute(sql, params, many, context)
+
+
+def install_query_dispatcher(connection, **kwargs):
+    """
+    Install ``dispatch_queries`` on ``connection`` once, for good.
+
+    Concurrent async requests share the thread-sensitive connection, so
+    per-request wrappers pushed and popped on it would remove each other's;
+    the one permanent wrapper hands each query to the recorders of the
+    request that ran it.
+    """
+    if dispatch_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(dispatch_queries)
+
+
+connection_created.connect(install_query_dispatcher)
+
+
+@contextmanager
+def record_queries(recorder):
+    # Connections opened before this module was imported never saw connection_created.
+    for connection in connections.all(initialized_only=True):
+        install_query_dispatcher(connection)
+    token = active_recorders.set((*active_recorders.get(), recorder))
+    try:
+        yield recorder
+    finally:
+        active_recorders.reset(token)
+
+
+class MetricsMiddleware:
+    """
+    Record latency, SQL queries, response size and status per resolved URL name.
+
+    Works in both sync and async chains. Queries reach the request's recorder
+    through ``dispatch_queries``, which stays installed on every connection,
+    so async requests only set a context variable.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with record_queries(recorder):
+            response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with record_queries(recorder):
+            response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    @staticmethod
+    def observe(request, response, seconds: float, recorder: QueryRecorder):
+        match = getattr(request, 'resolver_match', None)
+        view = (match.url_name or match.view_name) if match else 'unresolved'
+        registry.observe(view, response.status_code, seconds, recorder.count, recorder.seconds,
+                         response_size(response))
+
+
+class MetricsView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
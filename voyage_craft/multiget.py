@@ -0,0 +1,53 @@
+from django.conf import settings
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .cache import two_tier_cache
+
+IDS_PARAM = 'ids'
+
+
+def requested_ids(query_params) -> list:
+    """The distinct ids of ``?ids=1,2,3`` in order; a 400 when one is not an integer or there are too many."""
+    values = [value.strip() for value in query_params.get(IDS_PARAM, '').split(',') if value.strip()]
+    try:
+        ids = list(dict.fromkeys(int(value) for value in values))
+    except ValueError:
+        raise ValidationError({IDS_PARAM: ['Ids must be integers.']})
+    if not ids:
+        raise ValidationError({IDS_PARAM: ['This parameter is required.']})
+    limit = getattr(settings, 'MULTI_GET_MAX_IDS', 500)
+    if len(ids) > limit:
+        raise ValidationError({IDS_PARAM: [f'At most {limit} ids per request.']})
+    return ids
+
+
+class MultiGetView(generics.GenericAPIView):
+    """
+    ``GET ?ids=1,2,3`` returning ``{"1": {...}, "2": {...}, "3": null}``.
+
+    Each object's representation is cached in ``two_tier_cache`` under
+    ``cache_namespace``; the ids missing there are loaded with one
+    ``pk__in`` query and cached for the next request. Ids that do not exist
+    map to null. Invalidation is the namespace's: subclasses pick one that is
+    bumped whenever their model changes.
+    """
+    cache_namespace = None
+    cache_prefix = None
+
+    def get(self, request, *args, **kwargs) -> Response:
+        ids = requested_ids(request.query_params)
+        found = two_tier_cache.get_many(self.cache_namespace, [f'{self.cache_prefix}:{pk}' for pk in ids])
+        by_id = {int(key.rsplit(':', 1)[1]): value for key, value in found.items()}
+
+        missing = [pk for pk in ids if pk not in by_id]
+        if missing:
+            objects = list(self.get_queryset().filter(pk__in=missing))
+            loaded = {obj.pk: data for obj, data in zip(objects, self.get_serializer(objects, many=True).data)}
+            if loaded:
+                two_tier_cache.set_many(self.cache_namespace,
+                                        {f'{self.cache_prefix}:{pk}': data for pk, data in loaded.items()})
+            by_id.update(loaded)
+
+        return Response({str(pk): by_id.get(pk) for pk in ids}, status=status.HTTP_200_OK)
@@ -36,7 +36,7 @@ ALLOWED_HOSTS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'users_app.authentication.CachedJWTAuthentication',
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ),
@@ -46,12 +46,122 @@ REST_FRAMEWORK = {
 }
 
 
+# Per-worker token buckets used by voyage_craft.throttling; burst is the bucket size
+TOKEN_BUCKET_THROTTLES = {
+    'recommendations': {'rate': '60/min', 'burst': 30},
+    'writes': {'rate': '120/min', 'burst': 60},
+}
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'TOKEN_REFRESH_SERIALIZER': 'users_app.serializers.RevocableTokenRefreshSerializer',
+}
+
+# Refresh tokens revoked on logout; see users_app/revocation.py
+TOKEN_REVOCATION = {
+    'BLOOM_CAPACITY': int(os.getenv('TOKEN_REVOCATION_BLOOM_CAPACITY', 100000)),
+    'BLOOM_ERROR_RATE': float(os.getenv('TOKEN_REVOCATION_BLOOM_ERROR_RATE', 0.001)),
+    'SYNC_INTERVAL': float(os.getenv('TOKEN_REVOCATION_SYNC_INTERVAL', 5)),
+    'SYNC_MARGIN': float(os.getenv('TOKEN_REVOCATION_SYNC_MARGIN', 60)),
+    'REBUILD_INTERVAL': float(os.getenv('TOKEN_REVOCATION_REBUILD_INTERVAL', 600)),
+}
+
+# Per-worker caches; entries changed on another worker are picked up after the TTL (seconds)
+JWT_USER_CACHE_SIZE = 10000
+JWT_USER_CACHE_TTL = 60
+PREFERENCE_PROFILE_CACHE_SIZE = 10000
+PREFERENCE_PROFILE_CACHE_TTL = 60
+
+# Shared (L2) cache behind voyage_craft.cache.two_tier_cache. REDIS_URL (needs the redis package) shares it
+# between hosts, CACHE_DIR between the workers of one host; otherwise each process has its own memory cache.
+if os.getenv('REDIS_URL'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': os.getenv('REDIS_URL')}}
+elif os.getenv('CACHE_DIR'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                          'LOCATION': os.getenv('CACHE_DIR')}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'OPTIONS': {'MAX_ENTRIES': 10000}}}
+
+# Per-worker L1 in front of CACHES; VERSION_TTL bounds how long another worker's invalidation goes unseen (seconds)
+TWO_TIER_CACHE = {
+    'L1_SIZE': 10000,
+    'L1_TTL': 30,
+    'TIMEOUT': 300,
+    'VERSION_TTL': 1,
+    'LOCK_TIMEOUT': 10,
+}
+if not (os.getenv('REDIS_URL') or os.getenv('CACHE_DIR')):
+    # A per-process cache never sees other workers' invalidations, so nothing is kept that could go stale.
+    TWO_TIER_CACHE.update(L1_TTL=0, TIMEOUT=0)
+
+# Largest ?ids= list accepted by the batched lookups of voyage_craft/multiget.py
+MULTI_GET_MAX_IDS = 500
+
+# Memory-mapped catalog shared by the workers of one host, written by manage.py build_catalog_snapshot and
+# rebuilt by a background job after catalog changes; see destinations/snapshot.py. Unset disables it; setting it
+# needs REDIS_URL or CACHE_DIR.
+CATALOG_SNAPSHOT_PATH = os.getenv('CATALOG_SNAPSHOT_PATH')
+CATALOG_SNAPSHOT_CHECK_INTERVAL = 5
+
+# Filter recommendations with the in-memory bitmap index of destinations/bitmap.py instead of SQL joins
+RECOMMENDATION_BITMAP_INDEX = os.getenv('RECOMMENDATION_BITMAP_INDEX', 'false').lower() in ('1', 'true')
+# More matches than this are filtered in SQL rather than loaded by id; needs REDIS_URL or CACHE_DIR to be enabled
+RECOMMENDATION_INDEX_MAX_IDS = 1000
+
+# Most sub-requests accepted by one POST to batch/; see voyage_craft/batch.py
+BATCH_MAX_REQUESTS = 20
+
+# Opt-in JSONL traffic log for manage.py replay_requests; see voyage_craft/capture.py
+REQUEST_CAPTURE_PATH = os.getenv('REQUEST_CAPTURE_PATH')
+REQUEST_CAPTURE_MAX_BODY = 65536
+
+# Background jobs run by manage.py run_worker; see jobs/models.py. Failed jobs are retried after
+# RETRY_BACKOFF * 2**(attempt - 1) seconds; running jobs older than LOCK_TIMEOUT are assumed lost and requeued
+JOBS = {
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 5,
+    'RETRY_BACKOFF_MAX': 3600,
+    'LOCK_TIMEOUT': int(os.getenv('JOBS_LOCK_TIMEOUT', 600)),
+    'KEEP_FINISHED_DAYS': 7,
 }
 
+# JSON lines on stderr, written by a background thread; see voyage_craft/log.py.
+# App loggers emit DEBUG, of which LOG_DEBUG_SAMPLE_RATE of the requests are kept.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_APP_LEVEL = os.getenv('LOG_APP_LEVEL', 'DEBUG')
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'voyage_craft.log.RequestIdFilter'},
+        'sample_debug': {
+            '()': 'voyage_craft.log.SampleFilter',
+            'rate': float(os.getenv('LOG_DEBUG_SAMPLE_RATE', 0.01)),
+        },
+    },
+    'formatters': {
+        'json': {'()': 'voyage_craft.log.JsonFormatter'},
+    },
+    'handlers': {
+        'queue': {
+            '()': 'voyage_craft.log.QueueStreamHandler',
+            'queue_size': int(os.getenv('LOG_QUEUE_SIZE', 10000)),
+            'formatter': 'json',
+            'filters': ['request_id', 'sample_debug'],
+        },
+    },
+    'root': {'handlers': ['queue'], 'level': LOG_LEVEL},
+    'loggers': {
+        **{name: {'level': LOG_APP_LEVEL}
+           for name in ('destinations', 'itinerary', 'jobs', 'users_app', 'voyage_craft')},
+        'voyage_craft.requests': {'level': os.getenv('LOG_ACCESS_LEVEL', 'INFO')},
+    },
+}
+
+# Build the URL resolver in wsgi.py/asgi.py instead of on each worker's first request; see voyage_craft/lazy.py
+WARM_UP_ON_BOOT = os.getenv('WARM_UP_ON_BOOT', 'true').lower() in ('1', 'true')
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -65,17 +175,21 @@ INSTALLED_APPS = [
     'users_app',
     'rest_framework',
     'destinations',
-    'itinerary'
-
+    'itinerary',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'voyage_craft.log.RequestIdMiddleware',
+    'voyage_craft.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'voyage_craft.db_router.ReplicaRoutingMiddleware',
+    'voyage_craft.capture.RequestCaptureMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 
@@ -117,6 +231,51 @@ DATABASES = {
     }
 }
 
+# Connection reuse. By default each worker thread keeps its connection for DB_CONN_MAX_AGE seconds and
+# pings it before reuse. DB_POOL_MAX_SIZE > 0 switches PostgreSQL to psycopg 3's connection pool
+# (pip install "psycopg[pool]"), which replaces persistent connections and checks connections on checkout.
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 0))
+if DB_POOL_MAX_SIZE:
+    from psycopg_pool import ConnectionPool
+
+    DATABASE_CONNECTION = {
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'pool': {
+                'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+                'max_size': DB_POOL_MAX_SIZE,
+                'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+                'check': ConnectionPool.check_connection,
+            },
+        },
+    }
+else:
+    DATABASE_CONNECTION = {
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'true').lower() in ('1', 'true'),
+    }
+DATABASES['default'].update(DATABASE_CONNECTION)
+
+# Read replicas share the primary's credentials; DB_REPLICA_HOSTS is a comma-separated host list.
+# They need REDIS_URL or CACHE_DIR: the read-your-writes pin is kept in CACHES.
+# Tests mirror them onto the default test database.
+REPLICA_DATABASES = []
+for index, host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica_{index}'] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+    REPLICA_DATABASES.append(f'replica_{index}')
+
+DATABASE_ROUTERS = ['voyage_craft.db_router.PrimaryReplicaRouter']
+
+# Views whose reads may lag the primary; see voyage_craft/db_router.py
+REPLICA_VIEWS = {
+    'recommended-destinations',
+    'recommended-destinations-async',
+    'itinerary-list',
+    'itinerary-list-async',
+}
+# After a write, the user's reads stay on the primary for this many seconds
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 10))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
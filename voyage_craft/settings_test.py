@@ -0,0 +1,39 @@
+"""
+Settings for the test suite and the benchmark commands.
+
+Uses SQLite unless TEST_DB_ENGINE points at another backend, in which case
+the usual DB_* variables describe the connection.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': os.getenv('TEST_DB_ENGINE', 'django.db.backends.sqlite3'),
+        'NAME': os.getenv('TEST_DB_NAME', str(BASE_DIR / 'bench.sqlite3')),
+        'HOST': os.getenv('DB_HOST', ''),
+        'PORT': os.getenv('DB_PORT', ''),
+        'USER': os.getenv('DB_USER', ''),
+        'PASSWORD': os.getenv('DB_PASSWORD', ''),
+        **DATABASE_CONNECTION,
+    },
+    # Separate database standing in for a replica; only used when a test enables it in REPLICA_DATABASES.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(BASE_DIR / 'bench_replica.sqlite3'),
+    },
+}
+
+REPLICA_DATABASES = []
+
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+# The suite runs in one process, which sees every invalidation of its memory cache.
+TWO_TIER_CACHE = {**TWO_TIER_CACHE, 'L1_TTL': 30, 'TIMEOUT': 300}
+
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.MD5PasswordHasher',
+]
+
+DEBUG = False
@@ -0,0 +1,79 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.functional import cached_property
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+
+
+def requested_fields(query_params):
+    """The field names of ``?fields=a,b`` in order, or None when the parameter is absent or empty."""
+    names = [name.strip() for name in query_params.get(FIELDS_PARAM, '').split(',')]
+    return tuple(dict.fromkeys(name for name in names if name)) or None
+
+
+def validate_fields(serializer_class, fields):
+    unknown = [name for name in fields if name not in serializer_class().fields]
+    if unknown:
+        raise ValidationError({FIELDS_PARAM: [f'Unknown field: {name}.' for name in unknown]})
+    return fields
+
+
+def only_columns(serializer_class, fields) -> list:
+    """
+    Model fields to pass to ``QuerySet.only()`` so that ``fields`` of ``serializer_class`` can be rendered.
+
+    Serializer fields backed by a concrete model field load that column
+    (foreign keys load their ``_id``). Reverse relations, annotations and
+    method fields need no column; relations must be prefetched by the view.
+    """
+    declared = serializer_class().fields
+    model = serializer_class.Meta.model
+    columns = ['pk']
+    for name in fields:
+        try:
+            field = model._meta.get_field(declared[name].source.split('.')[0])
+        except FieldDoesNotExist:
+            continue
+        if field.concrete:
+            columns.append(field.name)
+    return columns
+
+
+class SparseFieldsSerializerMixin:
+    """Serializer taking ``fields=`` to render only those of its fields; unknown names are a 400."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            validate_fields(type(self), fields)
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SparseFieldsetMixin:
+    """
+    ``?fields=id,name`` for the GETs of a ``GenericAPIView``.
+
+    The serializer renders only the requested fields and ``get_queryset``
+    loads only their columns, so large text columns such as ``description``
+    are neither read nor sent. The serializer must use
+    ``SparseFieldsSerializerMixin``.
+    """
+
+    @cached_property
+    def sparse_fields(self):
+        if self.request.method != 'GET':
+            return None
+        fields = requested_fields(self.request.query_params)
+        return fields and validate_fields(self.get_serializer_class(), fields)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.sparse_fields is None:
+            return queryset
+        return queryset.only(*only_columns(self.get_serializer_class(), self.sparse_fields))
+
+    def get_serializer(self, *args, **kwargs):
+        if self.sparse_fields is not None:
+            kwargs.setdefault('fields', self.sparse_fields)
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,620 @@
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import skipUnless
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from destinations.models import Destination
+from itinerary.models import Itinerary
+from users_app.authentication import user_cache
+from users_app.models import Preference, PreferenceProfile, User
+from users_app.profile import profile_cache
+from voyage_craft.db_router import STICKY_COOKIE, ReplicaRoutingMiddleware
+from voyage_craft.cache import TwoTierCache, cached, two_tier_cache
+from voyage_craft.benchmarking import compare, percentile, summarize
+from voyage_craft.capture import is_redacted
+from voyage_craft.log import JsonFormatter, QueueStreamHandler, RequestIdFilter, SampleFilter, request_id
+from voyage_craft.lazy import lazy_import
+from voyage_craft.lru import TTLLRUCache
+from voyage_craft.metrics import QueryRecorder, dispatch_queries, record_queries, registry
+from voyage_craft.throttling import TokenBucketStore, parse_rate
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TokenBucketStoreTests(SimpleTestCase):
+
+    def test_parse_rate(self):
+        """
+        Given DRF-style rate strings
+        Then they should be converted to tokens per second
+        """
+        self.assertEqual(parse_rate('60/min'), 1)
+        self.assertEqual(parse_rate('10/s'), 10)
+        self.assertEqual(parse_rate('7200/hour'), 2)
+
+    def test_bucket_allows_burst_then_refills(self):
+        """
+        Given a bucket of 3 tokens refilled at one token per second
+        When 4 requests arrive at once
+        Then the fourth should wait one second
+        And a token should be available again after that second
+        """
+        clock = FakeClock()
+        store = TokenBucketStore(clock=clock)
+
+        self.assertEqual([store.consume('user', 1, 3) for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(store.consume('user', 1, 3), 1.0)
+        self.assertAlmostEqual(store.consume('other-user', 1, 3), 0)
+
+        clock.now = 1.0
+        self.assertEqual(store.consume('user', 1, 3), 0)
+
+    def test_refilled_buckets_are_dropped(self):
+        """
+        Given buckets for many clients that each made one request
+        When a request arrives after the buckets have refilled and the sweep interval has passed
+        Then only the bucket of that request should be kept
+        And a dropped client should get a full bucket again
+        """
+        clock = FakeClock()
+        store = TokenBucketStore(stripes=1, clock=clock, sweep_interval=10)
+        for client in range(100):
+            store.consume(client, 1, 3)
+        self.assertEqual(len(store), 100)
+
+        clock.now = 10.0
+        store.consume('late', 1, 3)
+
+        self.assertEqual(len(store), 1)
+        self.assertEqual([store.consume(0, 1, 3) for _ in range(3)], [0, 0, 0])
+
+
+class TwoTierCacheTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = TwoTierCache()
+
+    def test_concurrent_misses_compute_once(self):
+        """
+        Given eight threads missing the same key at once
+        Then the value should be computed a single time and returned to all of them
+        """
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return {'answer': 42}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(self.cache.get_or_set('tests', 'key', compute)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'answer': 42}] * 8)
+
+    def test_bump_invalidates_both_tiers(self):
+        """
+        Given a cached value in the local and shared tiers
+        When its namespace is bumped
+        Then the next read should recompute, while other namespaces stay cached
+        """
+        self.cache.get_or_set('tests', 'key', lambda: 'old')
+        self.cache.get_or_set('other', 'key', lambda: 'kept')
+
+        self.cache.bump('tests')
+
+        self.assertEqual(self.cache.get_or_set('tests', 'key', lambda: 'new'), 'new')
+        self.assertEqual(self.cache.get_or_set('other', 'key', lambda: 'recomputed'), 'kept')
+
+    def test_shared_tier_serves_other_workers(self):
+        """
+        Given a value computed by one worker
+        Then another worker with an empty local tier should read it from the shared cache
+        """
+        self.cache.get_or_set('tests', 'key', lambda: 'shared')
+        other_worker = TwoTierCache()
+
+        self.assertEqual(other_worker.get_or_set('tests', 'key', lambda: 'recomputed'), 'shared')
+
+    def test_cached_decorator(self):
+        """
+        Given a function decorated with cached
+        Then repeated calls with the same arguments should reuse the first result
+        """
+        calls = []
+
+        @cached('tests')
+        def square(number):
+            calls.append(number)
+            return number * number
+
+        self.assertEqual([square(3), square(3), square(4)], [9, 9, 16])
+        self.assertEqual(calls, [3, 4])
+        two_tier_cache.bump('tests')
+        square(3)
+        self.assertEqual(calls, [3, 4, 3])
+
+
+class BenchmarkingTests(SimpleTestCase):
+
+    def test_summarize_and_compare(self):
+        """
+        Given a baseline and a slower current run
+        Then percentiles should use the nearest rank and the ratio should show the regression
+        """
+        self.assertEqual(percentile(range(1, 101), 0.99), 99)
+        self.assertEqual(percentile([], 0.5), 0.0)
+
+        baseline = {'list': summarize([10.0] * 10, [2] * 10)}
+        current = {'list': summarize([20.0] * 10, [3] * 10), 'new': summarize([1.0])}
+        deltas = compare(current, baseline)
+
+        self.assertEqual(set(deltas), {'list'})
+        self.assertEqual(deltas['list']['p50_ms']['ratio'], 2)
+        self.assertEqual(deltas['list']['mean_queries']['delta'], 1)
+
+
+class TTLLRUCacheTests(SimpleTestCase):
+
+    def test_evicts_least_recently_used(self):
+        """
+        Given a cache limited to two entries
+        When a third entry is added after reading the first one
+        Then the second entry should be evicted
+        """
+        cache = TTLLRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+    def test_entries_expire(self):
+        """
+        Given a cache entry set with a TTL of zero seconds
+        Then it should no longer be returned
+        """
+        cache = TTLLRUCache(maxsize=2)
+        cache.set('a', 1, ttl=0)
+        self.assertNotIn('a', cache)
+
+
+class MetricsTests(TestCase):
+
+    def setUp(self):
+        registry.reset()
+        self.client = APIClient()
+        self.staff = User.objects.create_user(username='staff', password='password123', is_staff=True)
+
+    def test_metrics_are_recorded_per_view(self):
+        """
+        Given a staff user
+        When a request to the itinerary list has been served
+        Then /metrics should expose its latency histogram, query count and status in Prometheus format
+        """
+        self.client.force_authenticate(user=self.staff)
+        self.client.get(reverse('itinerary-list'))
+
+        response = self.client.get('/metrics')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('voyagecraft_request_duration_seconds_count{view="itinerary-list"} 1', body)
+        self.assertIn('voyagecraft_request_duration_seconds_bucket{view="itinerary-list",le="+Inf"} 1', body)
+        self.assertIn('voyagecraft_db_queries_total{view="itinerary-list"} 1', body)
+        self.assertIn('voyagecraft_responses_total{view="itinerary-list",status="200"} 1', body)
+
+    async def test_metrics_are_recorded_for_async_views(self):
+        """
+        Given a request served by an async view
+        Then its queries should still be counted against the view
+        """
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(self.staff)}'}
+        await self.async_client.get(reverse('get_preferences_async'), headers=headers)
+
+        body = registry.render()
+        self.assertIn('voyagecraft_responses_total{view="get_preferences_async",status="200"} 1', body)
+        self.assertIn('voyagecraft_db_queries_total{view="get_preferences_async"} 2', body)
+
+    async def test_concurrent_async_requests_keep_their_own_recorders(self):
+        """
+        Given two async requests interleaving their queries on the shared connection
+        Then each recorder should count only its own request's queries
+        And the connection should keep a single query wrapper
+        """
+        async def serve(recorder, queries):
+            with record_queries(recorder):
+                for _ in range(queries):
+                    await sync_to_async(User.objects.count)()
+                    await asyncio.sleep(0)
+
+        first, second = QueryRecorder(), QueryRecorder()
+        await asyncio.gather(serve(first, 3), serve(second, 5))
+
+        self.assertEqual((first.count, second.count), (3, 5))
+        wrappers = await sync_to_async(lambda: list(connection.execute_wrappers))()
+        self.assertEqual(wrappers.count(dispatch_queries), 1)
+
+    def test_metrics_require_staff(self):
+        """
+        Given a user who is not staff
+        When requesting /metrics
+        Then a 403 status code should be returned
+        """
+        user = User.objects.create_user(username='regular', password='password123')
+        self.client.force_authenticate(user=user)
+
+        self.assertEqual(self.client.get('/metrics').status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RequestCaptureTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.log = Path(self.directory.name) / 'requests.jsonl'
+        self.user = User.objects.create_user(username='traveller', password='password123')
+
+    def test_requests_are_appended_with_credentials_redacted(self):
+        """
+        Given request capture enabled through REQUEST_CAPTURE_PATH
+        When an authenticated GET and an anonymous login attempt are served
+        Then one JSON line per request should record method, path, user id and status
+        And the password in the login body should be redacted and flagged as such
+        """
+        with override_settings(REQUEST_CAPTURE_PATH=str(self.log)):
+            client = APIClient()
+            client.force_authenticate(user=self.user)
+            client.get(reverse('itinerary-list'), {'summary': 'true'})
+            client.force_authenticate(user=None)
+            client.post(reverse('token_obtain_pair'), {'username': 'traveller', 'password': 'nope'}, format='json')
+
+        listing, login = [json.loads(line) for line in self.log.read_text().splitlines()]
+        self.assertEqual((listing['method'], listing['path'], listing['query']),
+                         ('GET', '/api/v1/itineraries/', 'summary=true'))
+        self.assertEqual(listing['user_id'], self.user.pk)
+        self.assertEqual(listing['status'], 200)
+        self.assertIsNone(login['user_id'])
+        self.assertEqual(login['body'], {'username': 'traveller', 'password': '***'})
+        self.assertTrue(is_redacted(login['body']))
+        self.assertFalse(is_redacted(listing['body']))
+
+    def test_capture_is_disabled_by_default(self):
+        """
+        Given no REQUEST_CAPTURE_PATH
+        When a request is served
+        Then no log file should be written
+        """
+        with override_settings(REQUEST_CAPTURE_PATH=None):
+            APIClient().get(reverse('itinerary-list'))
+
+        self.assertFalse(self.log.exists())
+
+
+class LazyImportTests(SimpleTestCase):
+
+    def test_module_runs_on_first_attribute_access(self):
+        """
+        Given a module that has not been imported yet
+        When it is loaded with lazy_import
+        Then it should not run until an attribute is read
+        And the attribute should then behave as after a normal import
+        """
+        name = 'this'
+        self.addCleanup(sys.modules.pop, name, None)
+        sys.modules.pop(name, None)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            module = lazy_import(name)
+            self.assertEqual(output.getvalue(), '')
+            self.assertIsInstance(module.s, str)
+        self.assertIn('The Zen of Python', output.getvalue())
+
+
+class StructuredLoggingTests(TestCase):
+
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.handler = QueueStreamHandler(self.stream)
+        self.handler.setFormatter(JsonFormatter())
+        self.handler.addFilter(RequestIdFilter())
+        self.addCleanup(self.handler.close)
+        self.logger = logging.getLogger('voyage_craft.tests.structured')
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.addCleanup(self.logger.removeHandler, self.handler)
+
+    def lines(self):
+        self.handler.flush()
+        return [json.loads(line) for line in self.stream.getvalue().splitlines()]
+
+    def test_records_are_written_as_json_with_the_request_id(self):
+        """
+        Given a request id set for the current context
+        When a record with extra fields and one with an exception are logged
+        Then the background writer should emit one JSON object per record
+        And each should carry the request id, the extra fields and the traceback
+        """
+        token = request_id.set('abc123')
+        try:
+            self.logger.info('stored %d rows', 3, extra={'user_id': 7})
+            try:
+                raise ValueError('boom')
+            except ValueError:
+                self.logger.exception('failed')
+        finally:
+            request_id.reset(token)
+
+        stored, failed = self.lines()
+        self.assertEqual((stored['message'], stored['level'], stored['user_id']), ('stored 3 rows', 'INFO', 7))
+        self.assertEqual(stored['request_id'], 'abc123')
+        self.assertIn('ValueError: boom', failed['exception'])
+
+    def test_debug_records_are_sampled_per_request(self):
+        """
+        Given a debug sampling rate of one half
+        When many requests log one debug and one warning record each
+        Then every warning should be kept
+        And about half of the requests should keep their debug record
+        """
+        self.handler.addFilter(SampleFilter(rate=0.5))
+        for number in range(400):
+            token = request_id.set(f'request-{number}')
+            try:
+                self.logger.debug('detail')
+                self.logger.warning('problem')
+            finally:
+                request_id.reset(token)
+
+        levels = [line['level'] for line in self.lines()]
+        self.assertEqual(levels.count('WARNING'), 400)
+        self.assertTrue(120 < levels.count('DEBUG') < 280)
+
+    def test_full_queue_drops_records_instead_of_blocking(self):
+        """
+        Given a handler whose writer thread is stopped and whose queue holds two records
+        When five records are logged
+        Then logging should not block and three records should be counted as dropped
+        """
+        handler = QueueStreamHandler(io.StringIO(), queue_size=2)
+        handler.listener.stop()
+        handler.running = False
+        for number in range(5):
+            handler.handle(logging.makeLogRecord({'msg': f'record {number}', 'levelno': logging.INFO}))
+
+        self.assertEqual(handler.dropped, 3)
+
+    @skipUnless(hasattr(os, 'fork'), 'Needs os.fork.')
+    def test_forked_child_writes_with_its_own_thread(self):
+        """
+        Given a handler whose writer thread was started in the parent
+        When the process forks and the child logs a record
+        Then the child should write the record without being flushed
+        """
+        self.logger.info('before fork')
+        self.handler.flush()
+        pid = os.fork()
+        if pid == 0:
+            written = False
+            try:
+                self.logger.info('from child')
+                deadline = time.monotonic() + 5
+                while not written and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                    written = 'from child' in self.stream.getvalue()
+            finally:
+                os._exit(0 if written else 1)
+
+        _, status_code = os.waitpid(pid, 0)
+        self.assertEqual(os.waitstatus_to_exitcode(status_code), 0)
+        self.assertEqual([line['message'] for line in self.lines()], ['before fork'])
+
+    def test_request_id_header_is_echoed_or_generated(self):
+        """
+        Given an anonymous client
+        When a request is sent with a valid X-Request-ID and another with an invalid one
+        Then the first response should echo the given id
+        And the second should carry a freshly generated id
+        """
+        client = APIClient()
+        given = client.get(reverse('itinerary-list'), HTTP_X_REQUEST_ID='trace-42')
+        invalid = client.get(reverse('itinerary-list'), HTTP_X_REQUEST_ID='not valid!')
+
+        self.assertEqual(given['X-Request-ID'], 'trace-42')
+        self.assertRegex(invalid['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+
+class BatchViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='traveller', password='password123')
+        Preference.objects.create(user=self.user, preference_type='climate', preference_value='Sunny')
+        destination = Destination.objects.create(name='Urban', type='City', landscape='Urban',
+                                                 tourism_type='Cultural', cost_level='Low')
+        self.itinerary = Itinerary.objects.create(user=self.user, name='Trip', description='',
+                                                  start_date='2024-09-01', end_date='2024-09-02',
+                                                  destination=destination)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_sub_requests_share_one_authentication(self):
+        """
+        Given an authenticated user with preferences and an itinerary
+        When the user batches the start-up requests, one of them with a matching ETag
+        Then each sub-response should match its standalone request, with timings
+        And the user should be loaded once for the whole batch
+        """
+        detail_url = reverse('itinerary-detail', args=[self.itinerary.pk])
+        etag = self.client.get(detail_url)['ETag']
+        paths = [reverse('get_preferences'), reverse('itinerary-list'), detail_url]
+        expected = [self.client.get(path).json() for path in paths]
+        user_cache.clear()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('batch'), {'requests': [
+                *({'id': str(index), 'path': path} for index, path in enumerate(paths)),
+                {'path': detail_url, 'headers': {'If-None-Match': etag}},
+                {'path': '/api/v1/missing/'},
+            ]}, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()['responses']
+        self.assertEqual([result['body'] for result in results[:3]], expected)
+        self.assertEqual([result.get('id') for result in results], ['0', '1', '2', None, None])
+        self.assertEqual([result['status'] for result in results], [200, 200, 200, 304, 404])
+        self.assertEqual(results[2]['headers']['ETag'], etag)
+        self.assertTrue(all(result['duration_ms'] >= 0 and 'queries' in result for result in results))
+        self.assertEqual(len([query for query in queries if 'FROM "users_app_user"' in query['sql']]), 1)
+
+    def test_consistent_batches_are_read_only_and_sub_requests_can_write(self):
+        """
+        Given an authenticated user
+        When a consistent batch contains a write, and a plain batch deletes a preference
+        Then the first should be rejected and the second should run the write
+        """
+        preference = Preference.objects.get(user=self.user)
+        delete = {'method': 'DELETE', 'path': reverse('delete_preference', args=[preference.pk])}
+
+        response = self.client.post(reverse('batch'), {'consistent': True, 'requests': [delete]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.post(reverse('batch'), {'requests': [delete]}, format='json')
+        self.assertEqual(response.json()['responses'][0]['status'], status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Preference.objects.filter(pk=preference.pk).exists())
+
+        response = self.client.post(reverse('batch'), {'consistent': True, 'requests': [
+            {'path': reverse('itinerary-list')}, {'path': reverse('batch')},
+        ]}, format='json')
+        self.assertEqual([result['status'] for result in response.json()['responses']], [200, 400])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'REPEATABLE READ snapshots are only set on PostgreSQL')
+class PostgresConsistentBatchTests(TransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='traveller', password='password123')
+        Preference.objects.create(user=self.user, preference_type='cost_level', preference_value='Low')
+        Destination.objects.create(name='Urban', type='City', landscape='Urban', tourism_type='Cultural',
+                                   cost_level='Low')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_consistent_batch_can_build_the_preference_profile(self):
+        """
+        Given a user whose preference profile has not been built yet
+        When a consistent batch requests their recommendations twice
+        Then both sub-requests should succeed in the REPEATABLE READ transaction
+        And the profile built by the first should be stored
+        """
+        profile_cache.clear()
+        self.assertFalse(PreferenceProfile.objects.filter(user=self.user).exists())
+
+        response = self.client.post(reverse('batch'), {'consistent': True, 'requests': [
+            {'path': reverse('recommended-destinations')}, {'path': reverse('recommended-destinations')},
+        ]}, format='json')
+
+        self.assertEqual([result['status'] for result in response.json()['responses']], [200, 200])
+        self.assertTrue(PreferenceProfile.objects.filter(user=self.user).exists())
+
+
+@override_settings(REPLICA_DATABASES=['replica'], REPLICA_STICKY_SECONDS=30)
+class ReplicaRoutingTests(TestCase):
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        # The sticky pin needs a cache every worker sees.
+        directory = cls.enterClassContext(tempfile.TemporaryDirectory())
+        cls.enterClassContext(override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+        }))
+        super().setUpClass()
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        # The replica holds a copy of the user plus an itinerary the primary does not have yet.
+        self.user = User.objects.create_user(username='traveller', password='password123')
+        User.objects.db_manager('replica').create_user(id=self.user.pk, username='traveller', password='password123')
+        destination = Destination.objects.using('replica').create(name='Replica', type='City', landscape='Urban',
+                                                                  tourism_type='Cultural', cost_level='Low')
+        Itinerary.objects.using('replica').create(user_id=self.user.pk, name='Replicated', description='',
+                                                  start_date='2024-09-01', end_date='2024-09-02',
+                                                  destination=destination)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def list_names(self):
+        return [itinerary['name'] for itinerary in self.client.get(reverse('itinerary-list')).json()]
+
+    def test_list_views_read_from_the_replica(self):
+        """
+        Given a replica configured for the itinerary list
+        When the list and an ineligible view are requested
+        Then only the list should read from the replica
+        """
+        self.assertEqual(self.list_names(), ['Replicated'])
+        self.assertEqual(self.client.get(reverse('get_preferences')).json(), [])
+        self.assertFalse(Preference.objects.using('replica').exists())
+
+    def test_writes_pin_the_user_to_the_primary(self):
+        """
+        Given a user who just saved preferences
+        When the user lists itineraries within the sticky window
+        Then the reads should come from the primary, with or without the cookie
+        And other users should keep reading from the replica
+        """
+        response = self.client.post(reverse('preferences'), {
+            'preferences': [{'preference_type': 'climate', 'preference_value': 'Sunny'}]
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(Preference.objects.filter(user=self.user).exists())
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        self.assertEqual(self.list_names(), [])
+        self.client.cookies.clear()
+        self.assertEqual(self.list_names(), [])
+
+        cache.clear()
+        self.assertEqual(self.list_names(), ['Replicated'])
+
+    def test_replicas_require_a_shared_cache(self):
+        """
+        Given replicas configured with a per-process memory cache
+        When the routing middleware is loaded
+        Then it should refuse to start
+        """
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            with self.assertRaises(ImproperlyConfigured):
+                ReplicaRoutingMiddleware(lambda request: None)
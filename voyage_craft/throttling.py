@@ -0,0 +1,118 @@
+import math
+import threading
+import time
+
+from django.conf import settings
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.throttling import BaseThrottle
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate: str) -> float:
+    """Turn a DRF-style rate such as ``'60/min'`` into tokens per second."""
+    count, period = rate.split('/')
+    return int(count) / DURATIONS[period[0]]
+
+
+class TokenBucketStore:
+    """
+    In-process token buckets keyed by ``(scope, ident)``.
+
+    Buckets are spread over striped locks so concurrent requests only
+    contend when they hash to the same stripe; a check is a dict lookup and
+    a little arithmetic, with no cache or database round trip. Each worker
+    process keeps its own buckets.
+
+    A missing bucket is a full one, so every ``sweep_interval`` seconds a
+    stripe drops the buckets that have refilled to capacity; the store only
+    holds the clients that were throttled recently.
+    """
+
+    def __init__(self, stripes: int = 64, clock=time.monotonic, sweep_interval: float = 60):
+        self.clock = clock
+        self.sweep_interval = sweep_interval
+        self.locks = [threading.Lock() for _ in range(stripes)]
+        self.stripes = [{} for _ in range(stripes)]
+        self.swept_at = [clock()] * stripes
+
+    def consume(self, key, rate: float, capacity: int) -> float:
+        """Take one token; return 0 if allowed, otherwise the seconds until one is available."""
+        now = self.clock()
+        stripe = hash(key) % len(self.locks)
+        with self.locks[stripe]:
+            buckets = self.stripes[stripe]
+            if now - self.swept_at[stripe] >= self.sweep_interval:
+                self.sweep(buckets, now)
+                self.swept_at[stripe] = now
+
+            tokens, updated, _ = buckets.get(key, (capacity, now, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            if not wait:
+                tokens -= 1
+            # The third item is when the bucket is full again and can be dropped.
+            buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            return wait
+
+    @staticmethod
+    def sweep(buckets: dict, now: float):
+        for key in [key for key, (_, _, full_at) in buckets.items() if full_at <= now]:
+            del buckets[key]
+
+    def clear(self):
+        for lock, buckets in zip(self.locks, self.stripes):
+            with lock:
+                buckets.clear()
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for buckets in self.stripes)
+
+
+bucket_store = TokenBucketStore()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle each user (or client IP when anonymous) per ``scope``.
+
+    Rates come from ``settings.TOKEN_BUCKET_THROTTLES[scope]``, e.g.
+    ``{'rate': '60/min', 'burst': 30}``. DRF turns ``wait()`` into the
+    ``Retry-After`` header of the 429 response.
+    """
+    scope = None
+    store = bucket_store
+
+    def __init__(self):
+        self.retry_after = None
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
+
+    def allow_request(self, request, view) -> bool:
+        config = settings.TOKEN_BUCKET_THROTTLES.get(self.scope)
+        if config is None:
+            return True
+
+        self.retry_after = self.store.consume(
+            (self.scope, self.get_ident_key(request)), parse_rate(config['rate']), config['burst']
+        )
+        return self.retry_after == 0
+
+    def wait(self):
+        return math.ceil(self.retry_after) if self.retry_after else None
+
+
+class RecommendationThrottle(TokenBucketThrottle):
+    scope = 'recommendations'
+
+
+class WriteThrottle(TokenBucketThrottle):
+    scope = 'writes'
+
+    def allow_request(self, request, view) -> bool:
+        if request.method in SAFE_METHODS:
+            return True
+        return super().allow_request(request, view)
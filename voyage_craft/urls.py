@@ -1,10 +1,14 @@
 from django.contrib import admin
 from django.urls import path, include
+from voyage_craft.batch import BatchView
+from voyage_craft.metrics import MetricsView
 
 API_PREFIX = 'api/v1/'
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+    path(f'{API_PREFIX}batch/', BatchView.as_view(), name='batch'),
     path(f'{API_PREFIX}', include('users_app.urls')),
     path(f'{API_PREFIX}', include('destinations.urls')),
     path(f'{API_PREFIX}', include('itinerary.urls')),